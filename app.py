@@ -7,17 +7,19 @@ Autor: MiniMax Agent
 from fastapi import FastAPI, HTTPException, Depends, status, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, StreamingResponse, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from typing import Optional, List
 import uvicorn
+import asyncio
 import os
 from datetime import datetime
 
 # Importar configuración y modelos
-from config.database import obtener_sesion, crear_tablas
+from config.database import obtener_sesion, crear_tablas, obtener_metricas_pool
+from config.replicas import enrutador_lecturas, COOKIE_ULTIMA_ESCRITURA
 from modelo import *
 from controlador import *
 
@@ -56,6 +58,9 @@ templates = Jinja2Templates(directory=templates_dir)
 # Seguridad
 security = HTTPBearer()
 
+# Tareas en segundo plano iniciadas al arrancar
+tareas_segundo_plano = []
+
 # Dependencias
 async def obtener_usuario_actual(credentials: HTTPAuthorizationCredentials = Depends(security), 
                                 db: Session = Depends(obtener_sesion)):
@@ -65,7 +70,7 @@ async def obtener_usuario_actual(credentials: HTTPAuthorizationCredentials = Dep
     try:
         token = credentials.credentials
         auth_controller = ControladorAutenticacion(db)
-        valido, mensaje, usuario = auth_controller.validar_sesion(token)
+        valido, mensaje, usuario = await despachador_bd.ejecutar(auth_controller.validar_sesion, token)
         
         if not valido:
             raise HTTPException(
@@ -82,6 +87,22 @@ async def obtener_usuario_actual(credentials: HTTPAuthorizationCredentials = Dep
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def obtener_sesion_lectura(request: Request, usuario_actual: Usuario = Depends(obtener_usuario_actual)):
+    """
+    Sesión de solo lectura para el usuario actual: réplica si hay una al día,
+    primaria si el usuario acaba de escribir (lee sus propios cambios, según
+    la cookie de última escritura, en cualquier worker).
+    Es síncrona para que FastAPI la ejecute en el threadpool (mide el retraso
+    de las réplicas).
+    """
+    db = enrutador_lecturas.crear_sesion_lectura(
+        usuario_actual.id_usuario, request.cookies.get(COOKIE_ULTIMA_ESCRITURA)
+    )
+    try:
+        yield db
+    finally:
+        db.close()
+
 async def verificar_administrador(usuario_actual: Usuario = Depends(obtener_usuario_actual)):
     """
     Verifica que el usuario actual sea administrador
@@ -116,7 +137,7 @@ async def iniciar_sesion(request: Request, db: Session = Depends(obtener_sesion)
         user_agent = request.headers.get("user-agent", "unknown")
         
         auth_controller = ControladorAutenticacion(db)
-        valido, mensaje, info_sesion = auth_controller.autenticar_usuario(
+        valido, mensaje, info_sesion = await auth_controller.autenticar_usuario(
             email=email,
             password=password,
             ip_address=client_ip,
@@ -160,7 +181,7 @@ async def cerrar_sesion(request: Request, db: Session = Depends(obtener_sesion))
     
     if session_token:
         auth_controller = ControladorAutenticacion(db)
-        auth_controller.cerrar_sesion(session_token)
+        await despachador_bd.ejecutar(auth_controller.cerrar_sesion, session_token)
     
     response = RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
     response.delete_cookie("session_token")
@@ -197,7 +218,7 @@ async def registrar_usuario(request: Request, db: Session = Depends(obtener_sesi
             )
         
         auth_controller = ControladorAutenticacion(db)
-        exito, mensaje, usuario = auth_controller.registrar_usuario(
+        exito, mensaje, usuario = await auth_controller.registrar_usuario(
             email=email,
             password=password,
             nombre_completo=nombre_completo,
@@ -233,8 +254,11 @@ async def pagina_inicio(request: Request):
         # Verificar sesión válida
         try:
             db = next(obtener_sesion())
-            auth_controller = ControladorAutenticacion(db)
-            valido, mensaje, usuario = auth_controller.validar_sesion(session_token)
+            try:
+                auth_controller = ControladorAutenticacion(db)
+                valido, mensaje, usuario = await despachador_bd.ejecutar(auth_controller.validar_sesion, session_token)
+            finally:
+                db.close()
             if valido:
                 return RedirectResponse(url="/dashboard", status_code=status.HTTP_302_FOUND)
         except:
@@ -244,16 +268,16 @@ async def pagina_inicio(request: Request):
 
 @app.get("/dashboard", response_class=HTMLResponse)
 async def dashboard(request: Request, usuario_actual: Usuario = Depends(obtener_usuario_actual), 
-                   db: Session = Depends(obtener_sesion)):
+                   db: Session = Depends(obtener_sesion_lectura)):
     """Dashboard principal del sistema"""
     try:
         # Obtener datos del dashboard
         reportes_controller = ControladorReportes(db)
-        dashboard_data = reportes_controller.generar_dashboard_datos()
+        dashboard_data = await despachador_bd.ejecutar(reportes_controller.generar_dashboard_datos)
         
         # Obtener alertas recientes
         alertas_controller = ControladorAlertas(db)
-        alertas_data = alertas_controller.listar_alertas(solo_activas=True, elementos_por_pagina=5)
+        alertas_data = await despachador_bd.ejecutar(alertas_controller.listar_alertas, solo_activas=True, elementos_por_pagina=5)
         
         return templates.TemplateResponse(
             "dashboard.html",
@@ -283,18 +307,23 @@ async def listar_productos(
     solo_stock_bajo: bool = False,
     pagina: int = 1,
     elementos_por_pagina: int = 20,
+    cursor: Optional[str] = None,
+    incluir_total: bool = True,
     usuario_actual: Usuario = Depends(obtener_usuario_actual),
-    db: Session = Depends(obtener_sesion)
+    db: Session = Depends(obtener_sesion_lectura)
 ):
-    """API para listar productos"""
+    """API para listar productos (paginación por página o por cursor)"""
     try:
         productos_controller = ControladorProductos(db)
-        return productos_controller.listar_productos(
+        return await despachador_bd.ejecutar(
+            productos_controller.listar_productos,
             busqueda=busqueda,
             categoria_id=categoria_id,
             solo_stock_bajo=solo_stock_bajo,
             pagina=pagina,
-            elementos_por_pagina=elementos_por_pagina
+            elementos_por_pagina=elementos_por_pagina,
+            cursor=cursor,
+            incluir_total=incluir_total
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -303,18 +332,18 @@ async def listar_productos(
 async def obtener_producto(
     producto_id: int,
     usuario_actual: Usuario = Depends(obtener_usuario_actual),
-    db: Session = Depends(obtener_sesion)
+    db: Session = Depends(obtener_sesion_lectura)
 ):
     """API para obtener un producto específico"""
     try:
         productos_controller = ControladorProductos(db)
-        producto = productos_controller.obtener_producto(producto_id=producto_id)
+        producto = await despachador_bd.ejecutar(productos_controller.obtener_producto, producto_id=producto_id)
         
         if not producto:
             raise HTTPException(status_code=404, detail="Producto no encontrado")
         
         # Obtener movimientos del producto
-        movimientos = productos_controller.obtener_movimientos_producto(producto_id)
+        movimientos = await despachador_bd.ejecutar(productos_controller.obtener_movimientos_producto, producto_id)
         
         return {
             "producto": {
@@ -331,7 +360,7 @@ async def obtener_producto(
                 "ubicacion_almacen": producto.ubicacion_almacen,
                 "unidad_medida": producto.unidad_medida,
                 "estado_stock": producto.obtener_estado_stock(),
-                "qr_data_url": producto.qr_data_url
+                "qr_url": url_qr(producto.codigo_producto)
             },
             "movimientos": movimientos
         }
@@ -341,16 +370,49 @@ async def obtener_producto(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/productos/{producto_id}/movimientos")
+async def listar_movimientos_producto(
+    producto_id: int,
+    cursor: Optional[str] = None,
+    elementos_por_pagina: int = 50,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    usuario_actual: Usuario = Depends(obtener_usuario_actual),
+    db: Session = Depends(obtener_sesion_lectura)
+):
+    """API para listar el historial de movimientos de un producto (cursor y ventana de fechas)"""
+    try:
+        productos_controller = ControladorProductos(db)
+        
+        # Parsear fechas
+        fecha_inicio_dt = datetime.fromisoformat(fecha_inicio) if fecha_inicio else None
+        fecha_fin_dt = datetime.fromisoformat(fecha_fin) if fecha_fin else None
+        
+        return await despachador_bd.ejecutar(
+            productos_controller.listar_movimientos_producto,
+            producto_id=producto_id,
+            cursor=cursor,
+            elementos_por_pagina=elementos_por_pagina,
+            fecha_inicio=fecha_inicio_dt,
+            fecha_fin=fecha_fin_dt
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/productos")
 async def crear_producto(
     producto_data: dict,
+    response: Response,
     usuario_actual: Usuario = Depends(obtener_usuario_actual),
     db: Session = Depends(obtener_sesion)
 ):
     """API para crear un nuevo producto"""
     try:
         productos_controller = ControladorProductos(db)
-        exito, mensaje, producto = productos_controller.crear_producto(
+        exito, mensaje, producto = await despachador_bd.ejecutar(
+            productos_controller.crear_producto,
             codigo_producto=producto_data["codigo_producto"],
             nombre_producto=producto_data["nombre_producto"],
             descripcion=producto_data.get("descripcion", ""),
@@ -365,6 +427,7 @@ async def crear_producto(
         )
         
         if exito:
+            enrutador_lecturas.registrar_escritura(usuario_actual.id_usuario, response)
             return {"success": True, "message": mensaje, "producto_id": producto.id_producto}
         else:
             raise HTTPException(status_code=400, detail=mensaje)
@@ -378,15 +441,17 @@ async def crear_producto(
 async def actualizar_producto(
     producto_id: int,
     producto_data: dict,
+    response: Response,
     usuario_actual: Usuario = Depends(obtener_usuario_actual),
     db: Session = Depends(obtener_sesion)
 ):
     """API para actualizar un producto"""
     try:
         productos_controller = ControladorProductos(db)
-        exito, mensaje = productos_controller.actualizar_producto(producto_id, **producto_data)
+        exito, mensaje = await despachador_bd.ejecutar(productos_controller.actualizar_producto, producto_id, **producto_data)
         
         if exito:
+            enrutador_lecturas.registrar_escritura(usuario_actual.id_usuario, response)
             return {"success": True, "message": mensaje}
         else:
             raise HTTPException(status_code=400, detail=mensaje)
@@ -399,15 +464,17 @@ async def actualizar_producto(
 @app.delete("/api/productos/{producto_id}")
 async def eliminar_producto(
     producto_id: int,
+    response: Response,
     usuario_actual: Usuario = Depends(obtener_usuario_actual),
     db: Session = Depends(obtener_sesion)
 ):
     """API para eliminar un producto"""
     try:
         productos_controller = ControladorProductos(db)
-        exito, mensaje = productos_controller.eliminar_producto(producto_id)
+        exito, mensaje = await despachador_bd.ejecutar(productos_controller.eliminar_producto, producto_id)
         
         if exito:
+            enrutador_lecturas.registrar_escritura(usuario_actual.id_usuario, response)
             return {"success": True, "message": mensaje}
         else:
             raise HTTPException(status_code=400, detail=mensaje)
@@ -425,13 +492,15 @@ async def eliminar_producto(
 async def registrar_entrada(
     producto_id: int,
     movimiento_data: dict,
+    response: Response,
     usuario_actual: Usuario = Depends(obtener_usuario_actual),
     db: Session = Depends(obtener_sesion)
 ):
     """API para registrar entrada de productos"""
     try:
         productos_controller = ControladorProductos(db)
-        exito, mensaje = productos_controller.registrar_entrada(
+        exito, mensaje = await despachador_bd.ejecutar(
+            productos_controller.registrar_entrada,
             producto_id=producto_id,
             cantidad=movimiento_data["cantidad"],
             motivo=movimiento_data.get("motivo", ""),
@@ -440,6 +509,7 @@ async def registrar_entrada(
         )
         
         if exito:
+            enrutador_lecturas.registrar_escritura(usuario_actual.id_usuario, response)
             return {"success": True, "message": mensaje}
         else:
             raise HTTPException(status_code=400, detail=mensaje)
@@ -453,13 +523,15 @@ async def registrar_entrada(
 async def registrar_salida(
     producto_id: int,
     movimiento_data: dict,
+    response: Response,
     usuario_actual: Usuario = Depends(obtener_usuario_actual),
     db: Session = Depends(obtener_sesion)
 ):
     """API para registrar salida de productos"""
     try:
         productos_controller = ControladorProductos(db)
-        exito, mensaje = productos_controller.registrar_salida(
+        exito, mensaje = await despachador_bd.ejecutar(
+            productos_controller.registrar_salida,
             producto_id=producto_id,
             cantidad=movimiento_data["cantidad"],
             motivo=movimiento_data.get("motivo", ""),
@@ -467,6 +539,7 @@ async def registrar_salida(
         )
         
         if exito:
+            enrutador_lecturas.registrar_escritura(usuario_actual.id_usuario, response)
             return {"success": True, "message": mensaje}
         else:
             raise HTTPException(status_code=400, detail=mensaje)
@@ -480,13 +553,15 @@ async def registrar_salida(
 async def ajustar_stock(
     producto_id: int,
     movimiento_data: dict,
+    response: Response,
     usuario_actual: Usuario = Depends(obtener_usuario_actual),
     db: Session = Depends(obtener_sesion)
 ):
     """API para ajustar stock de productos"""
     try:
         productos_controller = ControladorProductos(db)
-        exito, mensaje = productos_controller.ajustar_stock(
+        exito, mensaje = await despachador_bd.ejecutar(
+            productos_controller.ajustar_stock,
             producto_id=producto_id,
             nuevo_stock=movimiento_data["nuevo_stock"],
             motivo=movimiento_data.get("motivo", ""),
@@ -494,6 +569,7 @@ async def ajustar_stock(
         )
         
         if exito:
+            enrutador_lecturas.registrar_escritura(usuario_actual.id_usuario, response)
             return {"success": True, "message": mensaje}
         else:
             raise HTTPException(status_code=400, detail=mensaje)
@@ -503,6 +579,69 @@ async def ajustar_stock(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/movimientos/lote")
+async def registrar_movimientos_lote(
+    lote_data: dict,
+    response: Response,
+    usuario_actual: Usuario = Depends(obtener_usuario_actual),
+    db: Session = Depends(obtener_sesion)
+):
+    """API para registrar un lote de movimientos (entrada, salida, ajuste, devolución, pérdida)"""
+    try:
+        lineas = lote_data.get("movimientos")
+        if not isinstance(lineas, list):
+            raise HTTPException(status_code=400, detail="Se requiere una lista de movimientos")
+        
+        productos_controller = ControladorProductos(db)
+        resultado = await despachador_bd.ejecutar(
+            productos_controller.registrar_movimientos_lote,
+            lineas=lineas,
+            usuario_id=usuario_actual.id_usuario
+        )
+        
+        if resultado["exito"]:
+            enrutador_lecturas.registrar_escritura(usuario_actual.id_usuario, response)
+            return resultado
+        else:
+            raise HTTPException(status_code=400, detail=resultado["error"])
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ===============================
+# API ENDPOINTS PARA ALERTAS
+# ===============================
+
+@app.get("/api/alertas")
+async def listar_alertas(
+    solo_activas: bool = True,
+    prioridad: Optional[str] = None,
+    tipo_alerta: Optional[str] = None,
+    pagina: int = 1,
+    elementos_por_pagina: int = 20,
+    cursor: Optional[str] = None,
+    incluir_total: bool = True,
+    usuario_actual: Usuario = Depends(obtener_usuario_actual),
+    db: Session = Depends(obtener_sesion_lectura)
+):
+    """API para listar alertas (paginación por página o por cursor)"""
+    try:
+        alertas_controller = ControladorAlertas(db)
+        return await despachador_bd.ejecutar(
+            alertas_controller.listar_alertas,
+            solo_activas=solo_activas,
+            prioridad=prioridad,
+            tipo_alerta=tipo_alerta,
+            pagina=pagina,
+            elementos_por_pagina=elementos_por_pagina,
+            cursor=cursor,
+            incluir_total=incluir_total
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ===============================
 # API ENDPOINTS PARA REPORTES
 # ===============================
@@ -510,12 +649,12 @@ async def ajustar_stock(
 @app.get("/api/reportes/dashboard")
 async def obtener_datos_dashboard(
     usuario_actual: Usuario = Depends(obtener_usuario_actual),
-    db: Session = Depends(obtener_sesion)
+    db: Session = Depends(obtener_sesion_lectura)
 ):
     """API para obtener datos del dashboard"""
     try:
         reportes_controller = ControladorReportes(db)
-        return reportes_controller.generar_dashboard_datos()
+        return await despachador_bd.ejecutar(reportes_controller.generar_dashboard_datos)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -526,7 +665,7 @@ async def generar_reporte_inventario(
     categoria_id: Optional[int] = None,
     formato: str = "json",
     usuario_actual: Usuario = Depends(obtener_usuario_actual),
-    db: Session = Depends(obtener_sesion)
+    db: Session = Depends(obtener_sesion_lectura)
 ):
     """API para generar reporte de inventario"""
     try:
@@ -536,15 +675,199 @@ async def generar_reporte_inventario(
         fecha_inicio_dt = datetime.fromisoformat(fecha_inicio) if fecha_inicio else None
         fecha_fin_dt = datetime.fromisoformat(fecha_fin) if fecha_fin else None
         
-        return reportes_controller.generar_reporte_inventario(
+        resultado = await despachador_bd.ejecutar(
+            reportes_controller.generar_reporte_inventario,
             fecha_inicio=fecha_inicio_dt,
             fecha_fin=fecha_fin_dt,
             categoria_id=categoria_id,
             formato=formato
         )
+        
+        return respuesta_reporte(resultado)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/reportes/movimientos")
+async def generar_reporte_movimientos(
+    producto_id: Optional[int] = None,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    tipo_movimiento: Optional[str] = None,
+    formato: str = "json",
+    usuario_actual: Usuario = Depends(obtener_usuario_actual),
+    db: Session = Depends(obtener_sesion_lectura)
+):
+    """API para generar reporte de movimientos"""
+    try:
+        reportes_controller = ControladorReportes(db)
+        
+        # Parsear fechas
+        fecha_inicio_dt = datetime.fromisoformat(fecha_inicio) if fecha_inicio else None
+        fecha_fin_dt = datetime.fromisoformat(fecha_fin) if fecha_fin else None
+        
+        resultado = await despachador_bd.ejecutar(
+            reportes_controller.generar_reporte_movimientos,
+            producto_id=producto_id,
+            fecha_inicio=fecha_inicio_dt,
+            fecha_fin=fecha_fin_dt,
+            tipo_movimiento=tipo_movimiento,
+            formato=formato
+        )
+        
+        return respuesta_reporte(resultado)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/reportes/graficos/inventario")
+async def obtener_grafico_inventario(
+    request: Request,
+    formato: str = "png",
+    usuario_actual: Usuario = Depends(obtener_usuario_actual),
+    db: Session = Depends(obtener_sesion_lectura)
+):
+    """API para obtener el gráfico de estado del inventario (png o svg)"""
+    try:
+        grafico = await servicio_graficos.grafico_inventario_async(db, formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al generar gráfico: {str(e)}")
+    
+    # La versión de los datos identifica la imagen
+    etag = f'"{grafico["version"]}-{formato.lower()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    return Response(content=grafico["imagen"], media_type=grafico["formato"], headers={"ETag": etag})
+
+@app.post("/api/reportes/jobs", status_code=202)
+async def crear_trabajo_reporte(
+    especificacion: dict,
+    usuario_actual: Usuario = Depends(obtener_usuario_actual)
+):
+    """API para encolar la generación de un reporte (tipo, fechas, categoria_id, formato)"""
+    try:
+        return await despachador_bd.ejecutar(cola_reportes.encolar, especificacion, usuario_actual.id_usuario)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/reportes/jobs/{trabajo_id}")
+async def obtener_trabajo_reporte(
+    trabajo_id: str,
+    usuario_actual: Usuario = Depends(obtener_usuario_actual)
+):
+    """API para consultar el estado de un trabajo de reporte"""
+    trabajo = cola_reportes.obtener(trabajo_id, usuario_actual.id_usuario)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return trabajo
+
+@app.get("/api/reportes/jobs/{trabajo_id}/descarga")
+async def descargar_trabajo_reporte(
+    trabajo_id: str,
+    usuario_actual: Usuario = Depends(obtener_usuario_actual)
+):
+    """API para descargar el reporte generado por un trabajo"""
+    artefacto = cola_reportes.obtener_artefacto(trabajo_id, usuario_actual.id_usuario)
+    if not artefacto:
+        raise HTTPException(status_code=404, detail="Reporte no disponible")
+    return FileResponse(artefacto["ruta"], media_type=artefacto["mime_type"], filename=artefacto["nombre"])
+
+def respuesta_reporte(resultado: dict):
+    """
+    Envía las exportaciones (CSV/Excel) en streaming; el resto se devuelve como JSON.
+    La sesión de obtener_sesion_lectura sigue abierta hasta que termina la respuesta.
+    """
+    if "contenido" not in resultado:
+        return resultado
+    
+    return StreamingResponse(
+        resultado["contenido"],
+        media_type=resultado["mime_type"],
+        headers={"Content-Disposition": f'attachment; filename="{resultado["nombre"]}"'}
+    )
+
+# ===============================
+# IMÁGENES QR
+# ===============================
+
+@app.get("/qr/{codigo}.png")
+async def obtener_imagen_qr(codigo: str, request: Request, db: Session = Depends(obtener_sesion)):
+    """Imagen QR de un producto (pública, para poder usarse en etiquetas e <img>)"""
+    datos = await despachador_bd.ejecutar(servicio_qr.obtener_datos, db, codigo)
+    if not datos:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    
+    # La URL no cambia al cambiar el qr_code: la caché revalida siempre con el
+    # ETag (huella del qr_code guardado) y recibe un 304 si sigue igual
+    cabeceras = {"ETag": f'"{servicio_qr.huella(datos)}"', "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == cabeceras["ETag"]:
+        return Response(status_code=304, headers=cabeceras)
+    
+    imagen = await despachador_bd.ejecutar(servicio_qr.obtener_imagen, datos)
+    return FileResponse(imagen["ruta"], media_type="image/png", headers=cabeceras)
+
+# ===============================
+# API ENDPOINTS DEL SISTEMA
+# ===============================
+
+@app.post("/api/sistema/qr/regeneracion", status_code=202)
+async def iniciar_regeneracion_qr(
+    datos: Optional[dict] = None,
+    usuario_actual: Usuario = Depends(verificar_administrador),
+    db: Session = Depends(obtener_sesion)
+):
+    """
+    API para regenerar el QR de todos los productos (solo administradores).
+    Si se envía base_url se guarda como nueva qr_base_url antes de empezar.
+    """
+    datos = datos or {}
+    base_url = (datos.get("base_url") or "").strip().rstrip("/")
+    if base_url:
+        await despachador_bd.ejecutar(
+            almacen_configuracion.establecer, db, "qr_base_url", base_url,
+            descripcion="URL base para códigos QR", usuario_id=usuario_actual.id_usuario
+        )
+    
+    iniciada, mensaje, progreso = regenerador_qr.iniciar(
+        base_url or None, generar_imagenes=bool(datos.get("generar_imagenes", True))
+    )
+    if not iniciada:
+        raise HTTPException(status_code=409, detail=mensaje)
+    
+    return {"mensaje": mensaje, "progreso": progreso}
+
+@app.get("/api/sistema/qr/regeneracion")
+async def obtener_progreso_regeneracion_qr(usuario_actual: Usuario = Depends(verificar_administrador)):
+    """API para consultar el progreso de la regeneración de QR (solo administradores)"""
+    progreso = regenerador_qr.obtener_progreso()
+    if not progreso:
+        raise HTTPException(status_code=404, detail="No se ha lanzado ninguna regeneración de QR")
+    return progreso
+
+@app.get("/api/sistema/metricas")
+async def obtener_metricas_sistema(usuario_actual: Usuario = Depends(verificar_administrador)):
+    """API para obtener métricas internas del sistema (solo administradores)"""
+    return {
+        "cache_sesiones": cache_sesiones.obtener_estadisticas(),
+        "servicio_passwords": servicio_passwords.obtener_estadisticas(),
+        "despachador_bd": despachador_bd.obtener_estadisticas(),
+        "instantanea_inventario": instantanea_inventario.obtener_estadisticas(),
+        "evaluador_alertas": evaluador_alertas.obtener_estadisticas(),
+        "cola_reportes": cola_reportes.obtener_estadisticas(),
+        "servicio_graficos": servicio_graficos.obtener_estadisticas(),
+        "servicio_qr": servicio_qr.obtener_estadisticas(),
+        "almacen_configuracion": almacen_configuracion.obtener_estadisticas(),
+        "pool_conexiones": obtener_metricas_pool(),
+        "replicas_lectura": enrutador_lecturas.obtener_estadisticas()
+    }
+
 # ===============================
 # PÁGINAS HTML
 # ===============================
@@ -561,10 +884,10 @@ async def pagina_reportes(request: Request, usuario_actual: Usuario = Depends(ob
 
 @app.get("/alertas", response_class=HTMLResponse)
 async def pagina_alertas(request: Request, usuario_actual: Usuario = Depends(obtener_usuario_actual), 
-                        db: Session = Depends(obtener_sesion)):
+                        db: Session = Depends(obtener_sesion_lectura)):
     """Página de alertas"""
     alertas_controller = ControladorAlertas(db)
-    alertas_data = alertas_controller.listar_alertas()
+    alertas_data = await despachador_bd.ejecutar(alertas_controller.listar_alertas)
     
     return templates.TemplateResponse(
         "alertas.html", 
@@ -580,17 +903,40 @@ async def pagina_alertas(request: Request, usuario_actual: Usuario = Depends(obt
 # EVENTOS DE INICIO
 # ===============================
 
+def avisar_indices_pendientes():
+    """
+    Avisa de los índices pendientes sin crearlos: construirlos bloquearía el
+    arranque y varios workers competirían por los mismos índices
+    """
+    try:
+        from config.migraciones import indices_pendientes
+        pendientes = indices_pendientes()
+        if pendientes:
+            nombres = ", ".join(indice.name for indice, _ in pendientes)
+            print(f"⚠️ Índices pendientes ({nombres}): ejecuta python -m config.migraciones --aplicar")
+    except Exception as e:
+        print(f"⚠️ No se pudieron comprobar los índices pendientes: {e}")
+
 @app.on_event("startup")
 async def startup_event():
     """Eventos al iniciar la aplicación"""
     try:
         # Crear tablas si no existen
         crear_tablas()
+        avisar_indices_pendientes()
         
         # Inicializar base de datos con datos por defecto
         from config.database import inicializar_base_datos
         inicializar_base_datos()
         
+        # Reconciliación periódica de los contadores del dashboard
+        tareas_segundo_plano.append(
+            asyncio.create_task(instantanea_inventario.ejecutar_reconciliacion_periodica())
+        )
+        
+        # Evaluación de alertas fuera de la transacción de los movimientos
+        evaluador_alertas.iniciar()
+        
         print("✅ StockTrack iniciado exitosamente")
         print("🌐 Accede a http://localhost:8000 para usar el sistema")
         print("📚 Documentación API: http://localhost:8000/docs")
@@ -601,6 +947,14 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Eventos al cerrar la aplicación"""
+    for tarea in tareas_segundo_plano:
+        tarea.cancel()
+    servicio_passwords.cerrar()
+    despachador_bd.cerrar()
+    cola_reportes.cerrar()
+    servicio_graficos.cerrar()
+    regenerador_qr.detener()
+    evaluador_alertas.detener()
     print("🔄 StockTrack cerrando...")
 
 # ===============================
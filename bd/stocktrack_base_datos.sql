@@ -461,9 +461,18 @@ DELIMITER ;
 -- ===============================================
 
 -- Índices para mejorar el rendimiento de consultas frecuentes
-CREATE INDEX idx_productos_stock_bajo ON productos(stock_actual, stock_minimo, activo);
+-- (declarados también en los __table_args__ de los modelos; config/migraciones.py
+-- crea en línea los que falten en una base ya existente)
+CREATE INDEX idx_productos_stock_bajo ON productos(activo, stock_actual, stock_minimo);
+CREATE INDEX idx_productos_activo_nombre ON productos(activo, nombre_producto, id_producto);
 CREATE INDEX idx_movimientos_fecha_producto ON movimientos_inventario(fecha_movimiento, id_producto);
+CREATE INDEX idx_movimientos_producto_fecha ON movimientos_inventario(id_producto, fecha_movimiento, id_movimiento);
 CREATE INDEX idx_alertas_sin_resolver ON alertas_stock(resuelta, prioridad, fecha_creacion);
+CREATE INDEX idx_alertas_deduplicacion ON alertas_stock(resuelta, id_producto, tipo_alerta);
+CREATE INDEX idx_sesiones_usuario_activa ON sesiones_usuario(id_usuario, activa);
+
+-- Índice de texto completo para la búsqueda de productos (nombre, código, descripción)
+CREATE FULLTEXT INDEX ft_productos_busqueda ON productos(nombre_producto, codigo_producto, descripcion);
 
 -- ===============================================
 -- COMENTARIOS FINALES
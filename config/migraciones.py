@@ -0,0 +1,98 @@
+"""
+Migración de Índices
+Sistema de Gestión de Inventarios StockTrack
+Autor: MiniMax Agent
+"""
+
+import sys
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex, DropIndex
+from config.database import Base, engine
+
+def indices_pendientes(motor=engine) -> list:
+    """
+    Índices declarados en los modelos (__table_args__ e index=True) que
+    faltan o están desactualizados en tablas ya existentes. create_all solo
+    crea los índices de las tablas nuevas, así que los de tablas antiguas
+    hay que añadirlos aquí. Devuelve pares (índice, reemplazar): reemplazar
+    es True si ya existe un índice con ese nombre pero otras columnas (p. ej.
+    una versión anterior) y hay que eliminarlo antes de crearlo. Un índice
+    existente con otro nombre y las mismas columnas (p. ej. creado por
+    bd/stocktrack_base_datos.sql) cuenta como presente.
+    """
+    import modelo  # Registra todos los modelos en Base.metadata
+
+    inspector = inspect(motor)
+    tablas = set(inspector.get_table_names())
+    pendientes = []
+    for tabla in Base.metadata.sorted_tables:
+        if tabla.name not in tablas:
+            continue
+        existentes = {indice["name"]: indice for indice in inspector.get_indexes(tabla.name)}
+        columnas = {tuple(indice["column_names"]) for indice in existentes.values()}
+        for indice in sorted(tabla.indexes, key=lambda i: i.name):
+            columnas_modelo = tuple(columna.name for columna in indice.columns)
+            existente = existentes.get(indice.name)
+            if existente is not None:
+                if tuple(existente["column_names"]) != columnas_modelo \
+                        or bool(existente.get("unique")) != bool(indice.unique):
+                    pendientes.append((indice, True))
+            elif columnas_modelo not in columnas:
+                pendientes.append((indice, False))
+    return pendientes
+
+def opciones_en_linea(indice, motor=engine) -> str:
+    """
+    Cláusulas de construcción en línea de MySQL (ALGORITHM=INPLACE, LOCK=NONE)
+    para no bloquear escrituras; los índices FULLTEXT no la admiten y usan
+    LOCK=SHARED. En otros motores no se añade nada.
+    """
+    if motor.dialect.name != "mysql":
+        return ""
+    if indice.dialect_options["mysql"]["prefix"] == "FULLTEXT":
+        return " ALGORITHM=INPLACE LOCK=SHARED"
+    return " ALGORITHM=INPLACE LOCK=NONE"
+
+def sentencia_indice(indice, motor=engine) -> str:
+    """
+    CREATE INDEX para el dialecto del motor (en línea en MySQL)
+    """
+    return str(CreateIndex(indice).compile(dialect=motor.dialect)).strip() + opciones_en_linea(indice, motor)
+
+def sentencias_indice(indice, reemplazar: bool = False, motor=engine) -> list:
+    """
+    Sentencias que dejan el índice como en el modelo: DROP INDEX del índice
+    desactualizado si hay que reemplazarlo y CREATE INDEX
+    """
+    sentencias = []
+    if reemplazar:
+        sentencias.append(str(DropIndex(indice).compile(dialect=motor.dialect)).strip() + opciones_en_linea(indice, motor))
+    sentencias.append(sentencia_indice(indice, motor))
+    return sentencias
+
+def crear_indices_pendientes(motor=engine) -> list:
+    """
+    Crea (o reemplaza) uno a uno los índices pendientes y devuelve sus nombres.
+    Es idempotente: lo ya creado se salta en la siguiente ejecución.
+    """
+    creados = []
+    for indice, reemplazar in indices_pendientes(motor):
+        with motor.begin() as conexion:
+            for sentencia in sentencias_indice(indice, reemplazar, motor):
+                conexion.execute(text(sentencia))
+        creados.append(indice.name)
+    return creados
+
+if __name__ == "__main__":
+    # python -m config.migraciones            -> muestra las sentencias pendientes
+    # python -m config.migraciones --aplicar  -> las ejecuta
+    pendientes = indices_pendientes()
+    if not pendientes:
+        print("No hay índices pendientes")
+    elif "--aplicar" in sys.argv:
+        for nombre in crear_indices_pendientes():
+            print(f"✅ Índice creado: {nombre}")
+    else:
+        for indice, reemplazar in pendientes:
+            for sentencia in sentencias_indice(indice, reemplazar):
+                print(f"{sentencia};")
@@ -0,0 +1,229 @@
+"""
+Enrutamiento de Lecturas a Réplicas
+Sistema de Gestión de Inventarios StockTrack
+Autor: MiniMax Agent
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from sqlalchemy.orm import sessionmaker
+from config.database import SessionLocal, crear_motor, obtener_metricas_pool
+
+# Réplicas de solo lectura, separadas por comas (vacío = todo va a la primaria)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+# Retraso máximo (segundos) con el que una réplica sigue recibiendo lecturas
+DB_REPLICA_RETRASO_MAXIMO = float(os.getenv("DB_REPLICA_RETRASO_MAXIMO", "5"))
+
+# Segundos entre dos mediciones del retraso de una misma réplica
+DB_REPLICA_INTERVALO_COMPROBACION = float(os.getenv("DB_REPLICA_INTERVALO_COMPROBACION", "5"))
+
+# Segundos que las lecturas de un usuario van a la primaria tras una escritura suya
+DB_REPLICA_VENTANA_LECTURA_PROPIA = float(os.getenv("DB_REPLICA_VENTANA_LECTURA_PROPIA", "10"))
+
+# Clave con la que se firma la cookie de la última escritura. Con varios workers
+# debe ser la misma en todos; si falta se genera una por proceso y la lectura
+# propia solo se garantiza en el worker que atendió la escritura
+DB_REPLICA_CLAVE_FIRMA = os.getenv("DB_REPLICA_CLAVE_FIRMA") or secrets.token_hex(32)
+
+# Cookie con la última escritura del cliente (la leen todos los workers)
+COOKIE_ULTIMA_ESCRITURA = "ultima_escritura"
+
+def medir_retraso(motor) -> float:
+    """
+    Segundos de retraso de una réplica respecto a la primaria.
+    Un servidor que no es réplica (o SQLite) cuenta como 0; lanza una
+    excepción si la replicación está detenida o no se puede consultar.
+    """
+    if motor.dialect.name != "mysql":
+        return 0.0
+
+    with motor.connect() as conexion:
+        try:
+            estado = conexion.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+        except Exception:
+            # MySQL anterior a 8.0.22
+            estado = conexion.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+
+    if estado is None:
+        return 0.0
+    retraso = estado.get("Seconds_Behind_Source", estado.get("Seconds_Behind_Master"))
+    if retraso is None:
+        raise RuntimeError("La replicación está detenida")
+    return float(retraso)
+
+class EnrutadorLecturas:
+    """
+    Elige dónde se ejecutan las lecturas.
+
+    Las escrituras siempre usan la primaria (SessionLocal). Las sesiones de
+    lectura se reparten entre las réplicas cuyo retraso medido no supera
+    DB_REPLICA_RETRASO_MAXIMO; si ninguna está disponible, o si el usuario
+    escribió hace menos de DB_REPLICA_VENTANA_LECTURA_PROPIA segundos (para
+    que lea sus propios cambios), se usa la primaria.
+
+    La hora de la última escritura viaja con el cliente en una cookie
+    firmada, así que cualquier worker la ve; la marca en memoria cubre a
+    los clientes sin cookies en el worker que atendió la escritura.
+    """
+
+    def __init__(self, urls_replicas=DATABASE_REPLICA_URLS,
+                 retraso_maximo: float = DB_REPLICA_RETRASO_MAXIMO,
+                 intervalo_comprobacion: float = DB_REPLICA_INTERVALO_COMPROBACION,
+                 ventana_lectura_propia: float = DB_REPLICA_VENTANA_LECTURA_PROPIA,
+                 clave_firma: str = DB_REPLICA_CLAVE_FIRMA):
+        self.retraso_maximo = retraso_maximo
+        self.intervalo_comprobacion = intervalo_comprobacion
+        self.ventana_lectura_propia = ventana_lectura_propia
+        self._clave_firma = clave_firma.encode("utf-8")
+        self._lock = threading.Lock()
+        self._replicas = []
+        for url in urls_replicas:
+            # Cada réplica tiene su pool y sus métricas, separadas de las de la primaria
+            motor, metricas = crear_motor(url)
+            self._replicas.append({
+                "motor": motor,
+                "metricas": metricas,
+                "sesiones": sessionmaker(autocommit=False, autoflush=False, bind=motor),
+                "retraso": None,
+                "disponible": True,
+                "comprobada_en": 0.0,
+                "error": None
+            })
+        self._siguiente = 0
+        self._escrituras_recientes = {}
+        self.lecturas_replica = 0
+        self.lecturas_primaria = 0
+
+    def crear_sesion_lectura(self, clave_usuario=None, marca_escritura: str = None):
+        """
+        Crea una sesión para consultas de solo lectura. marca_escritura es
+        el valor de la cookie COOKIE_ULTIMA_ESCRITURA del cliente, si la trae.
+        """
+        propia = self._escribio_hace_poco(clave_usuario) or self._marca_vigente(clave_usuario, marca_escritura)
+        replica = None if propia else self._elegir_replica()
+        with self._lock:
+            if replica is None:
+                self.lecturas_primaria += 1
+                return SessionLocal()
+            self.lecturas_replica += 1
+        return replica["sesiones"]()
+
+    def registrar_escritura(self, clave_usuario, respuesta=None):
+        """
+        Anota que un usuario acaba de escribir: sus lecturas irán a la primaria
+        durante la ventana de lectura propia. Si se pasa la respuesta, la marca
+        se envía también al cliente en una cookie firmada.
+        """
+        if clave_usuario is None or not self._replicas:
+            return
+        if respuesta is not None:
+            respuesta.set_cookie(
+                key=COOKIE_ULTIMA_ESCRITURA,
+                value=self.firmar_escritura(clave_usuario, time.time()),
+                max_age=max(1, int(self.ventana_lectura_propia)),
+                httponly=True,
+                samesite="lax"
+            )
+        ahora = time.monotonic()
+        with self._lock:
+            self._escrituras_recientes[clave_usuario] = ahora
+            # Olvidar las marcas vencidas para que el diccionario no crezca
+            if len(self._escrituras_recientes) > 1000:
+                self._escrituras_recientes = {
+                    clave: momento for clave, momento in self._escrituras_recientes.items()
+                    if ahora - momento < self.ventana_lectura_propia
+                }
+
+    def firmar_escritura(self, clave_usuario, momento: float) -> str:
+        """
+        Valor de la cookie de última escritura: usuario, hora (epoch) y firma
+        """
+        contenido = f"{clave_usuario}:{momento:.3f}"
+        return f"{contenido}:{self._firma(contenido)}"
+
+    def obtener_estadisticas(self):
+        """
+        Estado de las réplicas y reparto de lecturas
+        """
+        with self._lock:
+            return {
+                "replicas": [
+                    {
+                        "url": replica["motor"].url.render_as_string(hide_password=True),
+                        "disponible": replica["disponible"],
+                        "retraso_segundos": replica["retraso"],
+                        "error": replica["error"],
+                        "pool": obtener_metricas_pool(replica["motor"], replica["metricas"])
+                    }
+                    for replica in self._replicas
+                ],
+                "retraso_maximo": self.retraso_maximo,
+                "lecturas_replica": self.lecturas_replica,
+                "lecturas_primaria": self.lecturas_primaria
+            }
+
+    def _escribio_hace_poco(self, clave_usuario) -> bool:
+        """El usuario escribió dentro de la ventana de lectura propia"""
+        if clave_usuario is None:
+            return False
+        with self._lock:
+            momento = self._escrituras_recientes.get(clave_usuario)
+        return momento is not None and time.monotonic() - momento < self.ventana_lectura_propia
+
+    def _marca_vigente(self, clave_usuario, marca_escritura: str) -> bool:
+        """La cookie es de este usuario, su firma es válida y está dentro de la ventana"""
+        if clave_usuario is None or not marca_escritura:
+            return False
+        try:
+            usuario, momento, firma = marca_escritura.rsplit(":", 2)
+            momento_escritura = float(momento)
+        except ValueError:
+            return False
+        if usuario != str(clave_usuario) or not hmac.compare_digest(firma, self._firma(f"{usuario}:{momento}")):
+            return False
+        # Se acepta un pequeño desfase de reloj entre servidores, no marcas del futuro lejano
+        return abs(time.time() - momento_escritura) < self.ventana_lectura_propia
+
+    def _firma(self, contenido: str) -> str:
+        """HMAC-SHA256 del contenido con la clave de firma"""
+        return hmac.new(self._clave_firma, contenido.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def _elegir_replica(self):
+        """Siguiente réplica disponible en turno rotatorio (None si no hay)"""
+        for _ in range(len(self._replicas)):
+            with self._lock:
+                replica = self._replicas[self._siguiente % len(self._replicas)]
+                self._siguiente += 1
+            self._comprobar(replica)
+            if replica["disponible"]:
+                return replica
+        return None
+
+    def _comprobar(self, replica):
+        """Mide el retraso de una réplica si la última medición ha caducado"""
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora - replica["comprobada_en"] < self.intervalo_comprobacion:
+                return
+            # Marcar antes de medir: las peticiones concurrentes usan el último estado
+            replica["comprobada_en"] = ahora
+
+        try:
+            retraso = medir_retraso(replica["motor"])
+            with self._lock:
+                replica["retraso"] = retraso
+                replica["disponible"] = retraso <= self.retraso_maximo
+                replica["error"] = None
+        except Exception as e:
+            with self._lock:
+                replica["retraso"] = None
+                replica["disponible"] = False
+                replica["error"] = str(e)
+
+# Instancia compartida por todo el proceso
+enrutador_lecturas = EnrutadorLecturas()
@@ -4,14 +4,53 @@ Autor: MiniMax Agent
 """
 
 from .auth import ControladorAutenticacion, hash_password, verify_password
+from .almacen_configuracion import AlmacenConfiguracion, almacen_configuracion
+from .cache_sesiones import CacheSesiones, cache_sesiones
+from .pool_acotado import PoolAcotado
+from .servicio_passwords import ServicioPasswords, servicio_passwords
+from .despachador_bd import DespachadorBD, despachador_bd
+from .motor_movimientos import MotorMovimientos
+from .motor_alertas import MotorAlertas
+from .evaluador_alertas import EvaluadorAlertas, evaluador_alertas
+from .estadisticas import MotorEstadisticas
+from .instantanea_inventario import InstantaneaInventario, instantanea_inventario
+from .servicio_qr import ServicioQR, servicio_qr, url_qr
+from .regeneracion_qr import RegeneradorQR, regenerador_qr
 from .producto import ControladorProductos
+from .graficos import ServicioGraficos, servicio_graficos
 from .reportes import ControladorAlertas, ControladorReportes
+from .trabajos_reportes import ColaReportes, cola_reportes
 
 __all__ = [
     "ControladorAutenticacion",
     "ControladorProductos", 
+    "MotorMovimientos",
+    "MotorAlertas",
+    "MotorEstadisticas",
     "ControladorAlertas",
     "ControladorReportes",
     "hash_password",
-    "verify_password"
+    "verify_password",
+    "CacheSesiones",
+    "cache_sesiones",
+    "ServicioPasswords",
+    "servicio_passwords",
+    "InstantaneaInventario",
+    "instantanea_inventario",
+    "ColaReportes",
+    "cola_reportes",
+    "ServicioGraficos",
+    "servicio_graficos",
+    "ServicioQR",
+    "servicio_qr",
+    "url_qr",
+    "RegeneradorQR",
+    "regenerador_qr",
+    "AlmacenConfiguracion",
+    "almacen_configuracion",
+    "PoolAcotado",
+    "DespachadorBD",
+    "despachador_bd",
+    "EvaluadorAlertas",
+    "evaluador_alertas"
 ]
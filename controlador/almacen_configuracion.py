@@ -0,0 +1,106 @@
+"""
+Almacén de Configuración en Memoria
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from sqlalchemy.orm import Session
+from modelo.configuracion import Configuracion, TipoConfiguracion
+from typing import Dict, Any
+import copy
+import os
+import threading
+import time
+
+# Segundos tras los que se vuelve a leer la tabla (convergencia entre workers)
+CONFIG_INTERVALO_RECARGA = float(os.getenv("CONFIG_INTERVALO_RECARGA", "5"))
+
+class AlmacenConfiguracion:
+    """
+    Valores tipados de la tabla configuraciones servidos desde memoria.
+
+    La tabla completa (unas decenas de filas) se carga de una vez y se
+    vuelve a leer cuando han pasado CONFIG_INTERVALO_RECARGA segundos, así
+    que los cambios hechos por otros workers se ven en ese plazo; los de
+    este proceso se escriben con establecer(), que invalida el almacén al
+    momento.
+    """
+
+    def __init__(self, intervalo_recarga: float = CONFIG_INTERVALO_RECARGA):
+        self.intervalo_recarga = intervalo_recarga
+        self._lock = threading.Lock()
+        self._valores = None
+        self._cargado_en = 0.0
+        self.aciertos = 0
+        self.recargas = 0
+
+    def obtener(self, db: Session, clave: str, valor_por_defecto=None):
+        """
+        Obtiene el valor tipado de una configuración
+        """
+        valores = self._valores_vigentes(db)
+        if clave not in valores:
+            return valor_por_defecto
+        return copy.deepcopy(valores[clave])
+
+    def obtener_por_prefijo(self, db: Session, prefijo: str) -> Dict[str, Any]:
+        """
+        Obtiene las configuraciones cuya clave empieza por el prefijo (sin él)
+        """
+        valores = self._valores_vigentes(db)
+        return {
+            clave[len(prefijo):]: copy.deepcopy(valor)
+            for clave, valor in valores.items()
+            if clave.startswith(prefijo)
+        }
+
+    def establecer(self, db: Session, clave: str, valor, tipo=TipoConfiguracion.STRING,
+                   descripcion: str = "", usuario_id: int = None) -> Configuracion:
+        """
+        Guarda una configuración y fuerza la recarga del almacén
+        """
+        config = Configuracion.establecer_configuracion(db, clave, valor, tipo, descripcion, usuario_id)
+        self.invalidar()
+        return config
+
+    def invalidar(self):
+        """
+        Fuerza una recarga en la próxima lectura
+        """
+        with self._lock:
+            self._cargado_en = 0.0
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del almacén
+        """
+        with self._lock:
+            return {
+                "claves": len(self._valores) if self._valores is not None else 0,
+                "intervalo_recarga": self.intervalo_recarga,
+                "aciertos": self.aciertos,
+                "recargas": self.recargas
+            }
+
+    def _valores_vigentes(self, db: Session) -> Dict[str, Any]:
+        """Valores en memoria, recargados si han caducado"""
+        with self._lock:
+            if self._valores is not None and time.monotonic() - self._cargado_en < self.intervalo_recarga:
+                self.aciertos += 1
+                return self._valores
+        return self._recargar(db)
+
+    def _recargar(self, db: Session) -> Dict[str, Any]:
+        """Lee toda la tabla"""
+        filas = db.query(Configuracion.clave, Configuracion.valor, Configuracion.tipo).all()
+        nuevos = {clave: Configuracion.convertir_valor(valor, tipo) for clave, valor, tipo in filas}
+
+        with self._lock:
+            self._valores = nuevos
+            self._cargado_en = time.monotonic()
+            self.recargas += 1
+
+        return nuevos
+
+# Instancia compartida por todo el proceso
+almacen_configuracion = AlmacenConfiguracion()
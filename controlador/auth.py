@@ -8,6 +8,9 @@ from sqlalchemy.orm import Session
 from modelo.usuario import Usuario, RolUsuario
 from modelo.sesion_usuario import SesionUsuario
 from config.database import obtener_sesion
+from controlador.cache_sesiones import cache_sesiones
+from controlador.servicio_passwords import servicio_passwords
+from controlador.despachador_bd import despachador_bd
 from datetime import datetime, timedelta
 import bcrypt
 import secrets
@@ -40,14 +43,15 @@ class ControladorAutenticacion:
     def __init__(self, db: Session):
         self.db = db
     
-    def registrar_usuario(self, email: str, password: str, nombre_completo: str, 
+    async def registrar_usuario(self, email: str, password: str, nombre_completo: str, 
                          rol: str = "operario") -> tuple[bool, str, Optional[Usuario]]:
         """
-        Registra un nuevo usuario en el sistema
+        Registra un nuevo usuario en el sistema.
+        Las consultas van al despachador de BD y el hash al pool de contraseñas.
         """
         try:
             # Verificar si el email ya existe
-            if self.db.query(Usuario).filter(Usuario.email == email).first():
+            if await despachador_bd.ejecutar(self._email_registrado, email):
                 return False, "El email ya está registrado", None
             
             # Validar rol
@@ -59,32 +63,28 @@ class ControladorAutenticacion:
             # Crear usuario
             usuario = Usuario(
                 email=email.lower().strip(),
-                password_hash=hash_password(password),
+                password_hash=await servicio_passwords.hash_password(password),
                 nombre_completo=nombre_completo.strip(),
                 rol=rol_enum
             )
             
-            self.db.add(usuario)
-            self.db.commit()
-            self.db.refresh(usuario)
+            await despachador_bd.ejecutar(self._guardar_usuario, usuario)
             
             return True, "Usuario registrado exitosamente", usuario
             
         except Exception as e:
-            self.db.rollback()
+            await despachador_bd.ejecutar(self.db.rollback)
             return False, f"Error al registrar usuario: {str(e)}", None
     
-    def autenticar_usuario(self, email: str, password: str, 
+    async def autenticar_usuario(self, email: str, password: str, 
                           ip_address: str = None, user_agent: str = None) -> tuple[bool, str, Optional[dict]]:
         """
-        Autentica un usuario y crea una sesión
+        Autentica un usuario y crea una sesión.
+        Las consultas van al despachador de BD y bcrypt al pool de contraseñas.
         """
         try:
             # Buscar usuario
-            usuario = self.db.query(Usuario).filter(
-                Usuario.email == email.lower().strip(),
-                Usuario.activo == True
-            ).first()
+            usuario = await despachador_bd.ejecutar(self._buscar_usuario_activo, email)
             
             if not usuario:
                 return False, "Credenciales inválidas", None
@@ -94,50 +94,83 @@ class ControladorAutenticacion:
                 return False, "Usuario temporalmente bloqueado por múltiples intentos fallidos", None
             
             # Verificar contraseña
-            if not verify_password(password, usuario.password_hash):
-                usuario.aumentar_intentos_fallidos()
-                self.db.commit()
+            if not await servicio_passwords.verify_password(password, usuario.password_hash):
+                await despachador_bd.ejecutar(self._registrar_intento_fallido, usuario)
                 return False, "Credenciales inválidas", None
             
-            # Reiniciar intentos fallidos y actualizar último acceso
-            usuario.reiniciar_intentos_fallidos()
-            
-            # Crear sesión
-            sesion = SesionUsuario.crear_sesion(
-                usuario_id=usuario.id_usuario,
-                ip_address=ip_address,
-                user_agent=user_agent
-            )
-            
-            self.db.add(sesion)
-            self.db.commit()
-            self.db.refresh(sesion)
-            
-            # Información de la sesión
-            info_sesion = {
-                "usuario": {
-                    "id": usuario.id_usuario,
-                    "email": usuario.email,
-                    "nombre_completo": usuario.nombre_completo,
-                    "rol": usuario.rol.value
-                },
-                "sesion": {
-                    "id": sesion.id_sesion,
-                    "fecha_creacion": sesion.fecha_creacion,
-                    "fecha_expiracion": sesion.fecha_expiracion
-                }
-            }
+            info_sesion = await despachador_bd.ejecutar(self._iniciar_sesion, usuario, ip_address, user_agent)
             
             return True, "Autenticación exitosa", info_sesion
             
         except Exception as e:
             return False, f"Error en la autenticación: {str(e)}", None
     
+    def _email_registrado(self, email: str) -> bool:
+        """Hay un usuario con ese email"""
+        return self.db.query(Usuario.id_usuario).filter(Usuario.email == email).first() is not None
+    
+    def _guardar_usuario(self, usuario: Usuario):
+        """Inserta un usuario nuevo"""
+        self.db.add(usuario)
+        self.db.commit()
+        self.db.refresh(usuario)
+    
+    def _buscar_usuario_activo(self, email: str) -> Optional[Usuario]:
+        """Usuario activo con ese email"""
+        return self.db.query(Usuario).filter(
+            Usuario.email == email.lower().strip(),
+            Usuario.activo == True
+        ).first()
+    
+    def _registrar_intento_fallido(self, usuario: Usuario):
+        """Cuenta un intento fallido y, si bloquea al usuario, invalida sus sesiones"""
+        usuario.aumentar_intentos_fallidos()
+        self.db.commit()
+        if usuario.esta_bloqueado():
+            # Tras el commit: las sesiones en caché no deben sobrevivir al bloqueo
+            cache_sesiones.invalidar_usuario(usuario.id_usuario)
+    
+    def _iniciar_sesion(self, usuario: Usuario, ip_address: str, user_agent: str) -> dict:
+        """Reinicia los intentos fallidos, crea la sesión y devuelve su información"""
+        # Reiniciar intentos fallidos y actualizar último acceso
+        usuario.reiniciar_intentos_fallidos()
+        
+        # Crear sesión
+        sesion = SesionUsuario.crear_sesion(
+            usuario_id=usuario.id_usuario,
+            ip_address=ip_address,
+            user_agent=user_agent
+        )
+        
+        self.db.add(sesion)
+        self.db.commit()
+        self.db.refresh(sesion)
+        
+        # Información de la sesión
+        return {
+            "usuario": {
+                "id": usuario.id_usuario,
+                "email": usuario.email,
+                "nombre_completo": usuario.nombre_completo,
+                "rol": usuario.rol.value
+            },
+            "sesion": {
+                "id": sesion.id_sesion,
+                "fecha_creacion": sesion.fecha_creacion,
+                "fecha_expiracion": sesion.fecha_expiracion
+            }
+        }
+    
     def validar_sesion(self, sesion_id: str) -> tuple[bool, str, Optional[Usuario]]:
         """
         Valida una sesión de usuario
         """
         try:
+            # Consultar primero la caché en memoria
+            usuario_cache = cache_sesiones.obtener(sesion_id)
+            if usuario_cache is not None and usuario_cache.puede_acceder():
+                return True, "Sesión válida", usuario_cache
+            
             # Buscar sesión activa
             sesion = self.db.query(SesionUsuario).filter(
                 SesionUsuario.id_sesion == sesion_id,
@@ -159,6 +192,8 @@ class ControladorAutenticacion:
             if not usuario or not usuario.puede_acceder():
                 return False, "Usuario no válido", None
             
+            cache_sesiones.guardar(sesion_id, usuario, sesion.fecha_expiracion)
+            
             return True, "Sesión válida", usuario
             
         except Exception as e:
@@ -176,8 +211,10 @@ class ControladorAutenticacion:
             if sesion:
                 sesion.terminar_sesion()
                 self.db.commit()
+                cache_sesiones.invalidar_sesion(sesion_id)
                 return True, "Sesión cerrada exitosamente"
             else:
+                cache_sesiones.invalidar_sesion(sesion_id)
                 return False, "Sesión no encontrada"
                 
         except Exception as e:
@@ -227,7 +264,7 @@ class ControladorAutenticacion:
         except Exception as e:
             return False, f"Error al solicitar recuperación: {str(e)}", None
     
-    def resetear_password(self, token: str, password_nuevo: str, password_confirmar: str) -> tuple[bool, str]:
+    async def resetear_password(self, token: str, password_nuevo: str, password_confirmar: str) -> tuple[bool, str]:
         """
         Resetea la contraseña usando un token
         """
@@ -239,27 +276,35 @@ class ControladorAutenticacion:
                 return False, "La contraseña debe tener al menos 6 caracteres"
             
             # Buscar usuario con token válido
-            usuario = self.db.query(Usuario).filter(
-                Usuario.token_recuperacion == token,
-                Usuario.token_expiracion > datetime.now()
-            ).first()
+            usuario = await despachador_bd.ejecutar(self._buscar_por_token, token)
             
             if not usuario:
                 return False, "Token inválido o expirado"
             
             # Actualizar contraseña
-            usuario.password_hash = hash_password(password_nuevo)
-            usuario.token_recuperacion = None
-            usuario.token_expiracion = None
-            usuario.reiniciar_intentos_fallidos()
-            
-            self.db.commit()
+            password_hash = await servicio_passwords.hash_password(password_nuevo)
+            await despachador_bd.ejecutar(self._establecer_password, usuario, password_hash)
             
             return True, "Contraseña reseteada exitosamente"
             
         except Exception as e:
             return False, f"Error al resetear contraseña: {str(e)}"
     
+    def _buscar_por_token(self, token: str) -> Optional[Usuario]:
+        """Usuario con ese token de recuperación vigente"""
+        return self.db.query(Usuario).filter(
+            Usuario.token_recuperacion == token,
+            Usuario.token_expiracion > datetime.now()
+        ).first()
+    
+    def _establecer_password(self, usuario: Usuario, password_hash: str):
+        """Guarda la nueva contraseña y anula el token de recuperación"""
+        usuario.password_hash = password_hash
+        usuario.token_recuperacion = None
+        usuario.token_expiracion = None
+        usuario.reiniciar_intentos_fallidos()
+        self.db.commit()
+    
     def listar_usuarios(self, rol: str = None, activo: bool = None) -> list[dict]:
         """
         Lista usuarios del sistema (solo administradores)
@@ -332,6 +377,7 @@ class ControladorAutenticacion:
                 sesion.terminar_sesion()
             
             self.db.commit()
+            cache_sesiones.invalidar_usuario(usuario_id)
             
             return True, "Usuario desactivado exitosamente"
             
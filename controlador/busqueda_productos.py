@@ -0,0 +1,122 @@
+"""
+Búsqueda de Productos
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, desc, select, union
+from sqlalchemy.dialects.mysql import match
+from modelo.producto import Producto
+import os
+import re
+import unicodedata
+
+# innodb_ft_min_token_size del servidor: las palabras más cortas no se indexan
+FULLTEXT_LONGITUD_MINIMA = int(os.getenv("FULLTEXT_LONGITUD_MINIMA", "3"))
+
+# Lista de palabras vacías por defecto de InnoDB (INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD)
+PALABRAS_VACIAS_FULLTEXT = frozenset({
+    "a", "about", "an", "are", "as", "at", "be", "by", "com", "de", "en", "for",
+    "from", "how", "i", "in", "is", "it", "la", "of", "on", "or", "that", "the",
+    "this", "to", "was", "what", "when", "where", "who", "will", "with", "und", "www"
+})
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Pasa el texto a minúsculas y elimina tildes y diéresis
+    """
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+def tokenizar(texto: str) -> list[str]:
+    """
+    Divide el texto normalizado en palabras (descarta operadores y signos)
+    """
+    return re.findall(r"\w+", normalizar_texto(texto))
+
+def separar_palabras(texto: str) -> tuple[list[str], list[str]]:
+    """
+    Separa las palabras que el índice FULLTEXT contiene de las demasiado
+    cortas para él; las palabras vacías se descartan
+    """
+    indexables, cortas = [], []
+    for palabra in tokenizar(texto):
+        if palabra in PALABRAS_VACIAS_FULLTEXT:
+            continue
+        (indexables if len(palabra) >= FULLTEXT_LONGITUD_MINIMA else cortas).append(palabra)
+    return indexables, cortas
+
+def escapar_like(texto: str) -> str:
+    """
+    Escapa los comodines de LIKE
+    """
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class BuscadorProductos:
+    """
+    Filtra y ordena productos por relevancia.
+
+    En MySQL usa el índice FULLTEXT ft_productos_busqueda en modo booleano
+    (prefijo por palabra) más un prefijo sobre codigo_producto que aprovecha
+    su índice; la colación utf8mb4_unicode_ci ignora tildes. Las palabras que
+    InnoDB no indexa (cortas o vacías) no se exigen en el MATCH: las cortas
+    se comprueban con LIKE sobre las filas encontradas y las vacías se
+    ignoran. Si no queda ninguna palabra indexable, y en otros motores, se
+    recurre a ILIKE sobre nombre, código y descripción.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.usa_fulltext = db.get_bind().dialect.name == "mysql"
+
+    def filtrar(self, query, busqueda: str):
+        """
+        Restringe la consulta a los productos que coinciden con la búsqueda
+        """
+        indexables, cortas = separar_palabras(busqueda)
+        if not self.usa_fulltext or not indexables:
+            return query.filter(self._contiene(busqueda.lower().strip()))
+
+        # Cada rama de la unión usa su propio índice (FULLTEXT y codigo_producto)
+        ids_coincidentes = union(
+            select(Producto.id_producto).where(self._coincide_codigo(busqueda)),
+            select(Producto.id_producto).where(
+                and_(self._relevancia(indexables), *[self._contiene(palabra) for palabra in cortas])
+            )
+        ).subquery()
+
+        return query.filter(Producto.id_producto.in_(select(ids_coincidentes.c.id_producto)))
+
+    def ordenar_por_relevancia(self, query, busqueda: str):
+        """
+        Ordena primero los códigos que empiezan por el término y luego por relevancia
+        """
+        indexables, _ = separar_palabras(busqueda)
+        if not self.usa_fulltext or not indexables:
+            return query.order_by(desc(self._coincide_codigo(busqueda)))
+
+        return query.order_by(desc(self._coincide_codigo(busqueda)), desc(self._relevancia(indexables)))
+
+    def _contiene(self, texto: str):
+        """ILIKE sobre nombre, código y descripción"""
+        patron = f"%{escapar_like(texto)}%"
+        return or_(
+            Producto.nombre_producto.ilike(patron, escape="\\"),
+            Producto.codigo_producto.ilike(patron, escape="\\"),
+            Producto.descripcion.ilike(patron, escape="\\")
+        )
+
+    def _coincide_codigo(self, busqueda: str):
+        """Los códigos se guardan en mayúsculas, así que el prefijo usa el índice"""
+        return Producto.codigo_producto.like(f"{escapar_like(busqueda.strip().upper())}%", escape="\\")
+
+    def _relevancia(self, palabras: list[str]):
+        """MATCH ... AGAINST en modo booleano: todas las palabras indexables, como prefijo"""
+        consulta = " ".join(f"+{palabra}*" for palabra in palabras)
+        return match(
+            Producto.nombre_producto,
+            Producto.codigo_producto,
+            Producto.descripcion,
+            against=consulta
+        ).in_boolean_mode()
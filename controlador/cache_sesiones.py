@@ -0,0 +1,155 @@
+"""
+Caché de Sesiones
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from modelo.usuario import Usuario
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any
+import os
+import threading
+import time
+
+# Configuración de la caché (segundos de vida y número máximo de sesiones)
+SESION_CACHE_TTL = int(os.getenv("SESION_CACHE_TTL", "60"))
+SESION_CACHE_MAX_ENTRADAS = int(os.getenv("SESION_CACHE_MAX_ENTRADAS", "10000"))
+
+# Columnas del usuario que se conservan en memoria (nunca hashes ni tokens)
+CAMPOS_USUARIO = (
+    "id_usuario", "email", "nombre_completo", "rol", "fecha_registro",
+    "ultimo_acceso", "activo", "intentos_fallidos", "bloqueado_hasta"
+)
+
+class CacheSesiones:
+    """
+    Caché LRU con expiración que asocia tokens de sesión con usuarios.
+
+    Cada proceso mantiene su propia copia, por lo que el TTL acota el tiempo
+    que una sesión cerrada desde otro worker puede seguir siendo aceptada.
+    """
+
+    def __init__(self, ttl_segundos: int = SESION_CACHE_TTL, max_entradas: int = SESION_CACHE_MAX_ENTRADAS):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # token -> (expira_en, datos del usuario)
+        self._sesiones_por_usuario = {}  # id_usuario -> set de tokens
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.invalidaciones = 0
+
+    def obtener(self, sesion_id: str) -> Optional[Usuario]:
+        """
+        Obtiene el usuario asociado a una sesión sin consultar la base de datos
+        """
+        if not sesion_id or self.ttl_segundos <= 0:
+            return None
+
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(sesion_id)
+
+            if entrada is None:
+                self.fallos += 1
+                return None
+
+            expira_en, datos_usuario = entrada
+            if ahora >= expira_en:
+                self._eliminar(sesion_id)
+                self.fallos += 1
+                return None
+
+            self._entradas.move_to_end(sesion_id)
+            self.aciertos += 1
+
+        # Copia transitoria: no pertenece a ninguna sesión de SQLAlchemy
+        return Usuario(**datos_usuario)
+
+    def guardar(self, sesion_id: str, usuario: Usuario, fecha_expiracion: datetime = None):
+        """
+        Guarda el usuario de una sesión válida respetando su fecha de expiración
+        """
+        if not sesion_id or self.ttl_segundos <= 0:
+            return
+
+        ttl = self.ttl_segundos
+        if fecha_expiracion:
+            ttl = min(ttl, (fecha_expiracion - datetime.now()).total_seconds())
+        if usuario.bloqueado_hasta:
+            ttl = min(ttl, (usuario.bloqueado_hasta - datetime.now()).total_seconds())
+        if ttl <= 0:
+            return
+
+        datos_usuario = {campo: getattr(usuario, campo) for campo in CAMPOS_USUARIO}
+
+        with self._lock:
+            self._eliminar(sesion_id)
+            self._entradas[sesion_id] = (time.monotonic() + ttl, datos_usuario)
+            self._sesiones_por_usuario.setdefault(usuario.id_usuario, set()).add(sesion_id)
+
+            while len(self._entradas) > self.max_entradas:
+                sesion_antigua = next(iter(self._entradas))
+                self._eliminar(sesion_antigua)
+                self.expulsiones += 1
+
+    def invalidar_sesion(self, sesion_id: str):
+        """
+        Elimina una sesión de la caché
+        """
+        with self._lock:
+            if self._eliminar(sesion_id):
+                self.invalidaciones += 1
+
+    def invalidar_usuario(self, usuario_id: int):
+        """
+        Elimina todas las sesiones en caché de un usuario
+        """
+        with self._lock:
+            for sesion_id in list(self._sesiones_por_usuario.get(usuario_id, ())):
+                if self._eliminar(sesion_id):
+                    self.invalidaciones += 1
+
+    def limpiar(self):
+        """
+        Vacía la caché por completo
+        """
+        with self._lock:
+            self._entradas.clear()
+            self._sesiones_por_usuario.clear()
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """
+        Obtiene los contadores de uso de la caché
+        """
+        with self._lock:
+            total_consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl_segundos,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / total_consultas if total_consultas else 0.0,
+                "expulsiones": self.expulsiones,
+                "invalidaciones": self.invalidaciones
+            }
+
+    def _eliminar(self, sesion_id: str) -> bool:
+        """Elimina una entrada (se debe llamar con el lock adquirido)"""
+        entrada = self._entradas.pop(sesion_id, None)
+        if entrada is None:
+            return False
+
+        usuario_id = entrada[1]["id_usuario"]
+        sesiones = self._sesiones_por_usuario.get(usuario_id)
+        if sesiones is not None:
+            sesiones.discard(sesion_id)
+            if not sesiones:
+                del self._sesiones_por_usuario[usuario_id]
+        return True
+
+# Instancia compartida por todo el proceso
+cache_sesiones = CacheSesiones()
@@ -0,0 +1,37 @@
+"""
+Despachador de Trabajo de Base de Datos
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from controlador.pool_acotado import PoolAcotado
+from config.database import DB_POOL_SIZE, DB_MAX_OVERFLOW
+import os
+
+# Hilos que ejecutan controladores a la vez; por defecto tantos como
+# conexiones puede dar el pool. Eso no evita que un hilo espere una conexión:
+# una petición puede tener abiertas a la vez su sesión de autenticación y la
+# de lectura, y el evaluador de alertas y la cola de reportes usan el mismo
+# pool, así que un checkout puede esperar hasta DB_POOL_TIMEOUT
+DB_MAX_HILOS = int(os.getenv("DB_MAX_HILOS", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+
+class DespachadorBD(PoolAcotado):
+    """
+    Ejecuta los controladores (SQLAlchemy síncrono) fuera del event loop.
+
+    Las rutas son async; si llamaran directamente a un controlador, una
+    consulta lenta bloquearía todas las peticiones del worker. Cada sesión
+    se usa desde un único hilo a la vez, así que pasarla al pool es seguro.
+    """
+
+    def __init__(self, max_hilos: int = DB_MAX_HILOS):
+        super().__init__(max_hilos, prefijo_hilos="bd")
+
+    async def ejecutar(self, funcion, *args, **kwargs):
+        """
+        Ejecuta una función bloqueante en el pool y devuelve su resultado
+        """
+        return await self._ejecutar(funcion, *args, **kwargs)
+
+# Instancia compartida por todo el proceso
+despachador_bd = DespachadorBD()
@@ -0,0 +1,179 @@
+"""
+Motor de Estadísticas de Inventario
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, case, and_, desc, true
+from modelo.producto import Producto
+from modelo.movimiento_inventario import MovimientoInventario
+from modelo.alerta_stock import AlertaStock, PrioridadAlerta
+from datetime import datetime, timedelta
+from typing import List, Dict, Any
+
+def _contar_si(condicion):
+    """SUM(CASE WHEN condicion THEN 1 ELSE 0 END)"""
+    return func.sum(case((condicion, 1), else_=0))
+
+class MotorEstadisticas:
+    """
+    Calcula los indicadores del inventario con agregados condicionales,
+    recorriendo productos, movimientos y alertas una sola vez cada uno
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _subconsulta_productos(self):
+        """Totales de productos activos en una sola pasada"""
+        return select(
+            func.count(Producto.id_producto).label("total_productos"),
+            _contar_si(Producto.stock_actual <= Producto.stock_minimo).label("productos_stock_bajo"),
+            _contar_si(Producto.stock_actual == 0).label("productos_agotados"),
+            func.sum(Producto.stock_actual * Producto.precio_compra).label("valor_total_inventario")
+        ).where(Producto.activo == True).subquery()
+
+    def _subconsulta_alertas(self):
+        """Totales de alertas en una sola pasada"""
+        return select(
+            func.count(AlertaStock.id_alerta).label("total_alertas"),
+            _contar_si(AlertaStock.resuelta == False).label("alertas_activas"),
+            _contar_si(and_(
+                AlertaStock.resuelta == False,
+                AlertaStock.prioridad == PrioridadAlerta.CRITICA
+            )).label("alertas_criticas")
+        ).subquery()
+
+    def _subconsulta_movimientos(self, desde: datetime):
+        """Movimientos registrados desde una fecha"""
+        return select(
+            func.count(MovimientoInventario.id_movimiento).label("movimientos_recientes")
+        ).where(MovimientoInventario.fecha_movimiento >= desde).subquery()
+
+    def estadisticas_productos(self) -> Dict[str, Any]:
+        """
+        Obtiene los totales de productos con una única consulta
+        """
+        fila = self.db.execute(select(self._subconsulta_productos())).one()
+        return self._formatear_productos(fila)
+
+    def resumen_general(self, dias_movimientos: int = 7) -> Dict[str, Any]:
+        """
+        Obtiene los totales de productos, movimientos y alertas con una única consulta
+        """
+        productos = self._subconsulta_productos()
+        alertas = self._subconsulta_alertas()
+        movimientos = self._subconsulta_movimientos(datetime.now() - timedelta(days=dias_movimientos))
+
+        fila = self.db.execute(
+            select(productos, alertas, movimientos).select_from(
+                productos.join(alertas, true()).join(movimientos, true())
+            )
+        ).one()
+
+        resumen = self._formatear_productos(fila)
+        resumen.update({
+            "movimientos_recientes": fila.movimientos_recientes or 0,
+            "total_alertas": fila.total_alertas or 0,
+            "alertas_activas": int(fila.alertas_activas or 0),
+            "alertas_criticas": int(fila.alertas_criticas or 0)
+        })
+        return resumen
+
+    def estadisticas_alertas(self, dias_vencida: float = 7) -> Dict[str, Any]:
+        """
+        Obtiene los totales de alertas con una única consulta agrupada por tipo.
+        Una alerta activa está vencida si se creó hace más de dias_vencida días
+        (mismo criterio que AlertaStock.esta_vencida, fracciones incluidas).
+        """
+        activa = AlertaStock.resuelta == False
+        filas = self.db.query(
+            AlertaStock.tipo_alerta,
+            func.count(AlertaStock.id_alerta).label("total"),
+            _contar_si(activa).label("activas"),
+            _contar_si(and_(activa, AlertaStock.prioridad == PrioridadAlerta.CRITICA)).label("criticas"),
+            _contar_si(and_(
+                activa,
+                AlertaStock.fecha_creacion < datetime.now() - timedelta(days=dias_vencida)
+            )).label("vencidas")
+        ).group_by(AlertaStock.tipo_alerta).all()
+
+        total_alertas = sum(fila.total for fila in filas)
+        alertas_activas = sum(int(fila.activas or 0) for fila in filas)
+
+        return {
+            "total_alertas": total_alertas,
+            "alertas_activas": alertas_activas,
+            "alertas_criticas": sum(int(fila.criticas or 0) for fila in filas),
+            "alertas_vencidas": sum(int(fila.vencidas or 0) for fila in filas),
+            "alertas_resueltas": total_alertas - alertas_activas,
+            "dias_vencida": dias_vencida,
+            "por_tipo": {
+                fila.tipo_alerta.value: int(fila.activas)
+                for fila in filas if fila.activas
+            }
+        }
+
+    def productos_mas_movidos(self, dias: int = 30, limite: int = 10) -> List[Dict[str, Any]]:
+        """
+        Obtiene los productos con más movimientos en el período
+        """
+        filas = self.db.query(
+            Producto.codigo_producto,
+            Producto.nombre_producto,
+            func.count(MovimientoInventario.id_movimiento).label('total_movimientos'),
+            func.sum(MovimientoInventario.cantidad).label('cantidad_total')
+        ).join(
+            MovimientoInventario, Producto.id_producto == MovimientoInventario.id_producto
+        ).filter(
+            MovimientoInventario.fecha_movimiento >= datetime.now() - timedelta(days=dias),
+            Producto.activo == True
+        ).group_by(
+            Producto.id_producto
+        ).order_by(
+            desc('total_movimientos')
+        ).limit(limite).all()
+
+        return [
+            {
+                "codigo": p[0],
+                "nombre": p[1],
+                "total_movimientos": p[2],
+                "cantidad_total": p[3]
+            }
+            for p in filas
+        ]
+
+    def productos_criticos(self, limite: int = 5) -> List[Dict[str, Any]]:
+        """
+        Obtiene los productos con menor stock por debajo del mínimo
+        """
+        filas = self.db.query(
+            Producto.codigo_producto,
+            Producto.nombre_producto,
+            Producto.stock_actual,
+            Producto.stock_minimo
+        ).filter(
+            Producto.activo == True,
+            Producto.stock_actual <= Producto.stock_minimo
+        ).order_by(Producto.stock_actual).limit(limite).all()
+
+        return [
+            {
+                "codigo": p.codigo_producto,
+                "nombre": p.nombre_producto,
+                "stock_actual": p.stock_actual,
+                "stock_minimo": p.stock_minimo
+            }
+            for p in filas
+        ]
+
+    def _formatear_productos(self, fila) -> Dict[str, Any]:
+        """Convierte los totales de productos a tipos nativos"""
+        return {
+            "total_productos": fila.total_productos or 0,
+            "productos_stock_bajo": int(fila.productos_stock_bajo or 0),
+            "productos_agotados": int(fila.productos_agotados or 0),
+            "valor_total_inventario": float(fila.valor_total_inventario or 0)
+        }
@@ -0,0 +1,29 @@
+"""
+Estrategias de Carga de Relaciones
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from sqlalchemy.orm import joinedload, contains_eager
+from modelo.producto import Producto
+from modelo.categoria import Categoria
+from modelo.proveedor import Proveedor
+from modelo.alerta_stock import AlertaStock
+from modelo.usuario import Usuario
+
+# Cada función devuelve las opciones de carga que necesita un tipo de listado
+# para resolver sus relaciones en la misma consulta (sin N+1 lazy loads).
+
+def opciones_producto_con_relaciones():
+    """Producto con el nombre de su categoría y proveedor"""
+    return (
+        joinedload(Producto.categoria).load_only(Categoria.nombre_categoria),
+        joinedload(Producto.proveedor).load_only(Proveedor.nombre_proveedor),
+    )
+
+def opciones_alerta_con_relaciones():
+    """Alerta con su producto (ya unido en la consulta) y su responsable"""
+    return (
+        contains_eager(AlertaStock.producto),
+        joinedload(AlertaStock.usuario_responsable).load_only(Usuario.nombre_completo),
+    )
@@ -0,0 +1,241 @@
+"""
+Evaluación de Alertas en Segundo Plano
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from sqlalchemy import or_
+from sqlalchemy.orm import load_only
+from config.database import SessionLocal
+from modelo.producto import Producto
+from modelo.alerta_stock import AlertaStock
+from controlador.almacen_configuracion import almacen_configuracion
+from controlador.motor_alertas import MotorAlertas, TIPOS_ALERTA_STOCK
+from controlador.instantanea_inventario import instantanea_inventario
+from typing import Iterable, List, Dict, Any
+import os
+import threading
+import time
+
+# Productos evaluados como máximo en cada transacción
+ALERTAS_TAMANO_LOTE = int(os.getenv("ALERTAS_TAMANO_LOTE", "500"))
+
+# Segundos que se acumulan eventos antes de evaluar (agrupa movimientos seguidos)
+ALERTAS_ESPERA_LOTE = float(os.getenv("ALERTAS_ESPERA_LOTE", "0.5"))
+
+# Segundos de espera antes de reintentar un lote que falló
+ALERTAS_ESPERA_REINTENTO = float(os.getenv("ALERTAS_ESPERA_REINTENTO", "5"))
+
+# Segundos entre barridos completos (recuperan eventos perdidos en un reinicio)
+ALERTAS_INTERVALO_BARRIDO = float(os.getenv("ALERTAS_INTERVALO_BARRIDO", "300"))
+
+class EvaluadorAlertas:
+    """
+    Evalúa las alertas de stock fuera de la transacción de los movimientos.
+
+    Tras el commit, los movimientos publican el id de los productos que
+    cambiaron; los ids se acumulan en un conjunto (varios movimientos del
+    mismo producto cuentan una vez) y un hilo los evalúa por lotes con
+    MotorAlertas, bloqueando las filas de los productos del lote; las
+    alertas abiertas de productos inactivos se resuelven. La cola vive en
+    memoria: lo que se pierda en un reinicio lo recupera el barrido
+    periódico de productos fuera de umbral o con alertas abiertas.
+    """
+
+    def __init__(self, tamano_lote: int = ALERTAS_TAMANO_LOTE,
+                 espera_lote: float = ALERTAS_ESPERA_LOTE,
+                 intervalo_barrido: float = ALERTAS_INTERVALO_BARRIDO):
+        self.tamano_lote = max(1, tamano_lote)
+        self.espera_lote = espera_lote
+        self.intervalo_barrido = intervalo_barrido
+        self._condicion = threading.Condition()
+        self._pendientes = set()
+        self._hilo = None
+        self._detener = False
+        self._ultimo_barrido = None
+        self.eventos = 0
+        self.lotes = 0
+        self.evaluados = 0
+        self.creadas = 0
+        self.escaladas = 0
+        self.resueltas = 0
+        self.barridos = 0
+        self.errores = 0
+        self.ultimo_error = None
+
+    def publicar(self, productos_ids: Iterable[int]):
+        """
+        Anota productos cuyo stock o umbral cambió
+        """
+        ids = {producto_id for producto_id in productos_ids if producto_id is not None}
+        if not ids:
+            return
+        with self._condicion:
+            self._pendientes.update(ids)
+            self.eventos += len(ids)
+            self._iniciar_hilo()
+            self._condicion.notify()
+
+    def iniciar(self):
+        """
+        Arranca el hilo consumidor (hace un barrido inicial)
+        """
+        with self._condicion:
+            self._iniciar_hilo()
+
+    def detener(self, espera: float = 5.0):
+        """
+        Evalúa lo pendiente y detiene el hilo consumidor
+        """
+        with self._condicion:
+            self._detener = True
+            self._condicion.notify()
+            hilo = self._hilo
+        if hilo:
+            hilo.join(espera)
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del evaluador
+        """
+        with self._condicion:
+            return {
+                "pendientes": len(self._pendientes),
+                "eventos": self.eventos,
+                "lotes": self.lotes,
+                "productos_evaluados": self.evaluados,
+                "alertas_creadas": self.creadas,
+                "alertas_escaladas": self.escaladas,
+                "alertas_resueltas": self.resueltas,
+                "barridos": self.barridos,
+                "errores": self.errores,
+                "ultimo_error": self.ultimo_error
+            }
+
+    def _iniciar_hilo(self):
+        """Crea el hilo consumidor si no está vivo (con la condición adquirida)"""
+        if self._hilo is None or not self._hilo.is_alive():
+            self._detener = False
+            self._hilo = threading.Thread(target=self._ejecutar, name="evaluador-alertas", daemon=True)
+            self._hilo.start()
+
+    def _ejecutar(self):
+        """Bucle del hilo consumidor"""
+        while True:
+            with self._condicion:
+                while not self._pendientes and not self._detener and not self._toca_barrido():
+                    self._condicion.wait(self._segundos_hasta_barrido())
+                if self._detener and not self._pendientes:
+                    return
+
+            if self._toca_barrido():
+                self._barrer()
+
+            # Dar tiempo a que lleguen más eventos y evaluarlos juntos
+            if not self._detener:
+                time.sleep(self.espera_lote)
+
+            while True:
+                with self._condicion:
+                    lote = sorted(self._pendientes)[:self.tamano_lote]
+                    self._pendientes.difference_update(lote)
+                if not lote:
+                    break
+                if not self._evaluar_lote(lote):
+                    with self._condicion:
+                        self._pendientes.update(lote)
+                        if self._detener:
+                            return
+                    time.sleep(ALERTAS_ESPERA_REINTENTO)
+                    break
+
+    def _toca_barrido(self) -> bool:
+        """Ha pasado el intervalo desde el último barrido"""
+        return self._ultimo_barrido is None or time.monotonic() - self._ultimo_barrido >= self.intervalo_barrido
+
+    def _segundos_hasta_barrido(self) -> float:
+        """Tiempo máximo que el hilo puede dormir"""
+        return max(0.0, self.intervalo_barrido - (time.monotonic() - (self._ultimo_barrido or 0.0)))
+
+    def _evaluar_lote(self, productos_ids: List[int]) -> bool:
+        """Evalúa un lote de productos en una transacción"""
+        db = SessionLocal()
+        try:
+            limite_exceso = almacen_configuracion.obtener(db, "inventario_limite_exceso")
+            # Ordenados por id y bloqueados: los workers no se pisan entre sí
+            productos = db.query(Producto).options(
+                load_only(Producto.id_producto, Producto.nombre_producto,
+                          Producto.stock_actual, Producto.stock_minimo)
+            ).filter(
+                Producto.id_producto.in_(productos_ids),
+                Producto.activo == True
+            ).order_by(Producto.id_producto).with_for_update().all()
+
+            motor = MotorAlertas(db, limite_exceso=limite_exceso)
+            cambios = motor.evaluar_productos(productos)
+
+            # Los productos inactivos no se evalúan: sus alertas abiertas se cierran
+            inactivos = set(productos_ids) - {producto.id_producto for producto in productos}
+            if inactivos:
+                resueltas = motor.resolver_alertas_productos(sorted(inactivos), "Producto inactivo")
+                for contador, valor in resueltas.items():
+                    cambios[contador] += valor
+            db.commit()
+
+            if cambios["activas"] or cambios["criticas"] or cambios["creadas"]:
+                instantanea_inventario.registrar_alertas(
+                    activas=cambios["activas"],
+                    criticas=cambios["criticas"],
+                    creadas=cambios["creadas"]
+                )
+
+            with self._condicion:
+                self.lotes += 1
+                self.evaluados += len(productos)
+                self.creadas += cambios["creadas"]
+                self.escaladas += cambios["escaladas"]
+                self.resueltas += cambios["resueltas"]
+            return True
+
+        except Exception as e:
+            db.rollback()
+            with self._condicion:
+                self.errores += 1
+                self.ultimo_error = str(e)
+            print(f"Error al evaluar alertas: {e}")
+            return False
+        finally:
+            db.close()
+
+    def _barrer(self):
+        """Encola los productos fuera de umbral o con alertas de stock abiertas"""
+        self._ultimo_barrido = time.monotonic()
+        db = SessionLocal()
+        try:
+            limite_exceso = almacen_configuracion.obtener(db, "inventario_limite_exceso")
+            fuera_de_umbral = [Producto.stock_actual <= Producto.stock_minimo]
+            if limite_exceso is not None:
+                fuera_de_umbral.append(Producto.stock_actual > limite_exceso)
+
+            ids = {fila[0] for fila in db.query(Producto.id_producto).filter(
+                Producto.activo == True, or_(*fuera_de_umbral)
+            )}
+            ids.update(fila[0] for fila in db.query(AlertaStock.id_producto).filter(
+                AlertaStock.resuelta == False,
+                AlertaStock.tipo_alerta.in_(TIPOS_ALERTA_STOCK)
+            ).distinct())
+
+            with self._condicion:
+                self._pendientes.update(ids)
+                self.barridos += 1
+
+        except Exception as e:
+            with self._condicion:
+                self.errores += 1
+                self.ultimo_error = str(e)
+            print(f"Error en el barrido de alertas: {e}")
+        finally:
+            db.close()
+
+# Instancia compartida por todo el proceso
+evaluador_alertas = EvaluadorAlertas()
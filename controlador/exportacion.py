@@ -0,0 +1,78 @@
+"""
+Exportación de Reportes en Streaming
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from typing import Iterable, Iterator, Dict, Any, Sequence, Callable
+import importlib
+import os
+
+# Filas que se piden a la base de datos por cada lote del cursor de servidor
+TAMANO_LOTE_EXPORTACION = int(os.getenv("TAMANO_LOTE_EXPORTACION", "1000"))
+
+# Tamaño de cada bloque de bytes enviado al cliente
+TAMANO_BLOQUE_EXPORTACION = 64 * 1024
+
+class Exportador:
+    """
+    Formato de exportación registrado.
+
+    El backend se indica como "modulo:funcion" y solo se importa la primera
+    vez que se exporta en ese formato, para que las librerías pesadas (como
+    openpyxl en controlador/exportacion_excel.py) no se carguen al arrancar
+    el proceso.
+    """
+
+    def __init__(self, formato: str, extension: str, mime_type: str, backend: str):
+        self.formato = formato
+        self.extension = extension
+        self.mime_type = mime_type
+        self.backend = backend
+        self._generador = None
+
+    def obtener_generador(self) -> Callable[[Sequence[str], Iterable[Dict[str, Any]]], Iterator[bytes]]:
+        """
+        Importa el backend si aún no se ha cargado y devuelve su generador
+        """
+        if self._generador is None:
+            modulo, funcion = self.backend.split(":")
+            self._generador = getattr(importlib.import_module(modulo), funcion)
+        return self._generador
+
+EXPORTADORES: Dict[str, Exportador] = {}
+
+def registrar_exportador(formato: str, extension: str, mime_type: str, backend: str):
+    """
+    Registra (o reemplaza) un formato de exportación
+    """
+    EXPORTADORES[formato.lower()] = Exportador(formato.lower(), extension, mime_type, backend)
+
+def obtener_exportador(formato: str) -> Exportador:
+    """
+    Obtiene el exportador de un formato; lanza ValueError si no está registrado
+    """
+    exportador = EXPORTADORES.get(formato.lower())
+    if exportador is None:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+    return exportador
+
+def exportar(formato: str, nombre_archivo: str, columnas: Sequence[str],
+             filas: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Prepara una exportación en streaming; lanza ValueError si el formato no existe
+    """
+    exportador = obtener_exportador(formato)
+
+    return {
+        "contenido": exportador.obtener_generador()(columnas, filas),
+        "nombre": f"{nombre_archivo}.{exportador.extension}",
+        "mime_type": exportador.mime_type
+    }
+
+registrar_exportador("csv", "csv", "text/csv; charset=utf-8", "controlador.exportacion_csv:generar_csv")
+registrar_exportador(
+    "excel", "xlsx",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "controlador.exportacion_excel:generar_excel"
+)
@@ -0,0 +1,28 @@
+"""
+Exportación CSV
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from typing import Iterable, Iterator, Dict, Any, Sequence
+from io import StringIO
+from controlador.exportacion import TAMANO_BLOQUE_EXPORTACION
+import csv
+
+def generar_csv(columnas: Sequence[str], filas: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Escribe las filas como CSV y las entrega en bloques de bytes
+    """
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columnas)
+    writer.writeheader()
+
+    for fila in filas:
+        writer.writerow(fila)
+        if buffer.tell() >= TAMANO_BLOQUE_EXPORTACION:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,33 @@
+"""
+Exportación Excel
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from typing import Iterable, Iterator, Dict, Any, Sequence
+from openpyxl import Workbook
+from controlador.exportacion import TAMANO_BLOQUE_EXPORTACION
+import tempfile
+
+def generar_excel(columnas: Sequence[str], filas: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Escribe las filas en un libro openpyxl de solo escritura y lo entrega en bloques.
+
+    En modo write_only openpyxl vuelca cada fila a un fichero temporal, así que
+    la memoria no crece con el número de filas; el .xlsx (un zip) solo puede
+    enviarse una vez cerrado, por eso se guarda en disco y se lee por bloques.
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(title="Datos")
+    hoja.append(list(columnas))
+    for fila in filas:
+        hoja.append([fila[columna] for columna in columnas])
+
+    with tempfile.TemporaryFile() as archivo:
+        libro.save(archivo)
+        archivo.seek(0)
+        while True:
+            bloque = archivo.read(TAMANO_BLOQUE_EXPORTACION)
+            if not bloque:
+                break
+            yield bloque
@@ -0,0 +1,241 @@
+"""
+Servicio de Gráficos
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from concurrent.futures import ProcessPoolExecutor, Future
+from collections import OrderedDict
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+from modelo.producto import Producto
+from modelo.categoria import Categoria
+from controlador.despachador_bd import despachador_bd
+from typing import Dict, Any
+import asyncio
+import hashlib
+import json
+import os
+import threading
+
+# Procesos dedicados a renderizar gráficos
+GRAFICOS_MAX_PROCESOS = int(os.getenv("GRAFICOS_MAX_PROCESOS", "1"))
+
+# Imágenes renderizadas que se conservan (por versión de datos y formato)
+GRAFICOS_CACHE_MAX_ENTRADAS = int(os.getenv("GRAFICOS_CACHE_MAX_ENTRADAS", "16"))
+
+# Resolución de los PNG
+GRAFICOS_DPI = int(os.getenv("GRAFICOS_DPI", "300"))
+
+FORMATOS_GRAFICO = {
+    "png": "image/png",
+    "svg": "image/svg+xml"
+}
+
+# Orden fijo de los estados de stock en el gráfico
+ESTADOS_STOCK = ["crítico", "bajo", "normal", "alto"]
+
+def datos_grafico_inventario(db: Session) -> Dict[str, Any]:
+    """
+    Obtiene con dos consultas agregadas los datos del gráfico de inventario:
+    productos por estado de stock (mismo criterio que Producto.calcular_estado_stock)
+    y productos por categoría
+    """
+    stock, minimo = Producto.stock_actual, Producto.stock_minimo
+    estado = case(
+        (stock <= minimo // 2, "crítico"),
+        (stock <= minimo, "bajo"),
+        (stock <= minimo * 2, "normal"),
+        else_="alto"
+    ).label("estado")
+
+    por_estado = dict(
+        db.query(estado, func.count(Producto.id_producto))
+        .filter(Producto.activo == True)
+        .group_by(estado)
+        .all()
+    )
+
+    por_categoria = db.query(
+        Categoria.nombre_categoria,
+        func.count(Producto.id_producto)
+    ).join(
+        Producto, Producto.id_categoria == Categoria.id_categoria
+    ).filter(
+        Producto.activo == True
+    ).group_by(
+        Categoria.id_categoria
+    ).order_by(Categoria.nombre_categoria).all()
+
+    return {
+        "estados": [[e, por_estado[e]] for e in ESTADOS_STOCK if por_estado.get(e)],
+        "categorias": [[nombre, total] for nombre, total in por_categoria]
+    }
+
+def normalizar_formato(formato: str) -> str:
+    """
+    Formato de gráfico en minúsculas; lanza ValueError si no está soportado
+    """
+    formato = (formato or "").lower()
+    if formato not in FORMATOS_GRAFICO:
+        raise ValueError(f"Formato de gráfico no soportado: {formato}")
+    return formato
+
+def version_datos(datos: Dict[str, Any]) -> str:
+    """
+    Sello de versión de los datos de un gráfico: si no cambia, la imagen tampoco
+    """
+    contenido = json.dumps(datos, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+def renderizar_grafico_inventario(datos: Dict[str, Any], formato: str = "png", dpi: int = GRAFICOS_DPI) -> bytes:
+    """
+    Dibuja el gráfico de inventario. Se ejecuta en un proceso del pool: usa
+    Figure directamente (sin el estado global de pyplot) y el backend Agg.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from io import BytesIO
+    import seaborn as sns
+
+    with matplotlib.style.context("seaborn-v0_8"), matplotlib.rc_context({
+        "font.sans-serif": ["Noto Sans CJK SC", "WenQuanYi Zen Hei", "PingFang SC", "Arial Unicode MS", "Hiragino Sans GB"],
+        "axes.unicode_minus": False
+    }):
+        fig = Figure(figsize=(15, 6))
+        ax1, ax2 = fig.subplots(1, 2)
+
+        # Gráfico de torta
+        estados = datos["estados"]
+        colores = ['#ff9999', '#ffcc99', '#99ff99', '#99ccff']
+        ax1.pie([total for _, total in estados], labels=[nombre for nombre, _ in estados],
+                autopct='%1.1f%%', colors=colores[:len(estados)])
+        ax1.set_title('Distribución de Estados de Stock')
+
+        # Gráfico de barras por categoría
+        categorias = datos["categorias"]
+        if categorias:
+            ax2.bar([nombre for nombre, _ in categorias], [total for _, total in categorias],
+                    color=sns.color_palette("husl", len(categorias)))
+            ax2.set_title('Productos por Categoría')
+            ax2.set_xlabel('Categoría')
+            ax2.set_ylabel('Número de Productos')
+            for etiqueta in ax2.get_xticklabels():
+                etiqueta.set_rotation(45)
+                etiqueta.set_ha('right')
+
+        fig.tight_layout()
+
+        buffer = BytesIO()
+        fig.savefig(buffer, format=formato, dpi=dpi, bbox_inches='tight')
+        return buffer.getvalue()
+
+class ServicioGraficos:
+    """
+    Renderiza gráficos en un pool de procesos y guarda el resultado por
+    versión de datos: mientras el inventario no cambie, un gráfico se sirve
+    desde memoria sin volver a dibujarse. Las peticiones simultáneas de la
+    misma imagen comparten un único renderizado.
+    """
+
+    def __init__(self, max_procesos: int = GRAFICOS_MAX_PROCESOS,
+                 max_entradas: int = GRAFICOS_CACHE_MAX_ENTRADAS):
+        self.max_procesos = max(1, max_procesos)
+        self.max_entradas = max_entradas
+        self._executor = None
+        self._lock = threading.Lock()
+        self._imagenes = OrderedDict()
+        self._en_curso = {}
+        self.aciertos = 0
+        self.renderizados = 0
+
+    def grafico_inventario(self, db: Session, formato: str = "png") -> Dict[str, Any]:
+        """
+        Obtiene el gráfico de inventario (espera al renderizado si hace falta)
+        """
+        formato = normalizar_formato(formato)
+        version, futuro = self._solicitar_inventario(db, formato)
+        return self._resultado(version, formato, futuro.result())
+
+    async def grafico_inventario_async(self, db: Session, formato: str = "png") -> Dict[str, Any]:
+        """
+        Obtiene el gráfico de inventario sin bloquear el event loop: la consulta
+        va al despachador de BD y el renderizado al pool de procesos
+        """
+        formato = normalizar_formato(formato)
+        version, futuro = await despachador_bd.ejecutar(self._solicitar_inventario, db, formato)
+        return self._resultado(version, formato, await asyncio.wrap_future(futuro))
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del servicio
+        """
+        with self._lock:
+            return {
+                "max_procesos": self.max_procesos,
+                "imagenes_en_cache": len(self._imagenes),
+                "renderizados_en_curso": len(self._en_curso),
+                "aciertos": self.aciertos,
+                "renderizados": self.renderizados
+            }
+
+    def cerrar(self):
+        """
+        Detiene el pool de procesos
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _solicitar_inventario(self, db: Session, formato: str) -> tuple[str, Future]:
+        """Versión de los datos actuales y futuro con su imagen (formato ya normalizado)"""
+        datos = datos_grafico_inventario(db)
+        version = version_datos(datos)
+        return version, self._futuro(("inventario", version, formato), renderizar_grafico_inventario, datos, formato)
+
+    def _futuro(self, clave: tuple, funcion, *args) -> Future:
+        """Futuro resuelto desde la caché, uno en curso o un renderizado nuevo"""
+        with self._lock:
+            if clave in self._imagenes:
+                self._imagenes.move_to_end(clave)
+                self.aciertos += 1
+                futuro = Future()
+                futuro.set_result(self._imagenes[clave])
+                return futuro
+
+            if clave in self._en_curso:
+                self.aciertos += 1
+                return self._en_curso[clave]
+
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_procesos)
+            futuro = self._executor.submit(funcion, *args)
+            self._en_curso[clave] = futuro
+            self.renderizados += 1
+
+        futuro.add_done_callback(lambda f: self._guardar(clave, f))
+        return futuro
+
+    def _guardar(self, clave: tuple, futuro: Future):
+        """Pasa un renderizado terminado a la caché"""
+        with self._lock:
+            self._en_curso.pop(clave, None)
+            if futuro.cancelled() or futuro.exception() is not None:
+                return
+            self._imagenes[clave] = futuro.result()
+            self._imagenes.move_to_end(clave)
+            while len(self._imagenes) > self.max_entradas:
+                self._imagenes.popitem(last=False)
+
+    def _resultado(self, version: str, formato: str, imagen: bytes) -> Dict[str, Any]:
+        """Respuesta con la imagen y su versión"""
+        return {
+            "imagen": imagen,
+            "formato": FORMATOS_GRAFICO[formato],
+            "version": version
+        }
+
+# Instancia compartida por todo el proceso
+servicio_graficos = ServicioGraficos()
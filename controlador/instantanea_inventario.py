@@ -0,0 +1,150 @@
+"""
+Instantánea de Estadísticas del Inventario
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from sqlalchemy.orm import Session
+from config.database import SessionLocal
+from controlador.estadisticas import MotorEstadisticas
+from typing import Optional, Dict, Any
+import asyncio
+import os
+import threading
+import time
+
+# Segundos entre reconciliaciones completas contra la base de datos
+INSTANTANEA_INTERVALO_RECONCILIACION = int(os.getenv("INSTANTANEA_INTERVALO_RECONCILIACION", "60"))
+
+def estado_producto(producto) -> tuple:
+    """
+    Extrae los campos de un producto que afectan a los contadores
+    """
+    return (
+        bool(producto.activo),
+        producto.stock_actual or 0,
+        producto.stock_minimo or 0,
+        float(producto.precio_compra or 0)
+    )
+
+def _aporte(estado: Optional[tuple]) -> tuple:
+    """Aporte de un producto a (total, stock bajo, agotados, valor)"""
+    if estado is None or not estado[0]:
+        return 0, 0, 0, 0.0
+    _, stock, minimo, precio = estado
+    return 1, int(stock <= minimo), int(stock == 0), stock * precio
+
+class InstantaneaInventario:
+    """
+    Contadores del dashboard mantenidos en memoria.
+
+    Las escrituras de este proceso aplican sus variaciones en cuanto hacen
+    commit; una reconciliación periódica con MotorEstadisticas corrige la
+    deriva y recoge los cambios hechos por otros workers. Las lecturas no
+    consultan la base de datos salvo la primera vez o tras invalidarla.
+    """
+
+    def __init__(self, intervalo_reconciliacion: int = INSTANTANEA_INTERVALO_RECONCILIACION):
+        self.intervalo_reconciliacion = intervalo_reconciliacion
+        self._lock = threading.Lock()
+        self._valores = None
+        self._ultima_reconciliacion = None
+        self.actualizaciones_incrementales = 0
+        self.reconciliaciones = 0
+
+    def obtener(self, db: Session) -> Dict[str, Any]:
+        """
+        Obtiene los contadores actuales (reconcilia si aún no hay instantánea)
+        """
+        with self._lock:
+            if self._valores is not None:
+                return dict(self._valores)
+        return self.reconciliar(db)
+
+    def reconciliar(self, db: Session) -> Dict[str, Any]:
+        """
+        Recalcula todos los contadores desde la base de datos
+        """
+        valores = MotorEstadisticas(db).resumen_general()
+        with self._lock:
+            self._valores = valores
+            self._ultima_reconciliacion = time.time()
+            self.reconciliaciones += 1
+            return dict(valores)
+
+    def invalidar(self):
+        """
+        Descarta la instantánea; la próxima lectura la recalcula
+        """
+        with self._lock:
+            self._valores = None
+
+    def registrar_cambio_producto(self, antes: Optional[tuple], despues: Optional[tuple]):
+        """
+        Aplica el cambio de un producto (None = no existía / ya no existe)
+        """
+        aporte_antes, aporte_despues = _aporte(antes), _aporte(despues)
+        self._sumar(
+            total_productos=aporte_despues[0] - aporte_antes[0],
+            productos_stock_bajo=aporte_despues[1] - aporte_antes[1],
+            productos_agotados=aporte_despues[2] - aporte_antes[2],
+            valor_total_inventario=aporte_despues[3] - aporte_antes[3]
+        )
+
+    def registrar_movimientos(self, cantidad: int = 1):
+        """
+        Suma movimientos recientes
+        """
+        self._sumar(movimientos_recientes=cantidad)
+
+    def registrar_alertas(self, activas: int = 0, criticas: int = 0, creadas: int = None):
+        """
+        Suma o resta alertas activas y críticas (creadas = alertas nuevas,
+        si difiere del saldo de activas)
+        """
+        total = creadas if creadas is not None else max(activas, 0)
+        self._sumar(total_alertas=total, alertas_activas=activas, alertas_criticas=criticas)
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """
+        Obtiene el estado de la instantánea
+        """
+        with self._lock:
+            return {
+                "cargada": self._valores is not None,
+                "ultima_reconciliacion": self._ultima_reconciliacion,
+                "intervalo_reconciliacion": self.intervalo_reconciliacion,
+                "actualizaciones_incrementales": self.actualizaciones_incrementales,
+                "reconciliaciones": self.reconciliaciones
+            }
+
+    async def ejecutar_reconciliacion_periodica(self):
+        """
+        Tarea en segundo plano que reconcilia la instantánea cada cierto intervalo
+        """
+        while True:
+            await asyncio.sleep(self.intervalo_reconciliacion)
+            try:
+                await asyncio.to_thread(self._reconciliar_con_sesion_propia)
+            except Exception as e:
+                print(f"Error al reconciliar estadísticas del inventario: {e}")
+
+    def _reconciliar_con_sesion_propia(self):
+        """Reconciliación con una sesión de base de datos independiente"""
+        db = SessionLocal()
+        try:
+            self.reconciliar(db)
+        finally:
+            db.close()
+
+    def _sumar(self, **variaciones):
+        """Aplica variaciones a los contadores si la instantánea está cargada"""
+        with self._lock:
+            if self._valores is None:
+                return
+            for clave, variacion in variaciones.items():
+                self._valores[clave] = self._valores.get(clave, 0) + variacion
+            self.actualizaciones_incrementales += 1
+
+# Instancia compartida por todo el proceso
+instantanea_inventario = InstantaneaInventario()
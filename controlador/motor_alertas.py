@@ -0,0 +1,152 @@
+"""
+Motor de Alertas de Stock
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.sql import func
+from modelo.producto import Producto
+from modelo.alerta_stock import AlertaStock, TipoAlerta, RANGO_PRIORIDAD
+from typing import List, Dict, Any
+
+# Tipos de alerta que el motor abre y cierra según el stock
+TIPOS_ALERTA_STOCK = (TipoAlerta.AGOTAMIENTO, TipoAlerta.STOCK_MINIMO, TipoAlerta.EXCESO)
+
+# Orden de las prioridades para decidir si una alerta se escala
+ORDEN_PRIORIDAD = RANGO_PRIORIDAD
+
+class MotorAlertas:
+    """
+    Mantiene como máximo una alerta abierta por (producto, tipo).
+
+    Se compara el stock de cada producto con sus alertas abiertas: si la
+    condición sigue vigente se reutiliza la alerta y solo se escala su
+    prioridad, si no existía se crea y si el stock se recuperó se resuelve.
+    Las alertas duplicadas de versiones anteriores se resuelven al pasar por
+    aquí. El motor no hace commit; el llamador debe tener bloqueadas las
+    filas de los productos para que dos transacciones no abran la misma
+    alerta. Sin limite_exceso no se evalúan las alertas de exceso.
+    """
+
+    def __init__(self, db: Session, limite_exceso: float = None):
+        self.db = db
+        self.limite_exceso = limite_exceso
+        self.tipos = TIPOS_ALERTA_STOCK if limite_exceso is not None else TIPOS_ALERTA_STOCK[:2]
+
+    def evaluar_productos(self, productos: List[Producto]) -> Dict[str, int]:
+        """
+        Actualiza las alertas de los productos con una sola consulta.
+        Devuelve los contadores de cambios y la variación de alertas
+        activas y críticas (para la instantánea del dashboard).
+        """
+        cambios = {"creadas": 0, "escaladas": 0, "resueltas": 0, "activas": 0, "criticas": 0}
+        if not productos:
+            return cambios
+
+        abiertas = {}
+        for alerta in self.db.query(AlertaStock).filter(
+            AlertaStock.id_producto.in_([p.id_producto for p in productos]),
+            AlertaStock.tipo_alerta.in_(self.tipos),
+            AlertaStock.resuelta == False
+        ).order_by(AlertaStock.id_alerta):
+            abiertas.setdefault((alerta.id_producto, alerta.tipo_alerta), []).append(alerta)
+
+        recuperadas, duplicadas = [], []
+        for producto in productos:
+            condiciones = self._condiciones_vigentes(producto)
+
+            for tipo in self.tipos:
+                existentes = abiertas.get((producto.id_producto, tipo), [])
+                vigente, crear = condiciones.get(tipo, (None, False))
+
+                if vigente is None:
+                    recuperadas.extend(existentes)
+                    continue
+
+                if not existentes:
+                    if crear:
+                        self.db.add(vigente)
+                        cambios["creadas"] += 1
+                        cambios["activas"] += 1
+                        cambios["criticas"] += int(vigente.es_critica())
+                    continue
+
+                # Se conserva la más antigua; el resto son duplicados
+                actual = existentes[0]
+                duplicadas.extend(existentes[1:])
+                if ORDEN_PRIORIDAD[vigente.prioridad] > ORDEN_PRIORIDAD.get(actual.prioridad, 0):
+                    cambios["criticas"] += int(vigente.es_critica()) - int(actual.es_critica())
+                    actual.prioridad = vigente.prioridad
+                    actual.mensaje = vigente.mensaje
+                    cambios["escaladas"] += 1
+
+        self._resolver(recuperadas, "Stock recuperado", cambios)
+        self._resolver(duplicadas, "Alerta duplicada", cambios)
+
+        return cambios
+
+    def resolver_alertas_productos(self, productos_ids: List[int], motivo: str) -> Dict[str, int]:
+        """
+        Resuelve las alertas de stock abiertas de productos que ya no se
+        evalúan (p. ej. desactivados)
+        """
+        cambios = {"creadas": 0, "escaladas": 0, "resueltas": 0, "activas": 0, "criticas": 0}
+        if not productos_ids:
+            return cambios
+
+        alertas = self.db.query(AlertaStock).filter(
+            AlertaStock.id_producto.in_(productos_ids),
+            AlertaStock.tipo_alerta.in_(TIPOS_ALERTA_STOCK),
+            AlertaStock.resuelta == False
+        ).order_by(AlertaStock.id_alerta).all()
+        self._resolver(alertas, motivo, cambios)
+        return cambios
+
+    def evaluar_producto(self, producto: Producto) -> Dict[str, int]:
+        """
+        Actualiza las alertas de un producto
+        """
+        return self.evaluar_productos([producto])
+
+    def _condiciones_vigentes(self, producto: Producto) -> Dict[Any, tuple]:
+        """
+        Alerta que corresponde a cada tipo según el stock actual y si debe
+        crearse cuando no hay una abierta (con stock cero solo se abre la de
+        agotamiento; la de stock mínimo, si ya existía, se escala)
+        """
+        condiciones = {}
+        if producto.stock_actual == 0:
+            condiciones[TipoAlerta.AGOTAMIENTO] = (AlertaStock.crear_alerta_agotamiento(producto), True)
+        if producto.necesita_alerta_stock():
+            condiciones[TipoAlerta.STOCK_MINIMO] = (
+                AlertaStock.crear_alerta_stock_minimo(producto), producto.stock_actual != 0
+            )
+        if self.limite_exceso is not None and producto.stock_actual > self.limite_exceso:
+            condiciones[TipoAlerta.EXCESO] = (AlertaStock.crear_alerta_exceso(producto, self.limite_exceso), True)
+        return condiciones
+
+    def _resolver(self, alertas: List[AlertaStock], motivo: str, cambios: Dict[str, int]):
+        """Resuelve alertas abiertas con un único UPDATE"""
+        if not alertas:
+            return
+
+        criticas = sum(1 for a in alertas if a.es_critica())
+        self.db.execute(
+            update(AlertaStock)
+            .where(AlertaStock.id_alerta.in_([a.id_alerta for a in alertas]))
+            .values(
+                resuelta=True,
+                fecha_resolucion=func.current_timestamp(),
+                mensaje=AlertaStock.mensaje + f"\n[RESUELTO] {motivo}"
+            )
+            .execution_options(synchronize_session=False)
+        )
+        for alerta in alertas:
+            # Reflejar el cambio en las instancias de la sesión
+            self.db.expire(alerta)
+
+        cambios["resueltas"] += len(alertas)
+        cambios["activas"] -= len(alertas)
+        cambios["criticas"] -= criticas
@@ -0,0 +1,258 @@
+"""
+Motor de Movimientos de Inventario
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import update, insert
+from modelo.producto import Producto
+from modelo.movimiento_inventario import MovimientoInventario, TipoMovimiento
+from typing import List, Optional, Dict, Any
+
+# Tipos de movimiento que suman o restan stock
+TIPOS_ENTRADA = (TipoMovimiento.ENTRADA, TipoMovimiento.DEVOLUCION)
+TIPOS_SALIDA = (TipoMovimiento.SALIDA, TipoMovimiento.PERDIDA)
+
+class MotorMovimientos:
+    """
+    Aplica movimientos de stock de forma atómica en la base de datos.
+
+    Las variaciones se aplican con un único UPDATE condicional
+    (stock_actual = stock_actual - n WHERE stock_actual >= n) y los ajustes
+    absolutos bloquean la fila con SELECT ... FOR UPDATE. El motor no hace
+    commit: el movimiento queda en la misma transacción que el llamador
+    confirma una sola vez.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def registrar_movimiento(self, producto_id: int, tipo_movimiento, cantidad: int, motivo: str = "",
+                             usuario_id: int = None, costo_unitario: float = None) -> tuple[Producto, MovimientoInventario]:
+        """
+        Aplica una entrada, salida, devolución o pérdida.
+        Lanza ValueError si el movimiento no es válido.
+        """
+        tipo_movimiento = TipoMovimiento(tipo_movimiento)
+
+        if tipo_movimiento == TipoMovimiento.AJUSTE:
+            raise ValueError("Los ajustes deben registrarse con ajustar_stock")
+
+        if cantidad <= 0:
+            raise ValueError("La cantidad debe ser mayor a cero")
+
+        delta = cantidad if tipo_movimiento in TIPOS_ENTRADA else -cantidad
+
+        valores = {"stock_actual": Producto.stock_actual + delta}
+        if tipo_movimiento == TipoMovimiento.ENTRADA and costo_unitario and costo_unitario > 0:
+            valores["precio_compra"] = costo_unitario
+
+        condiciones = [Producto.id_producto == producto_id, Producto.activo == True]
+        if delta < 0:
+            condiciones.append(Producto.stock_actual >= cantidad)
+
+        resultado = self.db.execute(
+            update(Producto)
+            .where(*condiciones)
+            .values(**valores)
+            .execution_options(synchronize_session=False)
+        )
+
+        # La fila queda bloqueada por el UPDATE hasta el commit, así que la
+        # lectura posterior ve exactamente el stock que dejó este movimiento
+        producto = self._obtener_producto(producto_id)
+
+        if resultado.rowcount == 0:
+            if not producto:
+                raise ValueError("Producto no encontrado")
+            raise ValueError(f"Stock insuficiente. Disponible: {producto.stock_actual}")
+
+        movimiento = self.crear_movimiento(
+            producto_id=producto_id,
+            tipo_movimiento=tipo_movimiento,
+            cantidad=cantidad,
+            cantidad_anterior=producto.stock_actual - delta,
+            cantidad_nueva=producto.stock_actual,
+            motivo=motivo,
+            usuario_id=usuario_id,
+            costo_unitario=costo_unitario
+        )
+
+        return producto, movimiento
+
+    def ajustar_stock(self, producto_id: int, nuevo_stock: int, motivo: str = "",
+                      usuario_id: int = None) -> tuple[Producto, MovimientoInventario]:
+        """
+        Fija el stock de un producto a un valor absoluto bloqueando la fila.
+        Lanza ValueError si el ajuste no es válido.
+        """
+        if nuevo_stock < 0:
+            raise ValueError("El stock no puede ser negativo")
+
+        producto = self._obtener_producto(producto_id, bloquear=True)
+
+        if not producto:
+            raise ValueError("Producto no encontrado")
+
+        stock_anterior = producto.stock_actual
+        producto.stock_actual = nuevo_stock
+
+        movimiento = self.crear_movimiento(
+            producto_id=producto_id,
+            tipo_movimiento=TipoMovimiento.AJUSTE,
+            cantidad=abs(nuevo_stock - stock_anterior),
+            cantidad_anterior=stock_anterior,
+            cantidad_nueva=nuevo_stock,
+            motivo=motivo,
+            usuario_id=usuario_id
+        )
+
+        return producto, movimiento
+
+    def crear_movimiento(self, producto_id: int, tipo_movimiento: TipoMovimiento, cantidad: int,
+                         cantidad_anterior: int, cantidad_nueva: int, motivo: str = "",
+                         usuario_id: int = None, costo_unitario: float = None) -> MovimientoInventario:
+        """
+        Agrega el registro del movimiento a la transacción actual
+        """
+        movimiento = MovimientoInventario(
+            id_producto=producto_id,
+            id_usuario=usuario_id,
+            tipo_movimiento=tipo_movimiento,
+            cantidad=cantidad,
+            cantidad_anterior=cantidad_anterior,
+            cantidad_nueva=cantidad_nueva,
+            motivo=motivo,
+            costo_unitario=costo_unitario
+        )
+        self.db.add(movimiento)
+        return movimiento
+
+    def registrar_lote(self, lineas: List[Dict[str, Any]],
+                       usuario_id: int = None) -> tuple[List[Dict[str, Any]], List[Producto]]:
+        """
+        Aplica un lote de movimientos con un SELECT ... FOR UPDATE de todos los
+        productos, UPDATEs agrupados y un INSERT masivo de movimientos.
+        Devuelve el resultado de cada línea y los productos modificados.
+        """
+        resultados = [None] * len(lineas)
+        lineas_validas = []
+
+        for indice, linea in enumerate(lineas):
+            try:
+                lineas_validas.append((indice,) + self._validar_linea(linea))
+            except ValueError as e:
+                resultados[indice] = {"linea": indice, "exito": False, "mensaje": str(e)}
+
+        # Bloquear los productos en orden de id para evitar interbloqueos
+        ids_productos = sorted({linea[1] for linea in lineas_validas})
+        productos = {}
+        if ids_productos:
+            productos = {
+                producto.id_producto: producto
+                for producto in self.db.query(Producto).populate_existing().filter(
+                    Producto.id_producto.in_(ids_productos),
+                    Producto.activo == True
+                ).order_by(Producto.id_producto).with_for_update().all()
+            }
+
+        filas_movimientos = []
+        productos_modificados = {}
+
+        for indice, producto_id, tipo_movimiento, cantidad, motivo, costo_unitario in lineas_validas:
+            producto = productos.get(producto_id)
+
+            if not producto:
+                resultados[indice] = {"linea": indice, "exito": False, "mensaje": "Producto no encontrado"}
+                continue
+
+            stock_anterior = producto.stock_actual
+
+            if tipo_movimiento == TipoMovimiento.AJUSTE:
+                stock_nuevo = cantidad
+                cantidad = abs(stock_nuevo - stock_anterior)
+            elif tipo_movimiento in TIPOS_ENTRADA:
+                stock_nuevo = stock_anterior + cantidad
+            elif stock_anterior < cantidad:
+                resultados[indice] = {
+                    "linea": indice,
+                    "exito": False,
+                    "mensaje": f"Stock insuficiente. Disponible: {stock_anterior}"
+                }
+                continue
+            else:
+                stock_nuevo = stock_anterior - cantidad
+
+            producto.stock_actual = stock_nuevo
+            if tipo_movimiento == TipoMovimiento.ENTRADA and costo_unitario and costo_unitario > 0:
+                producto.precio_compra = costo_unitario
+
+            filas_movimientos.append({
+                "id_producto": producto_id,
+                "id_usuario": usuario_id,
+                "tipo_movimiento": tipo_movimiento,
+                "cantidad": cantidad,
+                "cantidad_anterior": stock_anterior,
+                "cantidad_nueva": stock_nuevo,
+                "motivo": motivo,
+                "costo_unitario": costo_unitario
+            })
+            productos_modificados[producto_id] = producto
+
+            resultados[indice] = {
+                "linea": indice,
+                "exito": True,
+                "mensaje": "Movimiento registrado",
+                "producto_id": producto_id,
+                "stock_nuevo": stock_nuevo
+            }
+
+        if filas_movimientos:
+            # Un UPDATE por producto (agrupados por el flush) y un INSERT masivo
+            self.db.flush()
+            self.db.execute(insert(MovimientoInventario), filas_movimientos)
+
+        return resultados, list(productos_modificados.values())
+
+    def _validar_linea(self, linea: Dict[str, Any]) -> tuple:
+        """Valida una línea de lote y la normaliza"""
+        if not isinstance(linea, dict):
+            raise ValueError("Formato de línea inválido")
+
+        try:
+            tipo_movimiento = TipoMovimiento(linea.get("tipo_movimiento"))
+        except ValueError:
+            raise ValueError(f"Tipo de movimiento inválido: {linea.get('tipo_movimiento')}")
+
+        campo_cantidad = "nuevo_stock" if tipo_movimiento == TipoMovimiento.AJUSTE else "cantidad"
+
+        try:
+            producto_id = int(linea["producto_id"])
+            cantidad = int(linea[campo_cantidad])
+            costo_unitario = linea.get("costo_unitario")
+            costo_unitario = float(costo_unitario) if costo_unitario is not None else None
+        except KeyError as e:
+            raise ValueError(f"Falta el campo {e.args[0]}")
+        except (TypeError, ValueError):
+            raise ValueError("Valores numéricos inválidos")
+
+        if tipo_movimiento == TipoMovimiento.AJUSTE:
+            if cantidad < 0:
+                raise ValueError("El stock no puede ser negativo")
+        elif cantidad <= 0:
+            raise ValueError("La cantidad debe ser mayor a cero")
+
+        return producto_id, tipo_movimiento, cantidad, linea.get("motivo", ""), costo_unitario
+
+    def _obtener_producto(self, producto_id: int, bloquear: bool = False) -> Optional[Producto]:
+        """Lee el producto desde la base de datos ignorando la copia en sesión"""
+        query = self.db.query(Producto).populate_existing().filter(
+            Producto.id_producto == producto_id,
+            Producto.activo == True
+        )
+
+        if bloquear:
+            query = query.with_for_update()
+
+        return query.first()
@@ -0,0 +1,92 @@
+"""
+Paginación por Cursor (Keyset)
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from sqlalchemy import and_, or_, asc, desc, DateTime
+from datetime import datetime
+from typing import List, Optional, Any
+import base64
+import enum
+import json
+
+# Un orden keyset es una lista de (columna, descendente); la última columna
+# debe ser única (la clave primaria) para que el cursor sea estable. Una
+# columna puede ser una hybrid_property cuyo valor en Python coincida con su
+# expresión SQL (p. ej. AlertaStock.rango_prioridad).
+
+def aplicar_orden(query, orden):
+    """
+    Ordena la consulta según las columnas del keyset
+    """
+    return query.order_by(*[desc(columna) if descendente else asc(columna) for columna, descendente in orden])
+
+def aplicar_cursor(query, orden, cursor: str = None):
+    """
+    Filtra la consulta para devolver solo las filas posteriores al cursor
+    """
+    if not cursor:
+        return query
+
+    valores = decodificar_cursor(cursor, orden)
+    condiciones = []
+    for i, (columna, descendente) in enumerate(orden):
+        iguales = [orden[j][0] == valores[j] for j in range(i)]
+        posterior = columna < valores[i] if descendente else columna > valores[i]
+        condiciones.append(and_(*iguales, posterior))
+
+    return query.filter(or_(*condiciones))
+
+def obtener_pagina(query, orden, limite: int) -> tuple[List[Any], Optional[str]]:
+    """
+    Obtiene una página y el cursor de la siguiente (None si no hay más filas)
+    """
+    filas = query.limit(limite + 1).all()
+
+    siguiente_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente_cursor = codificar_cursor(orden, filas[-1])
+
+    return filas, siguiente_cursor
+
+def codificar_cursor(orden, fila) -> str:
+    """
+    Genera un cursor opaco con los valores de orden de una fila
+    """
+    valores = [_serializar_valor(getattr(fila, columna.key)) for columna, _ in orden]
+    datos = json.dumps(valores, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(datos).decode("ascii").rstrip("=")
+
+def decodificar_cursor(cursor: str, orden) -> list:
+    """
+    Recupera los valores de orden de un cursor; lanza ValueError si no es válido
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != len(orden):
+            raise ValueError
+        return [_deserializar_valor(columna, valor) for (columna, _), valor in zip(orden, valores)]
+    except (ValueError, TypeError):
+        raise ValueError("Cursor de paginación inválido")
+
+def _serializar_valor(valor):
+    """Convierte un valor de columna a un tipo compatible con JSON"""
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, enum.Enum):
+        return valor.value
+    return valor
+
+def _deserializar_valor(columna, valor):
+    """Restaura el tipo original de un valor según su columna"""
+    if valor is None:
+        return None
+    if isinstance(columna.type, DateTime):
+        return datetime.fromisoformat(valor)
+    clase_enum = getattr(columna.type, "enum_class", None)
+    if clase_enum is not None:
+        return clase_enum(valor)
+    return valor
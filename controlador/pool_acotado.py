@@ -0,0 +1,110 @@
+"""
+Pool de Hilos Acotado con Métricas
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any
+import asyncio
+import functools
+import threading
+import time
+
+class PoolAcotado:
+    """
+    Ejecuta funciones bloqueantes en un pool de hilos de tamaño fijo sin
+    bloquear el event loop, midiendo la espera en cola y la ejecución.
+    Las llamadas que superan la concurrencia máxima esperan en la cola.
+    """
+
+    def __init__(self, max_concurrencia: int, prefijo_hilos: str):
+        self.max_concurrencia = max(1, max_concurrencia)
+        self.prefijo_hilos = prefijo_hilos
+        self._executor = None
+        self._lock = threading.Lock()
+        self.en_cola = 0
+        self.en_ejecucion = 0
+        self.max_en_cola = 0
+        self.completadas = 0
+        self.tiempo_espera_total = 0.0
+        self.tiempo_espera_maximo = 0.0
+        self.tiempo_ejecucion_total = 0.0
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas de cola y ejecución del pool
+        """
+        with self._lock:
+            return {
+                "max_concurrencia": self.max_concurrencia,
+                "en_cola": self.en_cola,
+                "en_ejecucion": self.en_ejecucion,
+                "max_en_cola": self.max_en_cola,
+                "completadas": self.completadas,
+                "espera_promedio_ms": (self.tiempo_espera_total / self.completadas * 1000) if self.completadas else 0.0,
+                "espera_maxima_ms": self.tiempo_espera_maximo * 1000,
+                "ejecucion_promedio_ms": (self.tiempo_ejecucion_total / self.completadas * 1000) if self.completadas else 0.0
+            }
+
+    def cerrar(self):
+        """
+        Detiene el pool de trabajo
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False)
+
+    def _obtener_executor(self) -> ThreadPoolExecutor:
+        """Crea el pool de trabajo la primera vez que se necesita"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrencia,
+                    thread_name_prefix=self.prefijo_hilos
+                )
+            return self._executor
+
+    async def _ejecutar(self, funcion, *args, **kwargs):
+        """Envía una función al pool registrando el tiempo en cola"""
+        if kwargs:
+            funcion = functools.partial(funcion, **kwargs)
+
+        encolado = time.monotonic()
+        estado = {"fuera_de_cola": False}
+        with self._lock:
+            self.en_cola += 1
+            self.max_en_cola = max(self.max_en_cola, self.en_cola)
+
+        def salir_de_cola() -> bool:
+            # Se llama con el lock adquirido; evita descontar dos veces
+            if estado["fuera_de_cola"]:
+                return False
+            estado["fuera_de_cola"] = True
+            self.en_cola -= 1
+            return True
+
+        def tarea():
+            inicio = time.monotonic()
+            espera = inicio - encolado
+            with self._lock:
+                salir_de_cola()
+                self.en_ejecucion += 1
+                self.tiempo_espera_total += espera
+                self.tiempo_espera_maximo = max(self.tiempo_espera_maximo, espera)
+            try:
+                return funcion(*args)
+            finally:
+                with self._lock:
+                    self.en_ejecucion -= 1
+                    self.completadas += 1
+                    self.tiempo_ejecucion_total += time.monotonic() - inicio
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._obtener_executor(), tarea)
+        finally:
+            # Si la petición se canceló antes de ejecutarse, liberar su lugar en la cola
+            with self._lock:
+                salir_de_cola()
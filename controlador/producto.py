@@ -9,14 +9,25 @@ from sqlalchemy import and_, or_, desc, asc, func
 from modelo.producto import Producto
 from modelo.categoria import Categoria
 from modelo.proveedor import Proveedor
-from modelo.movimiento_inventario import MovimientoInventario
-from modelo.alerta_stock import AlertaStock, TipoAlerta, PrioridadAlerta
-from modelo.configuracion import Configuracion
+from modelo.movimiento_inventario import MovimientoInventario, TipoMovimiento
+from modelo.usuario import Usuario
+from controlador.motor_movimientos import MotorMovimientos
+from controlador.evaluador_alertas import evaluador_alertas
+from controlador.estrategias_carga import opciones_producto_con_relaciones
+from controlador.paginacion import aplicar_orden, aplicar_cursor, obtener_pagina
+from controlador.busqueda_productos import BuscadorProductos
+from controlador.estadisticas import MotorEstadisticas
+from controlador.instantanea_inventario import instantanea_inventario, estado_producto
+from controlador.servicio_qr import servicio_qr, url_qr
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
-import qrcode
-from io import BytesIO
-import base64
+
+# Número máximo de líneas aceptadas en un lote de movimientos
+MAX_LINEAS_LOTE = 5000
+
+# Orden keyset de los listados (la última columna es la clave primaria)
+ORDEN_PRODUCTOS = [(Producto.nombre_producto, False), (Producto.id_producto, False)]
+ORDEN_MOVIMIENTOS = [(MovimientoInventario.fecha_movimiento, True), (MovimientoInventario.id_movimiento, True)]
 
 class ControladorProductos:
     """
@@ -65,22 +76,34 @@ class ControladorProductos:
                 dimensiones=dimensiones.strip() if dimensiones else None
             )
             
-            # Generar código QR
-            producto.generar_codigo_qr()
+            # Generar código QR con la URL base configurada
+            producto.generar_codigo_qr(servicio_qr.obtener_base_url(self.db))
             
             self.db.add(producto)
-            self.db.commit()
-            self.db.refresh(producto)
+            self.db.flush()
             
-            # Registrar movimiento inicial si hay stock
-            if stock_inicial > 0:
-                self.registrar_entrada(
+            # Registrar movimiento inicial si hay stock (misma transacción)
+            if producto.stock_actual > 0:
+                MotorMovimientos(self.db).crear_movimiento(
                     producto_id=producto.id_producto,
-                    cantidad=stock_inicial,
+                    tipo_movimiento=TipoMovimiento.ENTRADA,
+                    cantidad=producto.stock_actual,
+                    cantidad_anterior=0,
+                    cantidad_nueva=producto.stock_actual,
                     motivo="Stock inicial",
                     usuario_id=usuario_id
                 )
             
+            estado_nuevo = estado_producto(producto)
+            
+            self.db.commit()
+            self.db.refresh(producto)
+            
+            instantanea_inventario.registrar_cambio_producto(None, estado_nuevo)
+            if estado_nuevo[1] > 0:
+                instantanea_inventario.registrar_movimientos(1)
+            evaluador_alertas.publicar([producto.id_producto])
+            
             return True, "Producto creado exitosamente", producto
             
         except Exception as e:
@@ -91,7 +114,9 @@ class ControladorProductos:
         """
         Obtiene un producto por ID o código
         """
-        query = self.db.query(Producto).filter(Producto.activo == True)
+        query = self.db.query(Producto).options(
+            *opciones_producto_con_relaciones()
+        ).filter(Producto.activo == True)
         
         if producto_id:
             return query.filter(Producto.id_producto == producto_id).first()
@@ -102,23 +127,21 @@ class ControladorProductos:
     
     def listar_productos(self, busqueda: str = "", categoria_id: int = None, 
                         proveedor_id: int = None, solo_stock_bajo: bool = False,
-                        pagina: int = 1, elementos_por_pagina: int = 20) -> Dict[str, Any]:
+                        pagina: int = 1, elementos_por_pagina: int = 20,
+                        cursor: str = None, incluir_total: bool = True) -> Dict[str, Any]:
         """
-        Lista productos con filtros y paginación
+        Lista productos con filtros y paginación.
+        Si se recibe un cursor se usa paginación keyset y se ignora la página.
+        Las búsquedas se ordenan por relevancia y solo admiten paginación por página.
         """
         try:
             query = self.db.query(Producto).filter(Producto.activo == True)
+            buscador = BuscadorProductos(self.db)
+            busqueda = busqueda.strip() if busqueda else ""
             
             # Filtros
             if busqueda:
-                busqueda = f"%{busqueda.lower().strip()}%"
-                query = query.filter(
-                    or_(
-                        Producto.nombre_producto.ilike(busqueda),
-                        Producto.codigo_producto.ilike(busqueda),
-                        Producto.descripcion.ilike(busqueda)
-                    )
-                )
+                query = buscador.filtrar(query, busqueda)
             
             if categoria_id:
                 query = query.filter(Producto.id_categoria == categoria_id)
@@ -129,12 +152,22 @@ class ControladorProductos:
             if solo_stock_bajo:
                 query = query.filter(Producto.stock_actual <= Producto.stock_minimo)
             
-            # Contar total
-            total_productos = query.count()
+            # Contar total (opcional en paginación por cursor)
+            total_productos = query.count() if incluir_total else None
             
             # Paginación
-            offset = (pagina - 1) * elementos_por_pagina
-            productos = query.order_by(Producto.nombre_producto).offset(offset).limit(elementos_por_pagina).all()
+            query = query.options(*opciones_producto_con_relaciones())
+            if busqueda:
+                query = aplicar_orden(buscador.ordenar_por_relevancia(query, busqueda), ORDEN_PRODUCTOS)
+                productos = query.offset((pagina - 1) * elementos_por_pagina).limit(elementos_por_pagina).all()
+                siguiente_cursor = None
+            else:
+                query = aplicar_orden(query, ORDEN_PRODUCTOS)
+                if cursor:
+                    query = aplicar_cursor(query, ORDEN_PRODUCTOS, cursor)
+                else:
+                    query = query.offset((pagina - 1) * elementos_por_pagina)
+                productos, siguiente_cursor = obtener_pagina(query, ORDEN_PRODUCTOS, elementos_por_pagina)
             
             # Preparar respuesta
             productos_data = []
@@ -155,16 +188,17 @@ class ControladorProductos:
                     "estado_stock": producto.obtener_estado_stock(),
                     "necesita_alerta": producto.necesita_alerta_stock(),
                     "valor_inventario": producto.obtener_valor_inventario(),
-                    "qr_data_url": producto.qr_data_url,
+                    "qr_url": url_qr(producto.codigo_producto),
                     "fecha_creacion": producto.fecha_creacion
                 })
             
             return {
                 "productos": productos_data,
                 "total_productos": total_productos,
-                "pagina_actual": pagina,
-                "total_paginas": (total_productos + elementos_por_pagina - 1) // elementos_por_pagina,
-                "elementos_por_pagina": elementos_por_pagina
+                "pagina_actual": None if cursor and not busqueda else pagina,
+                "total_paginas": (total_productos + elementos_por_pagina - 1) // elementos_por_pagina if incluir_total else None,
+                "elementos_por_pagina": elementos_por_pagina,
+                "next_cursor": siguiente_cursor
             }
             
         except Exception as e:
@@ -190,11 +224,20 @@ class ControladorProductos:
                 'unidad_medida', 'peso', 'dimensiones'
             ]
             
+            estado_antes = estado_producto(producto)
+            
             for campo, valor in kwargs.items():
                 if campo in campos_actualizables and valor is not None:
                     setattr(producto, campo, valor)
             
+            estado_despues = estado_producto(producto)
+            
             self.db.commit()
+            
+            instantanea_inventario.registrar_cambio_producto(estado_antes, estado_despues)
+            if kwargs.get("stock_minimo") is not None:
+                evaluador_alertas.publicar([producto_id])
+            
             return True, "Producto actualizado exitosamente"
             
         except Exception as e:
@@ -216,6 +259,8 @@ class ControladorProductos:
                 MovimientoInventario.id_producto == producto_id
             ).count()
             
+            estado_antes = estado_producto(producto)
+            
             if movimientos_count > 0:
                 # Si tiene movimientos, solo desactivar
                 producto.activo = False
@@ -226,6 +271,9 @@ class ControladorProductos:
                 mensaje = "Producto eliminado exitosamente"
             
             self.db.commit()
+            
+            instantanea_inventario.registrar_cambio_producto(estado_antes, None)
+            
             return True, mensaje
             
         except Exception as e:
@@ -238,37 +286,31 @@ class ControladorProductos:
         Registra una entrada de productos
         """
         try:
-            producto = self.db.query(Producto).filter(
-                Producto.id_producto == producto_id,
-                Producto.activo == True
-            ).first()
-            
-            if not producto:
-                return False, "Producto no encontrado"
-            
             if cantidad <= 0:
                 return False, "La cantidad debe ser mayor a cero"
             
-            # Registrar entrada
-            movimiento = producto.registrar_entrada(
+            # Registrar entrada (UPDATE atómico + movimiento en la misma transacción)
+            producto, movimiento = MotorMovimientos(self.db).registrar_movimiento(
+                producto_id=producto_id,
+                tipo_movimiento=TipoMovimiento.ENTRADA,
                 cantidad=cantidad,
                 motivo=motivo,
-                costo_unitario=costo_unitario,
-                usuario_id=usuario_id
+                usuario_id=usuario_id,
+                costo_unitario=costo_unitario
             )
+            stock_nuevo = movimiento.cantidad_nueva
             
-            self.db.add(movimiento)
-            self.db.commit()
-            
-            # Crear alerta si es necesario
-            if producto.necesita_alerta_stock():
-                alerta = AlertaStock.crear_alerta_stock_minimo(producto)
-                if alerta:
-                    self.db.add(alerta)
-                    self.db.commit()
+            self._confirmar_movimiento(
+                producto,
+                stock_anterior=movimiento.cantidad_anterior,
+                precio_modificado=bool(costo_unitario and costo_unitario > 0)
+            )
             
-            return True, f"Entrada registrada exitosamente. Nuevo stock: {producto.stock_actual}"
+            return True, f"Entrada registrada exitosamente. Nuevo stock: {stock_nuevo}"
             
+        except ValueError as e:
+            self.db.rollback()
+            return False, str(e)
         except Exception as e:
             self.db.rollback()
             return False, f"Error al registrar entrada: {str(e)}"
@@ -279,44 +321,26 @@ class ControladorProductos:
         Registra una salida de productos
         """
         try:
-            producto = self.db.query(Producto).filter(
-                Producto.id_producto == producto_id,
-                Producto.activo == True
-            ).first()
-            
-            if not producto:
-                return False, "Producto no encontrado"
-            
             if cantidad <= 0:
                 return False, "La cantidad debe ser mayor a cero"
             
-            if producto.stock_actual < cantidad:
-                return False, f"Stock insuficiente. Disponible: {producto.stock_actual}"
-            
-            # Registrar salida
-            movimiento = producto.registrar_salida(
+            # Registrar salida (solo descuenta si hay stock suficiente)
+            producto, movimiento = MotorMovimientos(self.db).registrar_movimiento(
+                producto_id=producto_id,
+                tipo_movimiento=TipoMovimiento.SALIDA,
                 cantidad=cantidad,
                 motivo=motivo,
                 usuario_id=usuario_id
             )
+            stock_nuevo = movimiento.cantidad_nueva
             
-            self.db.add(movimiento)
-            self.db.commit()
-            
-            # Verificar alertas
-            if producto.stock_actual == 0:
-                alerta = AlertaStock.crear_alerta_agotamiento(producto)
-                if alerta:
-                    self.db.add(alerta)
-            elif producto.necesita_alerta_stock():
-                alerta = AlertaStock.crear_alerta_stock_minimo(producto)
-                if alerta:
-                    self.db.add(alerta)
-            
-            self.db.commit()
+            self._confirmar_movimiento(producto, stock_anterior=movimiento.cantidad_anterior)
             
-            return True, f"Salida registrada exitosamente. Nuevo stock: {producto.stock_actual}"
+            return True, f"Salida registrada exitosamente. Nuevo stock: {stock_nuevo}"
             
+        except ValueError as e:
+            self.db.rollback()
+            return False, str(e)
         except Exception as e:
             self.db.rollback()
             return False, f"Error al registrar salida: {str(e)}"
@@ -327,51 +351,85 @@ class ControladorProductos:
         Ajusta el stock de un producto
         """
         try:
-            producto = self.db.query(Producto).filter(
-                Producto.id_producto == producto_id,
-                Producto.activo == True
-            ).first()
-            
-            if not producto:
-                return False, "Producto no encontrado"
-            
             if nuevo_stock < 0:
                 return False, "El stock no puede ser negativo"
             
-            # Registrar ajuste
-            movimiento = producto.ajustar_stock(
+            # Registrar ajuste con la fila bloqueada (SELECT ... FOR UPDATE)
+            producto, movimiento = MotorMovimientos(self.db).ajustar_stock(
+                producto_id=producto_id,
                 nuevo_stock=nuevo_stock,
                 motivo=motivo,
                 usuario_id=usuario_id
             )
             
-            self.db.add(movimiento)
-            self.db.commit()
+            self._confirmar_movimiento(producto, stock_anterior=movimiento.cantidad_anterior)
             
-            # Verificar alertas
-            if producto.necesita_alerta_stock():
-                alerta = AlertaStock.crear_alerta_stock_minimo(producto)
-                if alerta:
-                    self.db.add(alerta)
-            elif producto.stock_actual == 0:
-                alerta = AlertaStock.crear_alerta_agotamiento(producto)
-                if alerta:
-                    self.db.add(alerta)
+            return True, f"Stock ajustado exitosamente. Nuevo stock: {nuevo_stock}"
+            
+        except ValueError as e:
+            self.db.rollback()
+            return False, str(e)
+        except Exception as e:
+            self.db.rollback()
+            return False, f"Error al ajustar stock: {str(e)}"
+    
+    def registrar_movimientos_lote(self, lineas: List[Dict[str, Any]], usuario_id: int = None) -> Dict[str, Any]:
+        """
+        Registra un lote de movimientos en una sola transacción
+        """
+        try:
+            if len(lineas) > MAX_LINEAS_LOTE:
+                return {"exito": False, "error": f"El lote no puede superar {MAX_LINEAS_LOTE} líneas", "resultados": []}
+            
+            resultados, productos = MotorMovimientos(self.db).registrar_lote(lineas, usuario_id)
             
             self.db.commit()
             
-            return True, f"Stock ajustado exitosamente. Nuevo stock: {producto.stock_actual}"
+            # Un lote puede tocar miles de productos: recalcular en la próxima lectura
+            if productos:
+                instantanea_inventario.invalidar()
+                evaluador_alertas.publicar(p.id_producto for p in productos)
+            
+            lineas_exitosas = sum(1 for r in resultados if r["exito"])
+            
+            return {
+                "exito": True,
+                "total_lineas": len(resultados),
+                "lineas_exitosas": lineas_exitosas,
+                "lineas_fallidas": len(resultados) - lineas_exitosas,
+                "resultados": resultados
+            }
             
         except Exception as e:
             self.db.rollback()
-            return False, f"Error al ajustar stock: {str(e)}"
+            return {"exito": False, "error": f"Error al registrar lote: {str(e)}", "resultados": []}
+    
+    def _confirmar_movimiento(self, producto: Producto, stock_anterior: int, precio_modificado: bool = False):
+        """
+        Confirma la transacción, actualiza la instantánea del dashboard y
+        publica el cambio de stock para que las alertas se evalúen en segundo plano
+        """
+        estado_despues = estado_producto(producto)
+        
+        self.db.commit()
+        
+        if precio_modificado:
+            # Se desconoce el precio anterior: recalcular en la próxima lectura
+            instantanea_inventario.invalidar()
+        else:
+            estado_antes = (estado_despues[0], stock_anterior) + estado_despues[2:]
+            instantanea_inventario.registrar_cambio_producto(estado_antes, estado_despues)
+        instantanea_inventario.registrar_movimientos(1)
+        evaluador_alertas.publicar([producto.id_producto])
     
     def obtener_productos_stock_bajo(self) -> List[Dict[str, Any]]:
         """
         Obtiene productos con stock bajo
         """
         try:
-            productos = self.db.query(Producto).filter(
+            productos = self.db.query(Producto).options(
+                *opciones_producto_con_relaciones()
+            ).filter(
                 Producto.activo == True,
                 Producto.stock_actual <= Producto.stock_minimo
             ).order_by(Producto.stock_actual).all()
@@ -399,21 +457,7 @@ class ControladorProductos:
         Obtiene estadísticas generales de productos
         """
         try:
-            total_productos = self.db.query(Producto).filter(Producto.activo == True).count()
-            productos_stock_bajo = self.db.query(Producto).filter(
-                Producto.activo == True,
-                Producto.stock_actual <= Producto.stock_minimo
-            ).count()
-            productos_agotados = self.db.query(Producto).filter(
-                Producto.activo == True,
-                Producto.stock_actual == 0
-            ).count()
-            
-            # Valor total del inventario
-            resultado_valor = self.db.query(
-                func.sum(Producto.stock_actual * Producto.precio_compra)
-            ).filter(Producto.activo == True).first()
-            valor_total_inventario = float(resultado_valor[0] or 0)
+            totales = MotorEstadisticas(self.db).estadisticas_productos()
             
             # Productos por categoría
             categorias_stats = self.db.query(
@@ -427,11 +471,11 @@ class ControladorProductos:
             ).group_by(Categoria.id_categoria).all()
             
             return {
-                "total_productos": total_productos,
-                "productos_stock_bajo": productos_stock_bajo,
-                "productos_agotados": productos_agotados,
-                "productos_normales": total_productos - productos_stock_bajo,
-                "valor_total_inventario": valor_total_inventario,
+                "total_productos": totales["total_productos"],
+                "productos_stock_bajo": totales["productos_stock_bajo"],
+                "productos_agotados": totales["productos_agotados"],
+                "productos_normales": totales["total_productos"] - totales["productos_stock_bajo"],
+                "valor_total_inventario": totales["valor_total_inventario"],
                 "categorias": [
                     {
                         "categoria": cat[0],
@@ -463,49 +507,123 @@ class ControladorProductos:
     
     def generar_codigo_qr_actualizado(self, producto_id: int, base_url: str = None) -> tuple[bool, str, Optional[str]]:
         """
-        Regenera el código QR de un producto
+        Regenera el código QR de un producto y devuelve la URL de su imagen
         """
         try:
             if not base_url:
-                base_url = Configuracion.obtener_configuracion(self.db, "qr_base_url", "https://stocktrack.app")
+                base_url = servicio_qr.obtener_base_url(self.db)
             
             producto = self.db.query(Producto).filter(Producto.id_producto == producto_id).first()
             
             if not producto:
                 return False, "Producto no encontrado", None
             
-            qr_data_url = producto.generar_codigo_qr(base_url)
+            producto.generar_codigo_qr(base_url)
             self.db.commit()
             
-            return True, "Código QR actualizado", qr_data_url
+            # La imagen se sirve a partir del qr_code guardado
+            servicio_qr.generar(producto.qr_code)
+            
+            return True, "Código QR actualizado", url_qr(producto.codigo_producto)
             
         except Exception as e:
             self.db.rollback()
             return False, f"Error al generar QR: {str(e)}", None
     
+    def listar_movimientos_producto(self, producto_id: int, cursor: str = None,
+                                    elementos_por_pagina: int = 50, fecha_inicio: datetime = None,
+                                    fecha_fin: datetime = None) -> Dict[str, Any]:
+        """
+        Lista los movimientos de un producto con paginación por cursor,
+        opcionalmente dentro de una ventana de fechas [fecha_inicio, fecha_fin)
+        """
+        try:
+            query = self._consultar_historial(producto_id, fecha_inicio, fecha_fin)
+            if query is None:
+                return {"movimientos": [], "error": "Producto no encontrado", "next_cursor": None}
+            
+            query = aplicar_cursor(aplicar_orden(query, ORDEN_MOVIMIENTOS), ORDEN_MOVIMIENTOS, cursor)
+            movimientos, siguiente_cursor = obtener_pagina(query, ORDEN_MOVIMIENTOS, elementos_por_pagina)
+            
+            return {
+                "movimientos": [self._serializar_movimiento(m) for m in movimientos],
+                "elementos_por_pagina": elementos_por_pagina,
+                "next_cursor": siguiente_cursor
+            }
+            
+        except Exception as e:
+            return {"movimientos": [], "error": str(e), "next_cursor": None}
+    
     def obtener_movimientos_producto(self, producto_id: int, limite: int = 50) -> List[Dict[str, Any]]:
         """
         Obtiene el historial de movimientos de un producto
         """
         try:
-            movimientos = self.db.query(MovimientoInventario).filter(
-                MovimientoInventario.id_producto == producto_id
-            ).order_by(desc(MovimientoInventario.fecha_movimiento)).limit(limite).all()
+            query = self._consultar_historial(producto_id)
+            if query is None:
+                return []
             
-            return [
-                {
-                    "id": m.id_movimiento,
-                    "tipo_movimiento": m.tipo_movimiento.value,
-                    "cantidad": m.cantidad,
-                    "cantidad_anterior": m.cantidad_anterior,
-                    "cantidad_nueva": m.cantidad_nueva,
-                    "motivo": m.motivo,
-                    "fecha_movimiento": m.fecha_movimiento,
-                    "usuario": m.usuario.nombre_completo if m.usuario else "Sistema",
-                    "valor_movimiento": m.calcular_valor_movimiento()
-                }
-                for m in movimientos
-            ]
+            movimientos = aplicar_orden(query, ORDEN_MOVIMIENTOS).limit(limite).all()
+            
+            return [self._serializar_movimiento(m) for m in movimientos]
             
         except Exception as e:
             return []
+    
+    def _consultar_historial(self, producto_id: int, fecha_inicio: datetime = None, fecha_fin: datetime = None):
+        """
+        Consulta de solo las columnas del historial, con el nombre del usuario
+        y el valor del movimiento calculados en SQL (None si el producto no
+        existe). Filtro y orden van por idx_movimientos_producto_fecha, así
+        que el coste de una página no depende del total de movimientos.
+        """
+        producto = self.db.query(Producto.id_producto, Producto.precio_compra).filter(
+            Producto.id_producto == producto_id
+        ).first()
+        if producto is None:
+            return None
+        
+        # Igual que MovimientoInventario.calcular_valor_movimiento: el costo del
+        # movimiento si lo tiene, si no el precio de compra actual del producto
+        valor_movimiento = MovimientoInventario.cantidad * func.coalesce(
+            func.nullif(MovimientoInventario.costo_unitario, 0), producto.precio_compra or 0
+        )
+        
+        query = self.db.query(
+            MovimientoInventario.id_movimiento,
+            MovimientoInventario.tipo_movimiento,
+            MovimientoInventario.cantidad,
+            MovimientoInventario.cantidad_anterior,
+            MovimientoInventario.cantidad_nueva,
+            MovimientoInventario.motivo,
+            MovimientoInventario.fecha_movimiento,
+            Usuario.nombre_completo.label("usuario"),
+            valor_movimiento.label("valor_movimiento")
+        ).outerjoin(
+            Usuario, Usuario.id_usuario == MovimientoInventario.id_usuario
+        ).filter(
+            MovimientoInventario.id_producto == producto_id
+        )
+        
+        if fecha_inicio:
+            query = query.filter(MovimientoInventario.fecha_movimiento >= fecha_inicio)
+        if fecha_fin:
+            query = query.filter(MovimientoInventario.fecha_movimiento < fecha_fin)
+        
+        return query
+    
+    def _serializar_movimiento(self, m) -> Dict[str, Any]:
+        """
+        Convierte una fila del historial en el diccionario que devuelve la API
+        """
+        return {
+            "id": m.id_movimiento,
+            "tipo_movimiento": m.tipo_movimiento.value,
+            "cantidad": m.cantidad,
+            "cantidad_anterior": m.cantidad_anterior,
+            "cantidad_nueva": m.cantidad_nueva,
+            "motivo": m.motivo,
+            "fecha_movimiento": m.fecha_movimiento,
+            "usuario": m.usuario or "Sistema",
+            "valor_movimiento": float(m.valor_movimiento or 0)
+        }
@@ -0,0 +1,158 @@
+"""
+Regeneración Masiva de Códigos QR
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import update, func
+from config.database import SessionLocal
+from modelo.producto import Producto
+from controlador.servicio_qr import servicio_qr, datos_qr, ServicioQR
+from datetime import datetime
+from typing import List, Optional, Dict, Any
+import os
+import threading
+
+# Productos leídos, renderizados y actualizados por cada lote
+QR_REGENERACION_LOTE = int(os.getenv("QR_REGENERACION_LOTE", "1000"))
+
+# Procesos que renderizan imágenes en paralelo
+QR_REGENERACION_PROCESOS = int(os.getenv("QR_REGENERACION_PROCESOS", str(os.cpu_count() or 1)))
+
+def _generar_imagenes(directorio: str, textos: List[str]) -> int:
+    """
+    Renderiza en un proceso del pool las imágenes de un grupo de textos QR
+    """
+    servicio = ServicioQR(directorio)
+    for datos in textos:
+        servicio.generar(datos)
+    return len(textos)
+
+def _repartir(elementos: list, partes: int) -> List[list]:
+    """Divide una lista en como mucho `partes` grupos de tamaño parecido"""
+    partes = max(1, min(partes, len(elementos)))
+    return [elementos[i::partes] for i in range(partes)]
+
+class RegeneradorQR:
+    """
+    Regenera el QR de todo el catálogo tras un cambio de qr_base_url.
+
+    Recorre los productos por lotes en orden de id (keyset) y solo toma los
+    que aún no tienen el QR de la URL base actual, así que un trabajo
+    interrumpido se reanuda donde quedó al volver a lanzarlo. En cada lote
+    las imágenes se renderizan en un pool de procesos y los textos QR se
+    escriben con un UPDATE masivo y un commit.
+    """
+
+    def __init__(self, tamano_lote: int = QR_REGENERACION_LOTE,
+                 max_procesos: int = QR_REGENERACION_PROCESOS):
+        self.tamano_lote = max(1, tamano_lote)
+        self.max_procesos = max(1, max_procesos)
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._progreso = None
+
+    def iniciar(self, base_url: str = None, generar_imagenes: bool = True) -> tuple[bool, str, Dict[str, Any]]:
+        """
+        Lanza la regeneración en segundo plano (una sola a la vez)
+        """
+        with self._lock:
+            if self._hilo and self._hilo.is_alive():
+                return False, "Ya hay una regeneración de QR en curso", dict(self._progreso)
+
+            self._detener.clear()
+            self._progreso = {
+                "estado": "pendiente",
+                "base_url": base_url,
+                "generar_imagenes": generar_imagenes,
+                "total": None,
+                "procesados": 0,
+                "ultimo_id": None,
+                "error": None,
+                "fecha_inicio": datetime.now(),
+                "fecha_fin": None
+            }
+            self._hilo = threading.Thread(
+                target=self._ejecutar, args=(base_url, generar_imagenes),
+                name="regeneracion-qr", daemon=True
+            )
+            self._hilo.start()
+            return True, "Regeneración de QR iniciada", dict(self._progreso)
+
+    def obtener_progreso(self) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el progreso de la última regeneración
+        """
+        with self._lock:
+            return dict(self._progreso) if self._progreso else None
+
+    def detener(self):
+        """
+        Pide que la regeneración en curso se detenga al terminar su lote actual
+        """
+        self._detener.set()
+
+    def _actualizar_progreso(self, **valores):
+        """Actualiza el progreso compartido"""
+        with self._lock:
+            self._progreso.update(valores)
+
+    def _ejecutar(self, base_url: Optional[str], generar_imagenes: bool):
+        """Recorre el catálogo por lotes (en un hilo propio)"""
+        db = SessionLocal()
+        executor = ProcessPoolExecutor(max_workers=self.max_procesos) if generar_imagenes else None
+        try:
+            base_url = base_url or servicio_qr.obtener_base_url(db)
+            # Los productos que ya tienen el QR de esta URL base se saltan
+            pendiente = func.coalesce(Producto.qr_code, "") != func.concat(f"{base_url}/producto/", Producto.codigo_producto)
+
+            total = db.query(func.count(Producto.id_producto)).filter(pendiente).scalar()
+            self._actualizar_progreso(estado="en_proceso", base_url=base_url, total=total)
+
+            ultimo_id = 0
+            while not self._detener.is_set():
+                lote = db.query(Producto.id_producto, Producto.codigo_producto).filter(
+                    pendiente,
+                    Producto.id_producto > ultimo_id
+                ).order_by(Producto.id_producto).limit(self.tamano_lote).all()
+
+                if not lote:
+                    break
+
+                # Primero las imágenes: si algo falla, el lote sigue pendiente en base de datos
+                if executor:
+                    textos = [datos_qr(codigo, base_url) for _, codigo in lote]
+                    futuros = [
+                        executor.submit(_generar_imagenes, servicio_qr.directorio, grupo)
+                        for grupo in _repartir(textos, self.max_procesos)
+                    ]
+                    for futuro in futuros:
+                        futuro.result()
+
+                db.execute(update(Producto), [
+                    {"id_producto": id_producto, "qr_code": datos_qr(codigo, base_url), "qr_data_url": None}
+                    for id_producto, codigo in lote
+                ])
+                db.commit()
+
+                ultimo_id = lote[-1][0]
+                with self._lock:
+                    self._progreso["procesados"] += len(lote)
+                    self._progreso["ultimo_id"] = ultimo_id
+
+            self._actualizar_progreso(
+                estado="detenido" if self._detener.is_set() else "completado",
+                fecha_fin=datetime.now()
+            )
+        except Exception as e:
+            db.rollback()
+            self._actualizar_progreso(estado="error", error=str(e), fecha_fin=datetime.now())
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+            db.close()
+
+# Instancia compartida por todo el proceso
+regenerador_qr = RegeneradorQR()
@@ -5,24 +5,46 @@ Autor: MiniMax Agent
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc, func
+from sqlalchemy import and_, or_, desc, asc, func, case
 from modelo.alerta_stock import AlertaStock, TipoAlerta, PrioridadAlerta
 from modelo.producto import Producto
-from modelo.movimiento_inventario import MovimientoInventario
-from modelo.configuracion import Configuracion
+from modelo.categoria import Categoria
+from modelo.proveedor import Proveedor
+from modelo.movimiento_inventario import MovimientoInventario, TipoMovimiento
+from controlador.almacen_configuracion import almacen_configuracion
+from modelo.usuario import Usuario
+from controlador.estrategias_carga import opciones_alerta_con_relaciones
+from controlador.paginacion import aplicar_orden, aplicar_cursor, obtener_pagina
+from controlador.estadisticas import MotorEstadisticas
+from controlador.instantanea_inventario import instantanea_inventario
+from controlador.exportacion import exportar, TAMANO_LOTE_EXPORTACION
+from controlador.graficos import servicio_graficos
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import Optional, Dict, Any
 import json
-import csv
-from io import StringIO, BytesIO
-import pandas as pd
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.pdfgen import canvas
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+# pandas, reportlab, matplotlib y seaborn no se importan aquí: los backends de
+# exportación (controlador/exportacion.py) y de gráficos (controlador/graficos.py)
+# los cargan la primera vez que se usan
+
+# Orden keyset de alertas (la última columna es la clave primaria)
+ORDEN_ALERTAS = [
+    # Rango numérico, no el ENUM: ORDER BY y el filtro del cursor deben coincidir
+    (AlertaStock.rango_prioridad, True),
+    (AlertaStock.fecha_creacion, True),
+    (AlertaStock.id_alerta, True)
+]
+
+# Columnas de los reportes exportados, en orden
+COLUMNAS_REPORTE_INVENTARIO = [
+    "codigo", "nombre", "categoria", "proveedor", "stock_actual", "stock_minimo",
+    "precio_compra", "precio_venta", "entradas", "salidas", "valor_inventario",
+    "estado_stock", "ubicacion"
+]
+COLUMNAS_REPORTE_MOVIMIENTOS = [
+    "fecha", "producto_codigo", "producto_nombre", "tipo_movimiento", "cantidad",
+    "stock_anterior", "stock_nuevo", "motivo", "usuario", "valor_movimiento"
+]
 
 class ControladorAlertas:
     """
@@ -33,9 +55,11 @@ class ControladorAlertas:
         self.db = db
     
     def listar_alertas(self, solo_activas: bool = True, prioridad: str = None, 
-                      tipo_alerta: str = None, pagina: int = 1, elementos_por_pagina: int = 20) -> Dict[str, Any]:
+                      tipo_alerta: str = None, pagina: int = 1, elementos_por_pagina: int = 20,
+                      cursor: str = None, incluir_total: bool = True) -> Dict[str, Any]:
         """
-        Lista alertas con filtros y paginación
+        Lista alertas con filtros y paginación.
+        Si se recibe un cursor se usa paginación keyset y se ignora la página.
         """
         try:
             query = self.db.query(AlertaStock).join(Producto)
@@ -49,17 +73,19 @@ class ControladorAlertas:
             if tipo_alerta:
                 query = query.filter(AlertaStock.tipo_alerta == tipo_alerta)
             
-            # Contar total
-            total_alertas = query.count()
+            # Contar total (opcional en paginación por cursor)
+            total_alertas = query.count() if incluir_total else None
             
             # Paginación
-            offset = (pagina - 1) * elementos_por_pagina
-            alertas = query.order_by(
-                desc(AlertaStock.prioridad), 
-                desc(AlertaStock.fecha_creacion)
-            ).offset(offset).limit(elementos_por_pagina).all()
+            query = aplicar_orden(query.options(*opciones_alerta_con_relaciones()), ORDEN_ALERTAS)
+            if cursor:
+                query = aplicar_cursor(query, ORDEN_ALERTAS, cursor)
+            else:
+                query = query.offset((pagina - 1) * elementos_por_pagina)
+            alertas, siguiente_cursor = obtener_pagina(query, ORDEN_ALERTAS, elementos_por_pagina)
             
             # Preparar respuesta
+            dias_vencida = self._dias_vencida()
             alertas_data = []
             for alerta in alertas:
                 alertas_data.append({
@@ -73,15 +99,16 @@ class ControladorAlertas:
                     "fecha_creacion": alerta.fecha_creacion,
                     "tiempo_transcurrido": alerta.obtener_tiempo_transcurrido_texto(),
                     "es_critica": alerta.es_critica(),
-                    "esta_vencida": alerta.esta_vencida(),
+                    "esta_vencida": alerta.esta_vencida(dias_vencida),
                     "responsable": alerta.usuario_responsable.nombre_completo if alerta.usuario_responsable else None
                 })
             
             return {
                 "alertas": alertas_data,
                 "total_alertas": total_alertas,
-                "pagina_actual": pagina,
-                "total_paginas": (total_alertas + elementos_por_pagina - 1) // elementos_por_pagina
+                "pagina_actual": None if cursor else pagina,
+                "total_paginas": (total_alertas + elementos_por_pagina - 1) // elementos_por_pagina if incluir_total else None,
+                "next_cursor": siguiente_cursor
             }
             
         except Exception as e:
@@ -100,9 +127,12 @@ class ControladorAlertas:
             if alerta.resuelta:
                 return False, "La alerta ya está resuelta"
             
+            alerta_critica = alerta.es_critica()
             alerta.resolver(usuario_id, comentario)
             self.db.commit()
             
+            instantanea_inventario.registrar_alertas(activas=-1, criticas=-int(alerta_critica))
+            
             return True, "Alerta resuelta exitosamente"
             
         except Exception as e:
@@ -144,50 +174,35 @@ class ControladorAlertas:
             self.db.add(alerta)
             self.db.commit()
             
+            alerta_critica = PrioridadAlerta(prioridad) == PrioridadAlerta.CRITICA
+            instantanea_inventario.registrar_alertas(activas=1, criticas=int(alerta_critica))
+            
             return True, "Alerta creada exitosamente"
             
         except Exception as e:
             self.db.rollback()
             return False, f"Error al crear alerta: {str(e)}"
     
-    def obtener_estadisticas_alertas(self) -> Dict[str, Any]:
+    def obtener_estadisticas_alertas(self, dias_vencida: float = None) -> Dict[str, Any]:
         """
-        Obtiene estadísticas de alertas
+        Obtiene estadísticas de alertas con una consulta agregada.
+        Sin dias_vencida se usa la configuración inventario_dias_alerta_vencida.
         """
         try:
-            total_alertas = self.db.query(AlertaStock).count()
-            alertas_activas = self.db.query(AlertaStock).filter(AlertaStock.resuelta == False).count()
-            alertas_criticas = self.db.query(AlertaStock).filter(
-                AlertaStock.resuelta == False,
-                AlertaStock.prioridad == PrioridadAlerta.CRITICA
-            ).count()
-            alertas_vencidas = self.db.query(AlertaStock).filter(
-                AlertaStock.resuelta == False
-            ).all()
-            
-            # Contar alertas vencidas (más de 7 días)
-            dias_limite = Configuracion.obtener_configuracion(self.db, "inventario_dias_alerta_vencida", 7)
-            alertas_vencidas_count = sum(1 for a in alertas_vencidas if a.esta_vencida())
+            if dias_vencida is None:
+                dias_vencida = self._dias_vencida()
             
-            # Alertas por tipo
-            alertas_por_tipo = self.db.query(
-                AlertaStock.tipo_alerta,
-                func.count(AlertaStock.id_alerta)
-            ).filter(AlertaStock.resuelta == False).group_by(AlertaStock.tipo_alerta).all()
-            
-            return {
-                "total_alertas": total_alertas,
-                "alertas_activas": alertas_activas,
-                "alertas_criticas": alertas_criticas,
-                "alertas_vencidas": alertas_vencidas_count,
-                "alertas_resueltas": total_alertas - alertas_activas,
-                "por_tipo": {
-                    tipo: count for tipo, count in alertas_por_tipo
-                }
-            }
+            return MotorEstadisticas(self.db).estadisticas_alertas(dias_vencida=float(dias_vencida))
             
         except Exception as e:
             return {"error": str(e)}
+    
+    def _dias_vencida(self) -> float:
+        """
+        Días sin resolver tras los que una alerta está vencida (configuración
+        inventario_dias_alerta_vencida); admite fracciones de día
+        """
+        return float(almacen_configuracion.obtener(self.db, "inventario_dias_alerta_vencida", 7))
 
 class ControladorReportes:
     """
@@ -203,69 +218,125 @@ class ControladorReportes:
         Genera reporte de inventario
         """
         try:
+            if formato.lower() in ["excel", "csv"]:
+                return self.exportar_reporte_inventario(fecha_inicio, fecha_fin, categoria_id, formato)
+            
             if not fecha_inicio:
                 fecha_inicio = datetime.now() - timedelta(days=30)
             if not fecha_fin:
                 fecha_fin = datetime.now()
             
-            query = self.db.query(Producto).filter(Producto.activo == True)
-            
-            if categoria_id:
-                query = query.filter(Producto.id_categoria == categoria_id)
-            
-            productos = query.all()
-            
-            datos_reporte = []
-            for producto in productos:
-                # Obtener movimientos del período
-                movimientos = self.db.query(MovimientoInventario).filter(
-                    MovimientoInventario.id_producto == producto.id_producto,
-                    and_(
-                        MovimientoInventario.fecha_movimiento >= fecha_inicio,
-                        MovimientoInventario.fecha_movimiento <= fecha_fin
-                    )
-                ).all()
-                
-                entradas = sum(m.cantidad for m in movimientos if m.tipo_movimiento.value in ['entrada', 'devolucion'])
-                salidas = sum(m.cantidad for m in movimientos if m.tipo_movimiento.value in ['salida', 'perdida'])
-                
-                datos_reporte.append({
-                    "codigo": producto.codigo_producto,
-                    "nombre": producto.nombre_producto,
-                    "categoria": producto.categoria.nombre_categoria if producto.categoria else "",
-                    "proveedor": producto.proveedor.nombre_proveedor if producto.proveedor else "",
-                    "stock_actual": producto.stock_actual,
-                    "stock_minimo": producto.stock_minimo,
-                    "precio_compra": float(producto.precio_compra),
-                    "precio_venta": float(producto.precio_venta),
-                    "entradas": entradas,
-                    "salidas": salidas,
-                    "valor_inventario": producto.obtener_valor_inventario(),
-                    "estado_stock": producto.obtener_estado_stock(),
-                    "ubicacion": producto.ubicacion_almacen
-                })
+            # Una sola consulta agrupada (equivalente a sp_reporte_inventario)
+            datos_reporte = [
+                self._formatear_fila_inventario(fila)
+                for fila in self._consultar_inventario(fecha_inicio, fecha_fin, categoria_id)
+            ]
             
-            if formato.lower() == "excel":
-                return self._generar_excel(datos_reporte, f"reporte_inventario_{datetime.now().strftime('%Y%m%d')}")
-            elif formato.lower() == "csv":
-                return self._generar_csv(datos_reporte, f"reporte_inventario_{datetime.now().strftime('%Y%m%d')}")
-            else:
-                return {
-                    "datos": datos_reporte,
-                    "resumen": {
-                        "total_productos": len(datos_reporte),
-                        "valor_total": sum(item["valor_inventario"] for item in datos_reporte),
-                        "productos_stock_bajo": len([p for p in datos_reporte if p["estado_stock"] in ["bajo", "crítico"]]),
-                        "periodo": {
-                            "inicio": fecha_inicio.strftime("%Y-%m-%d"),
-                            "fin": fecha_fin.strftime("%Y-%m-%d")
-                        }
+            return {
+                "datos": datos_reporte,
+                "resumen": {
+                    "total_productos": len(datos_reporte),
+                    "valor_total": sum(item["valor_inventario"] for item in datos_reporte),
+                    "productos_stock_bajo": len([p for p in datos_reporte if p["estado_stock"] in ["bajo", "crítico"]]),
+                    "periodo": {
+                        "inicio": fecha_inicio.strftime("%Y-%m-%d"),
+                        "fin": fecha_fin.strftime("%Y-%m-%d")
                     }
                 }
-                
+            }
+            
         except Exception as e:
             return {"error": str(e)}
     
+    def exportar_reporte_inventario(self, fecha_inicio: datetime = None, fecha_fin: datetime = None,
+                                    categoria_id: int = None, formato: str = "csv") -> Dict[str, Any]:
+        """
+        Exporta el reporte de inventario en streaming (CSV o Excel).
+        Las filas se leen con un cursor de servidor por lotes mientras se envían.
+        """
+        if not fecha_inicio:
+            fecha_inicio = datetime.now() - timedelta(days=30)
+        if not fecha_fin:
+            fecha_fin = datetime.now()
+        
+        query = self._consultar_inventario(fecha_inicio, fecha_fin, categoria_id)
+        filas = (
+            self._formatear_fila_inventario(fila)
+            for fila in query.yield_per(TAMANO_LOTE_EXPORTACION)
+        )
+        
+        return exportar(
+            formato,
+            f"reporte_inventario_{datetime.now().strftime('%Y%m%d')}",
+            COLUMNAS_REPORTE_INVENTARIO,
+            filas
+        )
+    
+    def _consultar_inventario(self, fecha_inicio: datetime, fecha_fin: datetime, categoria_id: int = None):
+        """
+        Consulta de inventario con las entradas y salidas del período agregadas en SQL
+        """
+        tipo = MovimientoInventario.tipo_movimiento
+        cantidad = MovimientoInventario.cantidad
+        
+        query = self.db.query(
+            Producto.codigo_producto,
+            Producto.nombre_producto,
+            Categoria.nombre_categoria,
+            Proveedor.nombre_proveedor,
+            Producto.stock_actual,
+            Producto.stock_minimo,
+            Producto.precio_compra,
+            Producto.precio_venta,
+            Producto.ubicacion_almacen,
+            func.coalesce(func.sum(case(
+                (tipo.in_([TipoMovimiento.ENTRADA, TipoMovimiento.DEVOLUCION]), cantidad), else_=0
+            )), 0).label("entradas"),
+            func.coalesce(func.sum(case(
+                (tipo.in_([TipoMovimiento.SALIDA, TipoMovimiento.PERDIDA]), cantidad), else_=0
+            )), 0).label("salidas")
+        ).outerjoin(
+            Categoria, Categoria.id_categoria == Producto.id_categoria
+        ).outerjoin(
+            Proveedor, Proveedor.id_proveedor == Producto.id_proveedor
+        ).outerjoin(
+            MovimientoInventario, and_(
+                MovimientoInventario.id_producto == Producto.id_producto,
+                MovimientoInventario.fecha_movimiento >= fecha_inicio,
+                MovimientoInventario.fecha_movimiento <= fecha_fin
+            )
+        ).filter(Producto.activo == True)
+        
+        if categoria_id:
+            query = query.filter(Producto.id_categoria == categoria_id)
+        
+        return query.group_by(
+            Producto.id_producto,
+            Categoria.id_categoria,
+            Proveedor.id_proveedor
+        ).order_by(Producto.nombre_producto, Producto.id_producto)
+    
+    def _formatear_fila_inventario(self, fila) -> Dict[str, Any]:
+        """
+        Convierte una fila de _consultar_inventario al formato del reporte
+        """
+        precio_compra = float(fila.precio_compra or 0)
+        return {
+            "codigo": fila.codigo_producto,
+            "nombre": fila.nombre_producto,
+            "categoria": fila.nombre_categoria or "",
+            "proveedor": fila.nombre_proveedor or "",
+            "stock_actual": fila.stock_actual,
+            "stock_minimo": fila.stock_minimo,
+            "precio_compra": precio_compra,
+            "precio_venta": float(fila.precio_venta or 0),
+            "entradas": int(fila.entradas),
+            "salidas": int(fila.salidas),
+            "valor_inventario": fila.stock_actual * precio_compra,
+            "estado_stock": Producto.calcular_estado_stock(fila.stock_actual, fila.stock_minimo),
+            "ubicacion": fila.ubicacion_almacen
+        }
+    
     def generar_reporte_movimientos(self, producto_id: int = None, fecha_inicio: datetime = None,
                                    fecha_fin: datetime = None, tipo_movimiento: str = None,
                                    formato: str = "json") -> Dict[str, Any]:
@@ -278,262 +349,142 @@ class ControladorReportes:
             if not fecha_fin:
                 fecha_fin = datetime.now()
             
-            query = self.db.query(MovimientoInventario).filter(
-                and_(
-                    MovimientoInventario.fecha_movimiento >= fecha_inicio,
-                    MovimientoInventario.fecha_movimiento <= fecha_fin
-                )
-            )
+            if formato.lower() in ["excel", "csv"]:
+                return self.exportar_reporte_movimientos(producto_id, fecha_inicio, fecha_fin, tipo_movimiento, formato)
             
-            if producto_id:
-                query = query.filter(MovimientoInventario.id_producto == producto_id)
-            
-            if tipo_movimiento:
-                query = query.filter(MovimientoInventario.tipo_movimiento == tipo_movimiento)
-            
-            movimientos = query.order_by(desc(MovimientoInventario.fecha_movimiento)).all()
-            
-            datos_reporte = []
-            for movimiento in movimientos:
-                datos_reporte.append({
-                    "fecha": movimiento.fecha_movimiento,
-                    "producto_codigo": movimiento.producto.codigo_producto,
-                    "producto_nombre": movimiento.producto.nombre_producto,
-                    "tipo_movimiento": movimiento.tipo_movimiento.value,
-                    "cantidad": movimiento.cantidad,
-                    "stock_anterior": movimiento.cantidad_anterior,
-                    "stock_nuevo": movimiento.cantidad_nueva,
-                    "motivo": movimiento.motivo,
-                    "usuario": movimiento.usuario.nombre_completo if movimiento.usuario else "Sistema",
-                    "valor_movimiento": movimiento.calcular_valor_movimiento()
-                })
+            datos_reporte = [
+                self._formatear_fila_movimiento(fila)
+                for fila in self._consultar_movimientos(producto_id, fecha_inicio, fecha_fin, tipo_movimiento)
+            ]
             
-            if formato.lower() == "excel":
-                return self._generar_excel(datos_reporte, f"reporte_movimientos_{datetime.now().strftime('%Y%m%d')}")
-            elif formato.lower() == "csv":
-                return self._generar_csv(datos_reporte, f"reporte_movimientos_{datetime.now().strftime('%Y%m%d')}")
-            else:
-                return {
-                    "datos": datos_reporte,
-                    "resumen": {
-                        "total_movimientos": len(datos_reporte),
-                        "entradas": len([m for m in datos_reporte if m["tipo_movimiento"] in ["entrada", "devolucion"]]),
-                        "salidas": len([m for m in datos_reporte if m["tipo_movimiento"] in ["salida", "perdida"]]),
-                        "ajustes": len([m for m in datos_reporte if m["tipo_movimiento"] == "ajuste"]),
-                        "periodo": {
-                            "inicio": fecha_inicio.strftime("%Y-%m-%d"),
-                            "fin": fecha_fin.strftime("%Y-%m-%d")
-                        }
+            return {
+                "datos": datos_reporte,
+                "resumen": {
+                    "total_movimientos": len(datos_reporte),
+                    "entradas": len([m for m in datos_reporte if m["tipo_movimiento"] in ["entrada", "devolucion"]]),
+                    "salidas": len([m for m in datos_reporte if m["tipo_movimiento"] in ["salida", "perdida"]]),
+                    "ajustes": len([m for m in datos_reporte if m["tipo_movimiento"] == "ajuste"]),
+                    "periodo": {
+                        "inicio": fecha_inicio.strftime("%Y-%m-%d"),
+                        "fin": fecha_fin.strftime("%Y-%m-%d")
                     }
                 }
-                
+            }
+            
         except Exception as e:
             return {"error": str(e)}
     
-    def generar_dashboard_datos(self) -> Dict[str, Any]:
+    def exportar_reporte_movimientos(self, producto_id: int = None, fecha_inicio: datetime = None,
+                                     fecha_fin: datetime = None, tipo_movimiento: str = None,
+                                     formato: str = "csv") -> Dict[str, Any]:
         """
-        Genera datos para el dashboard principal
+        Exporta el reporte de movimientos en streaming (CSV o Excel).
+        Las filas se leen con un cursor de servidor por lotes mientras se envían.
         """
-        try:
-            # Estadísticas generales
-            total_productos = self.db.query(Producto).filter(Producto.activo == True).count()
-            productos_stock_bajo = self.db.query(Producto).filter(
-                Producto.activo == True,
-                Producto.stock_actual <= Producto.stock_minimo
-            ).count()
-            productos_agotados = self.db.query(Producto).filter(
-                Producto.activo == True,
-                Producto.stock_actual == 0
-            ).count()
-            
-            # Valor total del inventario
-            resultado_valor = self.db.query(
-                func.sum(Producto.stock_actual * Producto.precio_compra)
-            ).filter(Producto.activo == True).first()
-            valor_total_inventario = float(resultado_valor[0] or 0)
-            
-            # Movimientos recientes (últimos 7 días)
-            fecha_limite = datetime.now() - timedelta(days=7)
-            movimientos_recientes = self.db.query(MovimientoInventario).filter(
-                MovimientoInventario.fecha_movimiento >= fecha_limite
-            ).count()
-            
-            # Alertas activas
-            alertas_activas = self.db.query(AlertaStock).filter(AlertaStock.resuelta == False).count()
-            alertas_criticas = self.db.query(AlertaStock).filter(
-                AlertaStock.resuelta == False,
-                AlertaStock.prioridad == PrioridadAlerta.CRITICA
-            ).count()
-            
-            # Productos más movimentados (últimos 30 días)
-            fecha_movimientos = datetime.now() - timedelta(days=30)
-            productos_movimentados = self.db.query(
-                Producto.codigo_producto,
-                Producto.nombre_producto,
-                func.count(MovimientoInventario.id_movimiento).label('total_movimientos'),
-                func.sum(MovimientoInventario.cantidad).label('cantidad_total')
-            ).join(
-                MovimientoInventario, Producto.id_producto == MovimientoInventario.id_producto
-            ).filter(
-                MovimientoInventario.fecha_movimiento >= fecha_movimientos,
-                Producto.activo == True
-            ).group_by(
-                Producto.id_producto
-            ).order_by(
-                desc('total_movimientos')
-            ).limit(10).all()
-            
-            # Productos con stock crítico
-            productos_criticos = self.db.query(Producto).filter(
-                Producto.activo == True,
-                Producto.stock_actual <= Producto.stock_minimo
-            ).order_by(Producto.stock_actual).limit(5).all()
-            
-            return {
-                "estadisticas_generales": {
-                    "total_productos": total_productos,
-                    "productos_stock_bajo": productos_stock_bajo,
-                    "productos_agotados": productos_agotados,
-                    "valor_total_inventario": valor_total_inventario,
-                    "movimientos_recientes": movimientos_recientes,
-                    "alertas_activas": alertas_activas,
-                    "alertas_criticas": alertas_criticas
-                },
-                "productos_movimentados": [
-                    {
-                        "codigo": p[0],
-                        "nombre": p[1],
-                        "total_movimientos": p[2],
-                        "cantidad_total": p[3]
-                    }
-                    for p in productos_movimentados
-                ],
-                "productos_criticos": [
-                    {
-                        "codigo": p.codigo_producto,
-                        "nombre": p.nombre_producto,
-                        "stock_actual": p.stock_actual,
-                        "stock_minimo": p.stock_minimo
-                    }
-                    for p in productos_criticos
-                ]
-            }
-            
-        except Exception as e:
-            return {"error": str(e)}
+        if not fecha_inicio:
+            fecha_inicio = datetime.now() - timedelta(days=30)
+        if not fecha_fin:
+            fecha_fin = datetime.now()
+        
+        query = self._consultar_movimientos(producto_id, fecha_inicio, fecha_fin, tipo_movimiento)
+        filas = (
+            self._formatear_fila_movimiento(fila)
+            for fila in query.yield_per(TAMANO_LOTE_EXPORTACION)
+        )
+        
+        return exportar(
+            formato,
+            f"reporte_movimientos_{datetime.now().strftime('%Y%m%d')}",
+            COLUMNAS_REPORTE_MOVIMIENTOS,
+            filas
+        )
     
-    def _generar_excel(self, datos: List[Dict], nombre_archivo: str) -> Dict[str, Any]:
+    def _consultar_movimientos(self, producto_id: int, fecha_inicio: datetime, fecha_fin: datetime,
+                               tipo_movimiento: str = None):
         """
-        Genera archivo Excel con los datos
+        Consulta de movimientos del período con solo las columnas del reporte
         """
-        try:
-            df = pd.DataFrame(datos)
-            
-            # Crear archivo en memoria
-            buffer = BytesIO()
-            with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Datos')
-            
-            buffer.seek(0)
-            
-            return {
-                "archivo": buffer.getvalue(),
-                "nombre": f"{nombre_archivo}.xlsx",
-                "mime_type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            }
-            
-        except Exception as e:
-            return {"error": f"Error al generar Excel: {str(e)}"}
+        query = self.db.query(
+            MovimientoInventario.fecha_movimiento,
+            MovimientoInventario.tipo_movimiento,
+            MovimientoInventario.cantidad,
+            MovimientoInventario.cantidad_anterior,
+            MovimientoInventario.cantidad_nueva,
+            MovimientoInventario.motivo,
+            MovimientoInventario.costo_unitario,
+            Producto.codigo_producto,
+            Producto.nombre_producto,
+            Producto.precio_compra,
+            Usuario.nombre_completo
+        ).join(
+            Producto, Producto.id_producto == MovimientoInventario.id_producto
+        ).outerjoin(
+            Usuario, Usuario.id_usuario == MovimientoInventario.id_usuario
+        ).filter(
+            MovimientoInventario.fecha_movimiento >= fecha_inicio,
+            MovimientoInventario.fecha_movimiento <= fecha_fin
+        )
+        
+        if producto_id:
+            query = query.filter(MovimientoInventario.id_producto == producto_id)
+        
+        if tipo_movimiento:
+            query = query.filter(MovimientoInventario.tipo_movimiento == tipo_movimiento)
+        
+        return query.order_by(desc(MovimientoInventario.fecha_movimiento), desc(MovimientoInventario.id_movimiento))
     
-    def _generar_csv(self, datos: List[Dict], nombre_archivo: str) -> Dict[str, Any]:
+    def _formatear_fila_movimiento(self, fila) -> Dict[str, Any]:
+        """
+        Convierte una fila de _consultar_movimientos al formato del reporte
+        """
+        # Mismo criterio que MovimientoInventario.calcular_valor_movimiento
+        costo = fila.costo_unitario or fila.precio_compra or 0
+        return {
+            "fecha": fila.fecha_movimiento,
+            "producto_codigo": fila.codigo_producto,
+            "producto_nombre": fila.nombre_producto,
+            "tipo_movimiento": fila.tipo_movimiento.value,
+            "cantidad": fila.cantidad,
+            "stock_anterior": fila.cantidad_anterior,
+            "stock_nuevo": fila.cantidad_nueva,
+            "motivo": fila.motivo,
+            "usuario": fila.nombre_completo or "Sistema",
+            "valor_movimiento": float(fila.cantidad * costo)
+        }
+    
+    def generar_dashboard_datos(self) -> Dict[str, Any]:
         """
-        Genera archivo CSV con los datos
+        Genera datos para el dashboard principal
         """
         try:
-            if not datos:
-                return {"error": "No hay datos para generar el CSV"}
-            
-            output = StringIO()
-            writer = csv.DictWriter(output, fieldnames=datos[0].keys())
-            writer.writeheader()
-            writer.writerows(datos)
-            
-            csv_data = output.getvalue()
-            output.close()
+            # Contadores precalculados (O(1)); solo las listas consultan la base de datos
+            motor = MotorEstadisticas(self.db)
+            resumen = instantanea_inventario.obtener(self.db)
             
             return {
-                "archivo": csv_data.encode('utf-8'),
-                "nombre": f"{nombre_archivo}.csv",
-                "mime_type": "text/csv"
+                "estadisticas_generales": {
+                    "total_productos": resumen["total_productos"],
+                    "productos_stock_bajo": resumen["productos_stock_bajo"],
+                    "productos_agotados": resumen["productos_agotados"],
+                    "valor_total_inventario": resumen["valor_total_inventario"],
+                    "movimientos_recientes": resumen["movimientos_recientes"],
+                    "alertas_activas": resumen["alertas_activas"],
+                    "alertas_criticas": resumen["alertas_criticas"]
+                },
+                "productos_movimentados": motor.productos_mas_movidos(dias=30, limite=10),
+                "productos_criticos": motor.productos_criticos(limite=5)
             }
             
         except Exception as e:
-            return {"error": f"Error al generar CSV: {str(e)}"}
+            return {"error": str(e)}
     
-    def generar_grafico_inventario(self) -> Dict[str, Any]:
+    def generar_grafico_inventario(self, formato: str = "png") -> Dict[str, Any]:
         """
-        Genera gráfico de estado del inventario
+        Genera gráfico de estado del inventario (PNG o SVG).
+        Los datos se agregan en SQL y la imagen se renderiza en el pool de
+        procesos de servicio_graficos, que la reutiliza mientras los datos no cambien.
         """
         try:
-            import matplotlib.pyplot as plt
-            import seaborn as sns
-            
-            # Configurar matplotlib para evitar problemas de renderizado
-            plt.switch_backend("Agg")
-            plt.style.use("seaborn-v0_8")
-            sns.set_palette("husl")
-            plt.rcParams["font.sans-serif"] = ["Noto Sans CJK SC", "WenQuanYi Zen Hei", "PingFang SC", "Arial Unicode MS", "Hiragino Sans GB"]
-            plt.rcParams["axes.unicode_minus"] = False
-            
-            # Obtener datos
-            productos = self.db.query(Producto).filter(Producto.activo == True).all()
-            
-            estados_stock = {}
-            for producto in productos:
-                estado = producto.obtener_estado_stock()
-                estados_stock[estado] = estados_stock.get(estado, 0) + 1
-            
-            # Crear gráfico
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-            
-            # Gráfico de torta
-            colores = ['#ff9999', '#ffcc99', '#99ff99', '#99ccff']
-            ax1.pie(estados_stock.values(), labels=estados_stock.keys(), autopct='%1.1f%%', 
-                   colors=colores[:len(estados_stock)])
-            ax1.set_title('Distribución de Estados de Stock')
-            
-            # Gráfico de barras por categoría
-            categorias = self.db.query(
-                Producto.categoria,
-                func.count(Producto.id_producto),
-                func.sum(Producto.stock_actual)
-            ).join(
-                Producto, Producto.id_categoria == Producto.categoria
-            ).filter(
-                Producto.activo == True
-            ).group_by(Producto.categoria).all()
-            
-            if categorias:
-                cat_nombres = [cat[0].nombre_categoria for cat in categorias if cat[0]]
-                cat_productos = [cat[1] for cat in categorias if cat[0]]
-                
-                ax2.bar(cat_nombres, cat_productos)
-                ax2.set_title('Productos por Categoría')
-                ax2.set_xlabel('Categoría')
-                ax2.set_ylabel('Número de Productos')
-                plt.setp(ax2.get_xticklabels(), rotation=45, ha='right')
-            
-            plt.tight_layout()
-            
-            # Guardar gráfico
-            buffer = BytesIO()
-            plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            
-            return {
-                "imagen": buffer.getvalue(),
-                "formato": "image/png"
-            }
-            
+            return servicio_graficos.grafico_inventario(self.db, formato)
         except Exception as e:
             return {"error": f"Error al generar gráfico: {str(e)}"}
@@ -0,0 +1,40 @@
+"""
+Servicio Asíncrono de Contraseñas
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from controlador.pool_acotado import PoolAcotado
+import os
+
+# Número máximo de operaciones bcrypt simultáneas por proceso
+PASSWORD_MAX_CONCURRENCIA = int(os.getenv("PASSWORD_MAX_CONCURRENCIA", str(min(4, os.cpu_count() or 1))))
+
+class ServicioPasswords(PoolAcotado):
+    """
+    Ejecuta bcrypt en un pool de hilos acotado para no bloquear el event loop.
+
+    bcrypt libera el GIL mientras calcula el hash, por lo que los hilos
+    aprovechan varios núcleos; las solicitudes que superan la concurrencia
+    máxima esperan en la cola del pool.
+    """
+
+    def __init__(self, max_concurrencia: int = PASSWORD_MAX_CONCURRENCIA):
+        super().__init__(max_concurrencia, prefijo_hilos="bcrypt")
+
+    async def hash_password(self, password: str) -> str:
+        """
+        Hashea una contraseña en el pool de trabajo
+        """
+        from controlador.auth import hash_password
+        return await self._ejecutar(hash_password, password)
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verifica una contraseña en el pool de trabajo
+        """
+        from controlador.auth import verify_password
+        return await self._ejecutar(verify_password, plain_password, hashed_password)
+
+# Instancia compartida por todo el proceso
+servicio_passwords = ServicioPasswords()
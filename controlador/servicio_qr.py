@@ -0,0 +1,135 @@
+"""
+Servicio de Imágenes QR
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from sqlalchemy.orm import Session
+from modelo.producto import Producto
+from controlador.almacen_configuracion import almacen_configuracion
+from typing import Optional, Dict, Any
+import hashlib
+import os
+import tempfile
+import uuid
+
+# Directorio donde se guardan las imágenes QR generadas
+QR_DIRECTORIO = os.getenv("QR_DIRECTORIO", os.path.join(tempfile.gettempdir(), "stocktrack_qr"))
+
+QR_BASE_URL_POR_DEFECTO = "https://stocktrack.app"
+
+def datos_qr(codigo_producto: str, base_url: str) -> str:
+    """
+    Texto codificado en el QR de un producto
+    """
+    return f"{base_url}/producto/{codigo_producto}"
+
+def url_qr(codigo_producto: str) -> str:
+    """
+    URL pública de la imagen QR de un producto
+    """
+    return f"/qr/{codigo_producto}.png"
+
+def renderizar_qr(datos: str) -> bytes:
+    """
+    Genera el PNG de un código QR (qrcode se importa solo al renderizar)
+    """
+    import qrcode
+    from io import BytesIO
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(datos)
+    qr.make(fit=True)
+
+    buffer = BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+class ServicioQR:
+    """
+    Imágenes QR de productos generadas bajo demanda.
+
+    La imagen codifica el texto QR guardado en el producto (qr_code) y se
+    guarda en disco con el nombre de la huella de ese texto, que también
+    sirve de ETag: la primera petición la genera y las siguientes se sirven
+    desde el fichero o con un 304.
+    """
+
+    def __init__(self, directorio: str = QR_DIRECTORIO):
+        self.directorio = directorio
+        self.generadas = 0
+
+    def obtener_base_url(self, db: Session) -> str:
+        """
+        URL base configurada para los códigos QR
+        """
+        return almacen_configuracion.obtener(db, "qr_base_url", QR_BASE_URL_POR_DEFECTO)
+
+    def obtener_datos(self, db: Session, codigo_producto: str) -> Optional[str]:
+        """
+        Texto QR de un producto activo (el guardado en qr_code o, si no tiene,
+        el de la URL base configurada); None si el producto no existe
+        """
+        codigo_producto = codigo_producto.strip().upper()
+        producto = db.query(Producto.qr_code).filter(
+            Producto.codigo_producto == codigo_producto,
+            Producto.activo == True
+        ).first()
+        if not producto:
+            return None
+        return producto.qr_code or datos_qr(codigo_producto, self.obtener_base_url(db))
+
+    def huella(self, datos: str) -> str:
+        """
+        Identificador de la imagen: SHA-256 del texto codificado
+        """
+        return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+    def ruta(self, huella: str) -> str:
+        """
+        Ruta en disco de una imagen
+        """
+        return os.path.join(self.directorio, f"{huella}.png")
+
+    def obtener_imagen(self, datos: str) -> Dict[str, Any]:
+        """
+        Obtiene la ruta de la imagen QR de un texto, generándola si no existe
+        """
+        huella = self.huella(datos)
+        ruta = self.ruta(huella)
+        if not os.path.exists(ruta):
+            self.generar(datos)
+        return {"ruta": ruta, "huella": huella}
+
+    def generar(self, datos: str) -> str:
+        """
+        Genera (o regenera) la imagen QR de un texto y devuelve su ruta
+        """
+        ruta = self.ruta(self.huella(datos))
+        os.makedirs(self.directorio, exist_ok=True)
+
+        # Escritura atómica: nunca se sirve una imagen a medio escribir
+        ruta_temporal = f"{ruta}.{uuid.uuid4().hex}.tmp"
+        with open(ruta_temporal, "wb") as archivo:
+            archivo.write(renderizar_qr(datos))
+        os.replace(ruta_temporal, ruta)
+
+        self.generadas += 1
+        return ruta
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del servicio
+        """
+        return {
+            "directorio": self.directorio,
+            "generadas": self.generadas
+        }
+
+# Instancia compartida por todo el proceso
+servicio_qr = ServicioQR()
@@ -0,0 +1,388 @@
+"""
+Cola de Trabajos de Reportes
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from config.replicas import enrutador_lecturas
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+# Reportes que se generan a la vez por proceso
+REPORTES_MAX_TRABAJADORES = int(os.getenv("REPORTES_MAX_TRABAJADORES", "2"))
+
+# Directorio de artefactos generados y segundos que se conservan
+REPORTES_DIRECTORIO = os.getenv("REPORTES_DIRECTORIO", os.path.join(tempfile.gettempdir(), "stocktrack_reportes"))
+REPORTES_TTL_ARTEFACTOS = int(os.getenv("REPORTES_TTL_ARTEFACTOS", "3600"))
+
+# Segundos mínimos entre dos purgas de artefactos vencidos
+INTERVALO_PURGA = 60
+
+# Periodo de los reportes sin fechas (el mismo que usa ControladorReportes)
+DIAS_REPORTE_POR_DEFECTO = 30
+
+# Formatos admitidos por tipo de reporte
+FORMATOS_POR_TIPO = {
+    "inventario": ("csv", "excel"),
+    "movimientos": ("csv", "excel"),
+    "grafico_inventario": ("png", "svg")
+}
+
+EXTENSIONES = {"csv": "csv", "excel": "xlsx", "png": "png", "svg": "svg"}
+MIME_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "png": "image/png",
+    "svg": "image/svg+xml"
+}
+
+ESTADOS_ACTIVOS = ("pendiente", "en_proceso")
+
+CAMPOS_FECHA_TRABAJO = ("fecha_creacion", "fecha_fin")
+
+PATRON_ID_TRABAJO = re.compile(r"[0-9a-f]{32}")
+
+def normalizar_especificacion(datos: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Valida una especificación de reporte y la deja en forma canónica;
+    lanza ValueError si no es válida
+    """
+    tipo = str(datos.get("tipo") or "").lower()
+    if tipo not in FORMATOS_POR_TIPO:
+        raise ValueError(f"Tipo de reporte no soportado: {tipo or '(vacío)'}")
+
+    formatos = FORMATOS_POR_TIPO[tipo]
+    formato = str(datos.get("formato") or formatos[0]).lower()
+    if formato not in formatos:
+        raise ValueError(f"Formato no soportado para el reporte {tipo}: {formato}")
+
+    especificacion = {"tipo": tipo, "formato": formato}
+    if tipo == "grafico_inventario":
+        return especificacion
+
+    # Las fechas por defecto se resuelven aquí para que formen parte de la
+    # huella; se truncan al minuto para que peticiones seguidas compartan artefacto
+    fecha_fin = datetime.fromisoformat(datos["fecha_fin"]) if datos.get("fecha_fin") else \
+        datetime.now().replace(second=0, microsecond=0)
+    fecha_inicio = datetime.fromisoformat(datos["fecha_inicio"]) if datos.get("fecha_inicio") else \
+        fecha_fin - timedelta(days=DIAS_REPORTE_POR_DEFECTO)
+    especificacion["fecha_inicio"] = fecha_inicio.isoformat()
+    especificacion["fecha_fin"] = fecha_fin.isoformat()
+
+    if tipo == "inventario":
+        especificacion["categoria_id"] = int(datos["categoria_id"]) if datos.get("categoria_id") else None
+    else:
+        especificacion["producto_id"] = int(datos["producto_id"]) if datos.get("producto_id") else None
+        especificacion["tipo_movimiento"] = datos.get("tipo_movimiento") or None
+
+    return especificacion
+
+def clave_especificacion(especificacion: Dict[str, Any]) -> str:
+    """
+    Huella SHA-256 de una especificación canónica; identifica su artefacto
+    """
+    datos = json.dumps(especificacion, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+class ColaReportes:
+    """
+    Genera reportes pesados fuera de la petición HTTP.
+
+    Cada especificación se identifica por su huella: si ya se está generando
+    se espera a esa generación, y si su artefacto sigue vigente en disco se
+    sirve sin volver a generarlo. Los trabajos son de quien los pidió y sus
+    datos se guardan en disco junto a los artefactos ({id}.json), así que
+    cualquier worker que comparta REPORTES_DIRECTORIO puede consultarlos y
+    servir su descarga. Artefactos y trabajos vencen a los
+    REPORTES_TTL_ARTEFACTOS segundos.
+    """
+
+    def __init__(self, directorio: str = REPORTES_DIRECTORIO,
+                 max_trabajadores: int = REPORTES_MAX_TRABAJADORES,
+                 ttl_artefactos: int = REPORTES_TTL_ARTEFACTOS):
+        self.directorio = directorio
+        self.max_trabajadores = max(1, max_trabajadores)
+        self.ttl_artefactos = ttl_artefactos
+        self._executor = None
+        self._lock = threading.Lock()
+        self._trabajos = {}
+        self._trabajo_por_clave = {}
+        self._generaciones = {}
+        self._ultima_purga = 0.0
+        self.encolados = 0
+        self.reutilizados = 0
+        self.completados = 0
+        self.fallidos = 0
+
+    def encolar(self, datos: Dict[str, Any], usuario_id: int = None) -> Dict[str, Any]:
+        """
+        Encola un reporte (o reutiliza uno equivalente) y devuelve su trabajo
+        """
+        especificacion = normalizar_especificacion(datos)
+        clave = clave_especificacion(especificacion)
+        self._purgar_expirados()
+
+        with self._lock:
+            trabajo = self._trabajos.get(self._trabajo_por_clave.get((clave, usuario_id)))
+            if trabajo and (trabajo["estado"] in ESTADOS_ACTIVOS or self._artefacto_vigente(trabajo)):
+                self.reutilizados += 1
+                return self._publico(trabajo)
+
+            trabajo = self._nuevo_trabajo(especificacion, clave, usuario_id)
+            if clave in self._generaciones:
+                # Otro usuario ya lo está generando: el trabajo sigue a esa generación
+                trabajo["estado"] = self._generaciones[clave][0]["estado"]
+                self._generaciones[clave].append(trabajo)
+                self.reutilizados += 1
+            elif self._artefacto_vigente(trabajo):
+                # Artefacto generado antes (por otro trabajo o proceso)
+                trabajo["estado"] = "completado"
+                trabajo["fecha_fin"] = datetime.now()
+                self.reutilizados += 1
+            else:
+                self._generaciones[clave] = [trabajo]
+                self.encolados += 1
+                self._obtener_executor().submit(self._ejecutar, clave, especificacion, trabajo["ruta"])
+
+            self._trabajos[trabajo["id"]] = trabajo
+            self._trabajo_por_clave[(clave, usuario_id)] = trabajo["id"]
+            self._guardar(trabajo)
+            return self._publico(trabajo)
+
+    def obtener(self, trabajo_id: str, usuario_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el estado de un trabajo del usuario
+        """
+        trabajo = self._buscar(trabajo_id, usuario_id)
+        return self._publico(trabajo) if trabajo else None
+
+    def obtener_artefacto(self, trabajo_id: str, usuario_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene la ruta del artefacto de un trabajo completado y vigente del usuario
+        """
+        trabajo = self._buscar(trabajo_id, usuario_id)
+        if not trabajo or trabajo["estado"] != "completado" or not self._artefacto_vigente(trabajo):
+            return None
+        return {
+            "ruta": trabajo["ruta"],
+            "nombre": trabajo["nombre_archivo"],
+            "mime_type": MIME_TYPES[trabajo["especificacion"]["formato"]]
+        }
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas de la cola
+        """
+        with self._lock:
+            estados = [t["estado"] for t in self._trabajos.values()]
+            return {
+                "max_trabajadores": self.max_trabajadores,
+                "ttl_artefactos": self.ttl_artefactos,
+                "pendientes": estados.count("pendiente"),
+                "en_proceso": estados.count("en_proceso"),
+                "trabajos_registrados": len(estados),
+                "encolados": self.encolados,
+                "reutilizados": self.reutilizados,
+                "completados": self.completados,
+                "fallidos": self.fallidos
+            }
+
+    def cerrar(self):
+        """
+        Detiene el pool de trabajo descartando los trabajos pendientes
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _obtener_executor(self) -> ThreadPoolExecutor:
+        """Crea el pool de trabajo la primera vez que se necesita (con el lock adquirido)"""
+        if self._executor is None:
+            os.makedirs(self.directorio, exist_ok=True)
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_trabajadores,
+                thread_name_prefix="reportes"
+            )
+        return self._executor
+
+    def _nuevo_trabajo(self, especificacion: Dict[str, Any], clave: str, usuario_id: int) -> Dict[str, Any]:
+        """Registro interno de un trabajo"""
+        extension = EXTENSIONES[especificacion["formato"]]
+        return {
+            "id": uuid.uuid4().hex,
+            "clave": clave,
+            "especificacion": especificacion,
+            "usuario_id": usuario_id,
+            "estado": "pendiente",
+            "error": None,
+            "fecha_creacion": datetime.now(),
+            "fecha_fin": None,
+            "ruta": os.path.join(self.directorio, f"{clave}.{extension}"),
+            "nombre_archivo": f"reporte_{especificacion['tipo']}_{datetime.now().strftime('%Y%m%d')}.{extension}"
+        }
+
+    def _buscar(self, trabajo_id: str, usuario_id: int) -> Optional[Dict[str, Any]]:
+        """Trabajo de este proceso o, si no, el guardado en disco por otro worker"""
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            trabajo = dict(trabajo) if trabajo else None
+        if trabajo is None:
+            trabajo = self._cargar(trabajo_id)
+        if not trabajo or trabajo["usuario_id"] != usuario_id:
+            return None
+        return trabajo
+
+    def _ruta_trabajo(self, trabajo_id: str) -> str:
+        """Fichero con los datos de un trabajo"""
+        return os.path.join(self.directorio, f"{trabajo_id}.json")
+
+    def _guardar(self, trabajo: Dict[str, Any]):
+        """Escribe los datos de un trabajo en disco (con el lock adquirido)"""
+        datos = dict(trabajo)
+        for campo in CAMPOS_FECHA_TRABAJO:
+            datos[campo] = datos[campo].isoformat() if datos[campo] else None
+
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self._ruta_trabajo(trabajo["id"])
+        ruta_temporal = f"{ruta}.{uuid.uuid4().hex}.tmp"
+        with open(ruta_temporal, "w", encoding="utf-8") as archivo:
+            json.dump(datos, archivo)
+        os.replace(ruta_temporal, ruta)
+
+    def _cargar(self, trabajo_id: str) -> Optional[Dict[str, Any]]:
+        """Lee de disco los datos de un trabajo; None si no existe o ha vencido"""
+        if not PATRON_ID_TRABAJO.fullmatch(trabajo_id or ""):
+            return None
+        try:
+            with open(self._ruta_trabajo(trabajo_id), encoding="utf-8") as archivo:
+                trabajo = json.load(archivo)
+        except (OSError, ValueError):
+            return None
+
+        for campo in CAMPOS_FECHA_TRABAJO:
+            trabajo[campo] = datetime.fromisoformat(trabajo[campo]) if trabajo[campo] else None
+        return trabajo
+
+    def _publico(self, trabajo: Dict[str, Any]) -> Dict[str, Any]:
+        """Datos de un trabajo que se devuelven al cliente"""
+        return {
+            "id": trabajo["id"],
+            "estado": trabajo["estado"],
+            "especificacion": dict(trabajo["especificacion"]),
+            "error": trabajo["error"],
+            "fecha_creacion": trabajo["fecha_creacion"],
+            "fecha_fin": trabajo["fecha_fin"],
+            "nombre_archivo": trabajo["nombre_archivo"],
+            "url_descarga": f"/api/reportes/jobs/{trabajo['id']}/descarga" if trabajo["estado"] == "completado" else None
+        }
+
+    def _artefacto_vigente(self, trabajo: Dict[str, Any]) -> bool:
+        """El artefacto existe y no ha vencido"""
+        try:
+            return time.time() - os.path.getmtime(trabajo["ruta"]) < self.ttl_artefactos
+        except OSError:
+            return False
+
+    def _ejecutar(self, clave: str, especificacion: Dict[str, Any], ruta: str):
+        """Genera en un hilo del pool el artefacto de una huella y cierra sus trabajos"""
+        with self._lock:
+            for trabajo in self._generaciones.get(clave, []):
+                trabajo["estado"] = "en_proceso"
+                self._guardar(trabajo)
+
+        ruta_temporal = f"{ruta}.{uuid.uuid4().hex}.tmp"
+        # Los reportes solo leen: van a una réplica si hay alguna al día
+        db = enrutador_lecturas.crear_sesion_lectura()
+        try:
+            with open(ruta_temporal, "wb") as archivo:
+                for bloque in self._generar(db, especificacion):
+                    archivo.write(bloque)
+            # Publicación atómica: nunca se sirve un artefacto a medio escribir
+            os.replace(ruta_temporal, ruta)
+            self._terminar(clave, "completado")
+        except Exception as e:
+            self._terminar(clave, "error", str(e))
+            if os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+        finally:
+            db.close()
+
+    def _terminar(self, clave: str, estado: str, error: str = None):
+        """Cierra todos los trabajos que esperaban a la generación de una huella"""
+        with self._lock:
+            for trabajo in self._generaciones.pop(clave, []):
+                trabajo["estado"] = estado
+                trabajo["error"] = error
+                trabajo["fecha_fin"] = datetime.now()
+                self._guardar(trabajo)
+            if estado == "completado":
+                self.completados += 1
+            else:
+                self.fallidos += 1
+
+    def _generar(self, db, especificacion: Dict[str, Any]):
+        """Bloques de bytes del reporte descrito por la especificación"""
+        from controlador.reportes import ControladorReportes
+        reportes = ControladorReportes(db)
+        tipo = especificacion["tipo"]
+
+        if tipo == "grafico_inventario":
+            resultado = reportes.generar_grafico_inventario(especificacion["formato"])
+            if "error" in resultado:
+                raise RuntimeError(resultado["error"])
+            return [resultado["imagen"]]
+
+        fecha_inicio = datetime.fromisoformat(especificacion["fecha_inicio"])
+        fecha_fin = datetime.fromisoformat(especificacion["fecha_fin"])
+
+        if tipo == "inventario":
+            exportacion = reportes.exportar_reporte_inventario(
+                fecha_inicio, fecha_fin, especificacion["categoria_id"], especificacion["formato"]
+            )
+        else:
+            exportacion = reportes.exportar_reporte_movimientos(
+                especificacion["producto_id"], fecha_inicio, fecha_fin,
+                especificacion["tipo_movimiento"], especificacion["formato"]
+            )
+        return exportacion["contenido"]
+
+    def _purgar_expirados(self):
+        """Elimina artefactos y trabajos vencidos y olvida los terminados que ya no sirven"""
+        ahora = time.time()
+        with self._lock:
+            if ahora - self._ultima_purga < INTERVALO_PURGA:
+                return
+            self._ultima_purga = ahora
+
+            for trabajo_id, trabajo in list(self._trabajos.items()):
+                if trabajo["estado"] in ESTADOS_ACTIVOS:
+                    continue
+                terminado = trabajo["fecha_fin"].timestamp() if trabajo["fecha_fin"] else ahora
+                if ahora - terminado >= self.ttl_artefactos:
+                    del self._trabajos[trabajo_id]
+                    clave = (trabajo["clave"], trabajo["usuario_id"])
+                    if self._trabajo_por_clave.get(clave) == trabajo_id:
+                        del self._trabajo_por_clave[clave]
+
+        if not os.path.isdir(self.directorio):
+            return
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                if ahora - os.path.getmtime(ruta) >= self.ttl_artefactos:
+                    os.remove(ruta)
+            except OSError:
+                pass
+
+# Instancia compartida por todo el proceso
+cola_reportes = ColaReportes()
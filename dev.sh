@@ -19,6 +19,7 @@ from config.database import crear_tablas
 crear_tablas()
 print('✓ Base de datos verificada')
 "
+python -m config.migraciones --aplicar
 
 # Iniciar aplicación con auto-reload
 uvicorn app:app --host 0.0.0.0 --port 8000 --reload --log-level debug
@@ -4,7 +4,8 @@ Sistema StockTrack
 Autor: MiniMax Agent
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum, ForeignKey, Index, case
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import func
 from config.database import Base
 from sqlalchemy.orm import relationship
@@ -23,11 +24,27 @@ class PrioridadAlerta(enum.Enum):
     ALTA = "alta"
     CRITICA = "critica"
 
+# Rango numérico de cada prioridad: ordenar y comparar por él da el mismo
+# resultado en Python y en SQL (un ENUM de MySQL se ordena por su índice
+# interno pero se compara como texto)
+RANGO_PRIORIDAD = {
+    PrioridadAlerta.BAJA: 0,
+    PrioridadAlerta.MEDIA: 1,
+    PrioridadAlerta.ALTA: 2,
+    PrioridadAlerta.CRITICA: 3
+}
+
 class AlertaStock(Base):
     """
     Modelo para la gestión de alertas de stock
     """
     __tablename__ = "alertas_stock"
+    __table_args__ = (
+        # Alertas abiertas de un producto y tipo (MotorAlertas)
+        Index("idx_alertas_deduplicacion", "resuelta", "id_producto", "tipo_alerta"),
+        # Alertas activas por prioridad y antigüedad (filtros del listado y estadísticas de vencidas)
+        Index("idx_alertas_sin_resolver", "resuelta", "prioridad", "fecha_creacion"),
+    )
     
     id_alerta = Column(Integer, primary_key=True, index=True)
     id_producto = Column(Integer, ForeignKey("productos.id_producto"), nullable=False)
@@ -43,6 +60,15 @@ class AlertaStock(Base):
     producto = relationship("Producto", back_populates="alertas")
     usuario_responsable = relationship("Usuario", foreign_keys=[id_usuario_responsable])
     
+    @hybrid_property
+    def rango_prioridad(self):
+        """Rango numérico de la prioridad (RANGO_PRIORIDAD)"""
+        return RANGO_PRIORIDAD.get(self.prioridad, 0)
+    
+    @rango_prioridad.expression
+    def rango_prioridad(cls):
+        return case(*[(cls.prioridad == prioridad, rango) for prioridad, rango in RANGO_PRIORIDAD.items()], else_=0)
+    
     def __repr__(self):
         return f"<AlertaStock(id={self.id_alerta}, producto={self.producto.nombre_producto if self.producto else 'N/A'}, tipo='{self.tipo_alerta}')>"
     
@@ -82,10 +108,10 @@ class AlertaStock(Base):
         """Verifica si la alerta es de alta prioridad"""
         return self.prioridad in [PrioridadAlerta.ALTA, PrioridadAlerta.CRITICA]
     
-    def esta_vencida(self):
-        """Verifica si la alerta está vencida (más de 7 días sin resolver)"""
+    def esta_vencida(self, dias=7):
+        """Verifica si la alerta está vencida (más de `dias` días sin resolver)"""
         from datetime import datetime, timedelta
-        return datetime.now() - self.fecha_creacion > timedelta(days=7)
+        return datetime.now() - self.fecha_creacion > timedelta(days=dias)
     
     def asignar_responsable(self, usuario_id):
         """Asigna un responsable a la alerta"""
@@ -40,21 +40,26 @@ class Configuracion(Base):
     
     def obtener_valor_typed(self):
         """Obtiene el valor con el tipo correcto"""
-        if self.tipo == TipoConfiguracion.STRING:
-            return self.valor
-        elif self.tipo == TipoConfiguracion.NUMBER:
+        return Configuracion.convertir_valor(self.valor, self.tipo)
+    
+    @staticmethod
+    def convertir_valor(valor, tipo):
+        """Convierte un valor guardado como texto a su tipo (sin cargar la configuración)"""
+        if tipo == TipoConfiguracion.STRING:
+            return valor
+        elif tipo == TipoConfiguracion.NUMBER:
             try:
-                return float(self.valor)
+                return float(valor)
             except ValueError:
                 return 0
-        elif self.tipo == TipoConfiguracion.BOOLEAN:
-            return self.valor.lower() in ('true', '1', 'yes', 'on')
-        elif self.tipo == TipoConfiguracion.JSON:
+        elif tipo == TipoConfiguracion.BOOLEAN:
+            return valor.lower() in ('true', '1', 'yes', 'on')
+        elif tipo == TipoConfiguracion.JSON:
             try:
-                return json.loads(self.valor)
+                return json.loads(valor)
             except json.JSONDecodeError:
                 return None
-        return self.valor
+        return valor
     
     def establecer_valor(self, valor, usuario_id=None):
         """
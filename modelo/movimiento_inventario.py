@@ -4,7 +4,7 @@ Sistema StockTrack
 Autor: MiniMax Agent
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Decimal, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, DECIMAL, ForeignKey, Enum, Index
 from sqlalchemy.sql import func
 from config.database import Base
 from sqlalchemy.orm import relationship
@@ -23,6 +23,10 @@ class MovimientoInventario(Base):
     Modelo para el registro de movimientos de inventario
     """
     __tablename__ = "movimientos_inventario"
+    __table_args__ = (
+        # Historial de un producto por fecha (ORDEN_MOVIMIENTOS, keyset por fecha e id)
+        Index("idx_movimientos_producto_fecha", "id_producto", "fecha_movimiento", "id_movimiento"),
+    )
     
     id_movimiento = Column(Integer, primary_key=True, index=True)
     id_producto = Column(Integer, ForeignKey("productos.id_producto"), nullable=False)
@@ -32,7 +36,7 @@ class MovimientoInventario(Base):
     cantidad_anterior = Column(Integer, nullable=False)
     cantidad_nueva = Column(Integer, nullable=False)
     motivo = Column(Text, nullable=True)
-    costo_unitario = Column(Decimal(10,2), default=0.00)
+    costo_unitario = Column(DECIMAL(10,2), default=0.00)
     fecha_movimiento = Column(DateTime, default=func.current_timestamp(), index=True)
     ubicacion_origen = Column(String(255), nullable=True)
     ubicacion_destino = Column(String(255), nullable=True)
@@ -4,13 +4,10 @@ Sistema StockTrack
 Autor: MiniMax Agent
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Decimal, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, DECIMAL, ForeignKey, Index
 from sqlalchemy.sql import func
 from config.database import Base
-from sqlalchemy.orm import relationship
-import qrcode
-from io import BytesIO
-import base64
+from sqlalchemy.orm import relationship, deferred
 import uuid
 
 class Producto(Base):
@@ -18,6 +15,14 @@ class Producto(Base):
     Modelo para la gestión de productos del inventario
     """
     __tablename__ = "productos"
+    __table_args__ = (
+        # Búsqueda de texto (MATCH ... AGAINST en controlador/busqueda_productos.py)
+        Index("ft_productos_busqueda", "nombre_producto", "codigo_producto", "descripcion", mysql_prefix="FULLTEXT"),
+        # Listado de activos ordenado por nombre (ORDEN_PRODUCTOS, keyset por nombre e id)
+        Index("idx_productos_activo_nombre", "activo", "nombre_producto", "id_producto"),
+        # Productos con stock bajo o agotados (dashboard, barrido de alertas)
+        Index("idx_productos_stock_bajo", "activo", "stock_actual", "stock_minimo"),
+    )
     
     id_producto = Column(Integer, primary_key=True, index=True)
     codigo_producto = Column(String(100), unique=True, nullable=False, index=True)
@@ -25,19 +30,19 @@ class Producto(Base):
     descripcion = Column(Text, nullable=True)
     id_categoria = Column(Integer, ForeignKey("categorias.id_categoria"), nullable=False)
     id_proveedor = Column(Integer, ForeignKey("proveedores.id_proveedor"), nullable=False)
-    precio_compra = Column(Decimal(10,2), default=0.00)
-    precio_venta = Column(Decimal(10,2), default=0.00)
+    precio_compra = Column(DECIMAL(10,2), default=0.00)
+    precio_venta = Column(DECIMAL(10,2), default=0.00)
     stock_minimo = Column(Integer, default=5)
     stock_actual = Column(Integer, default=0)
     ubicacion_almacen = Column(String(255), nullable=True)
     unidad_medida = Column(String(50), default="unidad")
-    peso = Column(Decimal(8,3), nullable=True)
+    peso = Column(DECIMAL(8,3), nullable=True)
     dimensiones = Column(String(100), nullable=True)
     fecha_creacion = Column(DateTime, default=func.current_timestamp())
     fecha_modificacion = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
     activo = Column(Boolean, default=True)
     qr_code = Column(Text, nullable=True)  # Texto del código QR
-    qr_data_url = Column(Text, nullable=True)  # Data URL de la imagen QR
+    qr_data_url = deferred(Column(Text, nullable=True))  # Obsoleto: la imagen se sirve en /qr/{codigo}.png
     
     # Relaciones
     categoria = relationship("Categoria", back_populates="productos")
@@ -50,11 +55,16 @@ class Producto(Base):
     
     def obtener_estado_stock(self):
         """Obtiene el estado actual del stock"""
-        if self.stock_actual <= self.stock_minimo // 2:
+        return Producto.calcular_estado_stock(self.stock_actual, self.stock_minimo)
+    
+    @staticmethod
+    def calcular_estado_stock(stock_actual, stock_minimo):
+        """Calcula el estado del stock a partir de sus valores (sin cargar el producto)"""
+        if stock_actual <= stock_minimo // 2:
             return "crítico"
-        elif self.stock_actual <= self.stock_minimo:
+        elif stock_actual <= stock_minimo:
             return "bajo"
-        elif self.stock_actual <= self.stock_minimo * 2:
+        elif stock_actual <= stock_minimo * 2:
             return "normal"
         else:
             return "alto"
@@ -65,35 +75,13 @@ class Producto(Base):
     
     def generar_codigo_qr(self, base_url="https://stocktrack.app"):
         """
-        Genera el código QR para el producto
+        Asigna el texto del código QR del producto.
+        La imagen se genera bajo demanda en controlador/servicio_qr.py
         """
-        # Crear datos del QR
-        qr_data = f"{base_url}/producto/{self.codigo_producto}"
-        
-        # Generar código QR
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        
-        # Crear imagen QR
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convertir a base64
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        data_url = f"data:image/png;base64,{img_str}"
-        
-        # Guardar en el producto
-        self.qr_code = qr_data
-        self.qr_data_url = data_url
+        self.qr_code = f"{base_url}/producto/{self.codigo_producto}"
+        self.qr_data_url = None
         
-        return data_url
+        return self.qr_code
     
     def registrar_entrada(self, cantidad, motivo="", costo_unitario=None, usuario_id=None):
         """
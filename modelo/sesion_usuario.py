@@ -4,7 +4,7 @@ Sistema StockTrack
 Autor: MiniMax Agent
 """
 
-from sqlalchemy import Column, String, Boolean, DateTime, Text, Integer, ForeignKey
+from sqlalchemy import Column, String, Boolean, DateTime, Text, Integer, ForeignKey, Index
 from sqlalchemy.sql import func
 from config.database import Base
 from sqlalchemy.orm import relationship
@@ -17,6 +17,10 @@ class SesionUsuario(Base):
     Modelo para la gestión de sesiones de usuario
     """
     __tablename__ = "sesiones_usuario"
+    __table_args__ = (
+        # Sesiones activas de un usuario (al desactivarlo se cierran todas)
+        Index("idx_sesiones_usuario_activa", "id_usuario", "activa"),
+    )
     
     id_sesion = Column(String(128), primary_key=True)
     id_usuario = Column(Integer, ForeignKey("usuarios.id_usuario"), nullable=False)
@@ -7,6 +7,7 @@ Autor: MiniMax Agent
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum
 from sqlalchemy.sql import func
 from config.database import Base
+from sqlalchemy.orm import relationship
 import enum
 from datetime import datetime
 
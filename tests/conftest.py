@@ -0,0 +1,53 @@
+"""
+Configuración de Pruebas
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+import os
+import sys
+
+# Las pruebas usan SQLite en memoria; debe fijarse antes de importar config.database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import modelo
+from config.database import Base
+
+@pytest.fixture
+def motor():
+    """Motor SQLite en memoria con todas las tablas creadas"""
+    motor = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(motor)
+    yield motor
+    motor.dispose()
+
+@pytest.fixture
+def db(motor):
+    """Sesión sobre el motor de pruebas"""
+    from controlador.almacen_configuracion import almacen_configuracion
+    # El almacén es global: que no sirva valores de la base de otra prueba
+    almacen_configuracion.invalidar()
+    sesion = sessionmaker(autocommit=False, autoflush=False, bind=motor)()
+    yield sesion
+    sesion.close()
+
+@contextmanager
+def contar_consultas(motor):
+    """Cuenta las sentencias SQL ejecutadas dentro del bloque"""
+    sentencias = []
+
+    def registrar(conexion, cursor, sentencia, parametros, contexto, executemany):
+        sentencias.append(sentencia)
+
+    event.listen(motor, "before_cursor_execute", registrar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(motor, "before_cursor_execute", registrar)
@@ -0,0 +1,52 @@
+"""
+Pruebas del Coste de Arranque
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# Librerías que solo deben cargarse al generar gráficos, QR o exportaciones
+MODULOS_PESADOS = ("openpyxl", "matplotlib", "reportlab", "pandas", "qrcode", "PIL")
+
+# Memoria máxima del proceso tras importar la aplicación
+ARRANQUE_RSS_MAX_MB = int(os.getenv("ARRANQUE_RSS_MAX_MB", "150"))
+
+# Segundos máximos para importar la aplicación
+ARRANQUE_SEGUNDOS_MAX = float(os.getenv("ARRANQUE_SEGUNDOS_MAX", "5"))
+
+MEDICION = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+import app
+segundos = time.perf_counter() - inicio
+cargados = [m for m in {modulos!r} if m in sys.modules]
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+from controlador.exportacion import obtener_exportador
+obtener_exportador("excel").obtener_generador()
+print(json.dumps({{"segundos": segundos, "rss_mb": rss_mb, "cargados": cargados,
+                  "openpyxl_tras_exportar": "openpyxl" in sys.modules}}))
+"""
+
+def medir_arranque() -> dict:
+    """Importa la aplicación en un proceso nuevo y mide tiempo, memoria y módulos cargados"""
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    entorno = dict(os.environ, DATABASE_URL="sqlite://")
+    salida = subprocess.run(
+        [sys.executable, "-c", MEDICION.format(modulos=MODULOS_PESADOS)],
+        cwd=raiz, env=entorno, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+def test_el_arranque_no_carga_librerias_pesadas():
+    medicion = medir_arranque()
+
+    assert medicion["cargados"] == [], medicion
+    assert medicion["segundos"] < ARRANQUE_SEGUNDOS_MAX, medicion
+    assert medicion["rss_mb"] < ARRANQUE_RSS_MAX_MB, medicion
+    # El backend de Excel se importa en la primera exportación
+    assert medicion["openpyxl_tras_exportar"], medicion
@@ -0,0 +1,34 @@
+"""
+Pruebas del Controlador de Autenticación
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+import asyncio
+import threading
+from sqlalchemy import event
+from controlador.auth import ControladorAutenticacion
+
+def test_login_ejecuta_las_consultas_fuera_del_event_loop(motor, db):
+    hilos = []
+
+    def registrar(conexion, cursor, sentencia, parametros, contexto, executemany):
+        hilos.append(threading.current_thread().name)
+
+    async def registrar_y_autenticar():
+        auth = ControladorAutenticacion(db)
+        registrado = await auth.registrar_usuario("ana@stocktrack.app", "secreto1", "Ana")
+        fallido = await auth.autenticar_usuario("ana@stocktrack.app", "incorrecta")
+        correcto = await auth.autenticar_usuario("ana@stocktrack.app", "secreto1")
+        return registrado, fallido, correcto
+
+    event.listen(motor, "before_cursor_execute", registrar)
+    try:
+        registrado, fallido, correcto = asyncio.run(registrar_y_autenticar())
+    finally:
+        event.remove(motor, "before_cursor_execute", registrar)
+
+    assert registrado[0] and not fallido[0] and correcto[0], (registrado, fallido, correcto)
+    assert correcto[2]["usuario"]["email"] == "ana@stocktrack.app"
+    # Todas las sentencias salen de los hilos del despachador de BD
+    assert hilos and all(nombre.startswith("bd") for nombre in hilos), hilos
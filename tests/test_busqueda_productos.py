@@ -0,0 +1,40 @@
+"""
+Pruebas de la Búsqueda de Productos
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+import types
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql
+from modelo.producto import Producto
+from controlador.busqueda_productos import BuscadorProductos, separar_palabras
+
+class SesionMySQL:
+    """Sesión mínima que solo informa del dialecto"""
+    def get_bind(self):
+        return types.SimpleNamespace(dialect=mysql.dialect())
+
+def sql_mysql(busqueda: str) -> str:
+    """SQL (MySQL) del filtro de búsqueda con los parámetros en línea"""
+    query = BuscadorProductos(SesionMySQL()).filtrar(select(Producto.id_producto), busqueda)
+    return str(query.compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+
+def test_separar_palabras_descarta_vacias_y_aparta_cortas():
+    assert separar_palabras("Tornillo de acero") == (["tornillo", "acero"], [])
+    assert separar_palabras("cable M8") == (["cable"], ["m8"])
+
+def test_palabras_vacias_no_se_exigen_en_el_match():
+    sql = sql_mysql("tornillo de acero")
+    assert "+tornillo* +acero*" in sql
+    assert "+de*" not in sql
+
+def test_palabras_cortas_se_filtran_con_like():
+    sql = sql_mysql("cable m8")
+    assert "+cable*" in sql and "+m8*" not in sql
+    assert "%m8%" in sql
+
+def test_sin_palabras_indexables_se_usa_like():
+    sql = sql_mysql("m8")
+    assert "MATCH" not in sql
+    assert "%m8%" in sql
@@ -0,0 +1,127 @@
+"""
+Prueba de Carga: Inicios de Sesión Concurrentes
+Sistema StockTrack
+Autor: MiniMax Agent
+
+Compara el rendimiento de POST /login mientras se generan reportes pesados,
+con el despachador de BD acotado (después) y con las consultas ejecutadas en
+el bucle de eventos (antes). Se ejecuta solo con STOCKTRACK_BENCHMARK=1:
+    STOCKTRACK_BENCHMARK=1 python -m pytest -q tests/test_carga_concurrente.py
+"""
+
+import os
+import time
+import asyncio
+from datetime import datetime, timedelta
+import bcrypt
+import httpx
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from config.database import Base, obtener_sesion
+from controlador.despachador_bd import despachador_bd
+from modelo.usuario import Usuario
+from test_rendimiento_reportes import poblar_movimientos
+import app as aplicacion
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("STOCKTRACK_BENCHMARK", "").lower() not in ("1", "true", "yes", "on"),
+    reason="benchmark opcional: STOCKTRACK_BENCHMARK=1"
+)
+
+MOVIMIENTOS_CARGA = 200_000
+LOGINS_CONCURRENTES = 16
+REPORTES_CONCURRENTES = 4
+
+# Inicios de sesión por segundo con el despachador frente a sin él
+CARGA_FACTOR_MIN = float(os.getenv("CARGA_FACTOR_MIN", "2"))
+
+EMAIL = "carga@stocktrack.app"
+PASSWORD = "carga123"
+
+async def _en_bucle(func, *args, **kwargs):
+    """Comportamiento anterior: la consulta bloquea el bucle de eventos"""
+    return func(*args, **kwargs)
+
+@pytest.fixture(scope="module")
+def fabrica(tmp_path_factory):
+    """Base SQLite en fichero (WAL) con catálogo, movimientos y un usuario con contraseña"""
+    ruta = tmp_path_factory.mktemp("carga") / "carga.db"
+    # Conexiones para todas las peticiones a la vez: sin despachador, esperar una
+    # conexión libre bloquearía el bucle que tiene que devolverla
+    motor = create_engine(f"sqlite:///{ruta}", pool_size=2 * (LOGINS_CONCURRENTES + REPORTES_CONCURRENTES),
+                          connect_args={"check_same_thread": False, "timeout": 30})
+
+    @event.listens_for(motor, "connect")
+    def _wal(conexion, _):
+        conexion.execute("PRAGMA journal_mode=WAL")
+
+    Base.metadata.create_all(motor)
+    poblar_movimientos(motor, MOVIMIENTOS_CARGA, datetime.now() - timedelta(days=30))
+    fabrica = sessionmaker(autocommit=False, autoflush=False, bind=motor)
+    with fabrica() as db:
+        # Coste bcrypt mínimo: se mide el trabajo de base de datos del login, no el hash
+        password_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(4)).decode("utf-8")
+        db.add(Usuario(email=EMAIL, password_hash=password_hash,
+                       nombre_completo="Carga", rol="OPERARIO", activo=True))
+        db.commit()
+    yield fabrica
+    motor.dispose()
+
+@pytest.fixture
+def cliente(fabrica):
+    """Aplicación con las sesiones (escritura y lectura) apuntando a la base de carga"""
+    def sesion():
+        db = fabrica()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    aplicacion.app.dependency_overrides[obtener_sesion] = sesion
+    aplicacion.app.dependency_overrides[aplicacion.obtener_sesion_lectura] = sesion
+    yield httpx.AsyncClient(transport=httpx.ASGITransport(app=aplicacion.app), base_url="http://carga")
+    aplicacion.app.dependency_overrides.clear()
+
+async def _medir_logins(cliente, token: str) -> float:
+    """Inicios de sesión por segundo mientras corren los reportes"""
+    async def login():
+        respuesta = await cliente.post("/login", data={"email": EMAIL, "password": PASSWORD})
+        assert respuesta.status_code == 302, respuesta.text
+        return time.perf_counter()
+
+    async def reporte():
+        respuesta = await cliente.get("/api/reportes/inventario",
+                                      headers={"Authorization": f"Bearer {token}"})
+        assert respuesta.status_code == 200, respuesta.text
+
+    comienzo = time.perf_counter()
+    reportes = [asyncio.create_task(reporte()) for _ in range(REPORTES_CONCURRENTES)]
+    # Los logins llegan justo después de los reportes
+    await asyncio.sleep(0)
+    fines = await asyncio.gather(*[login() for _ in range(LOGINS_CONCURRENTES)])
+    await asyncio.gather(*reportes)
+    return LOGINS_CONCURRENTES / (max(fines) - comienzo)
+
+def test_logins_concurrentes_no_esperan_a_los_reportes(cliente, monkeypatch, record_property):
+    async def escenario():
+        async with cliente:
+            # Un login previo da el token para los reportes y calienta bcrypt/plantillas
+            respuesta = await cliente.post("/login", data={"email": EMAIL, "password": PASSWORD})
+            assert respuesta.status_code == 302, respuesta.text
+            token = respuesta.cookies["session_token"]
+
+            despues = await _medir_logins(cliente, token)
+            with monkeypatch.context() as parche:
+                parche.setattr(despachador_bd, "ejecutar", _en_bucle)
+                antes = await _medir_logins(cliente, token)
+        return antes, despues
+
+    antes, despues = asyncio.run(escenario())
+    record_property("logins_por_segundo_antes", round(antes, 2))
+    record_property("logins_por_segundo_despues", round(despues, 2))
+
+    assert despues >= antes * CARGA_FACTOR_MIN, (
+        f"{despues:.2f} logins/s con el despachador frente a {antes:.2f} sin él "
+        f"(mínimo x{CARGA_FACTOR_MIN})"
+    )
@@ -0,0 +1,173 @@
+"""
+Pruebas del Número de Consultas de los Listados
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from conftest import contar_consultas
+from modelo.usuario import Usuario, RolUsuario
+from modelo.categoria import Categoria
+from modelo.proveedor import Proveedor
+from modelo.producto import Producto
+from modelo.movimiento_inventario import MovimientoInventario, TipoMovimiento
+from modelo.alerta_stock import AlertaStock, TipoAlerta, PrioridadAlerta, RANGO_PRIORIDAD
+from modelo.configuracion import Configuracion, TipoConfiguracion
+from controlador.producto import ControladorProductos
+from controlador.reportes import ControladorAlertas
+from controlador.almacen_configuracion import almacen_configuracion
+
+def poblar(db, productos: int, movimientos_por_producto: int = 3):
+    """Crea productos con categoría, proveedor, movimientos y una alerta cada uno"""
+    usuario = Usuario(email="operario@stocktrack.app", password_hash="x",
+                      nombre_completo="Operario", rol=RolUsuario.OPERARIO)
+    db.add(usuario)
+    db.flush()
+    for i in range(productos):
+        categoria = Categoria(nombre_categoria=f"Categoría {i}")
+        proveedor = Proveedor(nombre_proveedor=f"Proveedor {i}")
+        producto = Producto(codigo_producto=f"P{i:04d}", nombre_producto=f"Producto {i}",
+                            categoria=categoria, proveedor=proveedor,
+                            precio_compra=10, precio_venta=15, stock_minimo=5, stock_actual=i % 4)
+        db.add(producto)
+        db.flush()
+        for j in range(movimientos_por_producto):
+            db.add(MovimientoInventario(id_producto=producto.id_producto, id_usuario=usuario.id_usuario,
+                                        tipo_movimiento=TipoMovimiento.ENTRADA, cantidad=1,
+                                        cantidad_anterior=j, cantidad_nueva=j + 1))
+        db.add(AlertaStock(id_producto=producto.id_producto, tipo_alerta=TipoAlerta.STOCK_MINIMO,
+                           mensaje="Stock bajo", prioridad=PrioridadAlerta.MEDIA,
+                           id_usuario_responsable=usuario.id_usuario))
+    db.commit()
+    db.expire_all()
+
+def consultas(motor, db, funcion) -> int:
+    """Sentencias que ejecuta una llamada con la sesión recién expirada"""
+    db.expire_all()
+    with contar_consultas(motor) as sentencias:
+        resultado = funcion()
+    assert "error" not in resultado, resultado
+    return len(sentencias)
+
+@pytest.mark.parametrize("elementos_por_pagina", [5, 50])
+def test_listar_productos_no_depende_del_tamano_de_pagina(motor, db, elementos_por_pagina):
+    poblar(db, productos=60)
+    controlador = ControladorProductos(db)
+
+    total = consultas(motor, db, lambda: controlador.listar_productos(elementos_por_pagina=elementos_por_pagina))
+
+    # COUNT + página con categoría y proveedor unidos
+    assert total == 2
+
+def test_listar_productos_por_cursor(motor, db):
+    poblar(db, productos=30)
+    controlador = ControladorProductos(db)
+    primera = controlador.listar_productos(elementos_por_pagina=10, incluir_total=False)
+
+    total = consultas(motor, db, lambda: controlador.listar_productos(
+        elementos_por_pagina=10, cursor=primera["next_cursor"], incluir_total=False
+    ))
+
+    assert total == 1
+
+@pytest.mark.parametrize("elementos_por_pagina", [2, 20])
+def test_historial_producto_no_depende_del_tamano_de_pagina(motor, db, elementos_por_pagina):
+    poblar(db, productos=1, movimientos_por_producto=40)
+    controlador = ControladorProductos(db)
+    producto_id = db.query(Producto.id_producto).scalar()
+
+    total = consultas(motor, db, lambda: controlador.listar_movimientos_producto(
+        producto_id, elementos_por_pagina=elementos_por_pagina
+    ))
+
+    # Precio del producto + página con el usuario unido
+    assert total == 2
+
+@pytest.mark.parametrize("elementos_por_pagina", [5, 50])
+def test_listar_alertas_no_depende_del_tamano_de_pagina(motor, db, elementos_por_pagina):
+    poblar(db, productos=60)
+    controlador = ControladorAlertas(db)
+    # Los días de vencimiento se leen del almacén de configuración en memoria
+    almacen_configuracion.obtener(db, "inventario_dias_alerta_vencida")
+
+    total = consultas(motor, db, lambda: controlador.listar_alertas(elementos_por_pagina=elementos_por_pagina))
+
+    # COUNT + página con producto y responsable unidos
+    assert total == 2
+
+def test_las_alertas_vencidas_usan_los_dias_configurados(db):
+    poblar(db, productos=1)
+    almacen_configuracion.establecer(db, "inventario_dias_alerta_vencida", 1.25, TipoConfiguracion.NUMBER)
+    alerta = db.query(AlertaStock).one()
+    alerta.fecha_creacion = datetime.now() - timedelta(days=1, hours=1)
+    db.commit()
+    controlador = ControladorAlertas(db)
+
+    # Con los días truncados a 1 la alerta contaría como vencida
+    assert controlador.listar_alertas()["alertas"][0]["esta_vencida"] is False
+    assert controlador.obtener_estadisticas_alertas()["alertas_vencidas"] == 0
+
+    alerta.fecha_creacion = datetime.now() - timedelta(days=1, hours=7)
+    db.commit()
+    assert controlador.listar_alertas()["alertas"][0]["esta_vencida"] is True
+    assert controlador.obtener_estadisticas_alertas()["alertas_vencidas"] == 1
+
+def test_el_almacen_se_invalida_al_escribir_por_el(motor, db):
+    almacen_configuracion.establecer(db, "inventario_dias_alerta_vencida", 7, TipoConfiguracion.NUMBER)
+    assert almacen_configuracion.obtener(db, "inventario_dias_alerta_vencida") == 7
+
+    almacen_configuracion.establecer(db, "inventario_dias_alerta_vencida", 3, TipoConfiguracion.NUMBER)
+    with contar_consultas(motor) as sentencias:
+        assert almacen_configuracion.obtener(db, "inventario_dias_alerta_vencida") == 3
+        assert almacen_configuracion.obtener(db, "inventario_dias_alerta_vencida") == 3
+    # Una recarga tras la escritura y después desde memoria
+    assert len(sentencias) == 1
+
+    # El modelo escribe sin conocer el almacén: lo invalida quien escribe
+    Configuracion.establecer_configuracion(db, "inventario_dias_alerta_vencida", 5, TipoConfiguracion.NUMBER)
+    assert almacen_configuracion.obtener(db, "inventario_dias_alerta_vencida") == 3
+    assert Configuracion.obtener_configuracion(db, "inventario_dias_alerta_vencida") == 5
+
+def test_cursor_de_alertas_con_prioridades_mezcladas(db):
+    poblar(db, productos=1)
+    producto_id = db.query(Producto.id_producto).scalar()
+    prioridades = list(PrioridadAlerta)
+    creacion = datetime.now() - timedelta(hours=1)
+    for i in range(23):
+        # Fechas repetidas: el desempate lo decide el id
+        db.add(AlertaStock(id_producto=producto_id, tipo_alerta=TipoAlerta.STOCK_MINIMO, mensaje=f"Alerta {i}",
+                           prioridad=prioridades[(i * 3) % len(prioridades)],
+                           fecha_creacion=creacion - timedelta(minutes=i % 4)))
+    db.commit()
+    controlador = ControladorAlertas(db)
+    esperadas = db.query(AlertaStock).filter(AlertaStock.resuelta == False).all()
+
+    vistas, cursor = [], None
+    while True:
+        pagina = controlador.listar_alertas(elementos_por_pagina=5, cursor=cursor, incluir_total=False)
+        assert "error" not in pagina, pagina
+        vistas.extend(pagina["alertas"])
+        cursor = pagina["next_cursor"]
+        if not cursor:
+            break
+
+    ids = [alerta["id"] for alerta in vistas]
+    assert len(ids) == len(set(ids))
+    assert sorted(ids) == sorted(alerta.id_alerta for alerta in esperadas)
+    rangos = [RANGO_PRIORIDAD[PrioridadAlerta(alerta["prioridad"])] for alerta in vistas]
+    assert rangos == sorted(rangos, reverse=True)
+
+def test_orden_y_cursor_de_alertas_usan_el_mismo_rango_en_mysql(db):
+    from sqlalchemy.dialects import mysql
+    from controlador.paginacion import aplicar_orden, aplicar_cursor, codificar_cursor
+    from controlador.reportes import ORDEN_ALERTAS
+
+    alerta = AlertaStock(id_alerta=7, prioridad=PrioridadAlerta.ALTA, fecha_creacion=datetime(2024, 1, 1))
+    query = aplicar_cursor(aplicar_orden(db.query(AlertaStock), ORDEN_ALERTAS), ORDEN_ALERTAS,
+                           codificar_cursor(ORDEN_ALERTAS, alerta))
+    sql = str(query.statement.compile(dialect=mysql.dialect()))
+
+    where, order_by = sql.split("ORDER BY")
+    assert "CASE WHEN (alertas_stock.prioridad" in where and "CASE WHEN (alertas_stock.prioridad" in order_by
+    assert "alertas_stock.prioridad <" not in where
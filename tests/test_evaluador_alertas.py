@@ -0,0 +1,42 @@
+"""
+Pruebas del Evaluador de Alertas
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+import importlib
+from sqlalchemy.orm import sessionmaker
+from modelo.categoria import Categoria
+from modelo.proveedor import Proveedor
+from modelo.producto import Producto
+from modelo.alerta_stock import AlertaStock, TipoAlerta, PrioridadAlerta
+from controlador.evaluador_alertas import EvaluadorAlertas
+
+# controlador/__init__.py exporta la instancia con el mismo nombre que el módulo
+modulo_evaluador = importlib.import_module("controlador.evaluador_alertas")
+
+def test_el_barrido_resuelve_las_alertas_de_productos_inactivos(motor, db, monkeypatch):
+    producto = Producto(codigo_producto="P0001", nombre_producto="Producto", precio_compra=1, precio_venta=2,
+                        categoria=Categoria(nombre_categoria="Categoría"),
+                        proveedor=Proveedor(nombre_proveedor="Proveedor"),
+                        stock_minimo=5, stock_actual=1, activo=False)
+    db.add(producto)
+    db.flush()
+    db.add(AlertaStock(id_producto=producto.id_producto, tipo_alerta=TipoAlerta.STOCK_MINIMO,
+                       mensaje="Stock bajo", prioridad=PrioridadAlerta.MEDIA))
+    db.commit()
+    monkeypatch.setattr(modulo_evaluador, "SessionLocal", sessionmaker(bind=motor))
+
+    evaluador = EvaluadorAlertas()
+    evaluador._barrer()
+    lote = sorted(evaluador._pendientes)
+
+    assert lote == [producto.id_producto]
+    assert evaluador._evaluar_lote(lote)
+    assert evaluador.resueltas == 1
+    assert db.query(AlertaStock).filter(AlertaStock.resuelta == False).count() == 0
+
+    # El siguiente barrido ya no vuelve a encolar el producto
+    evaluador._pendientes.clear()
+    evaluador._barrer()
+    assert not evaluador._pendientes
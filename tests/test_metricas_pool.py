@@ -0,0 +1,46 @@
+"""
+Pruebas de las Métricas del Pool de Conexiones
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from sqlalchemy import create_engine, text
+from config.database import PoolMedido, crear_motor, obtener_metricas_pool, metricas_pool
+
+def motor_medido(ruta) -> object:
+    """Motor SQLite en fichero con el pool medido de MySQL"""
+    return create_engine(f"sqlite:///{ruta}", poolclass=PoolMedido, pool_size=2, max_overflow=0)
+
+def test_cada_pool_tiene_sus_metricas(tmp_path):
+    primaria = motor_medido(tmp_path / "primaria.db")
+    replica = motor_medido(tmp_path / "replica.db")
+
+    for _ in range(3):
+        with replica.connect() as conexion:
+            conexion.execute(text("SELECT 1"))
+
+    assert replica.pool.metricas.checkouts == 3
+    assert primaria.pool.metricas.checkouts == 0
+
+def test_las_metricas_sobreviven_a_dispose(tmp_path):
+    motor = motor_medido(tmp_path / "stocktrack.db")
+    with motor.connect() as conexion:
+        conexion.execute(text("SELECT 1"))
+    metricas = motor.pool.metricas
+
+    motor.dispose()
+    with motor.connect() as conexion:
+        conexion.execute(text("SELECT 1"))
+
+    assert motor.pool.metricas is metricas
+    assert metricas.checkouts == 2
+
+def test_crear_motor_registra_conexiones_por_motor(tmp_path):
+    motor, metricas = crear_motor(f"sqlite:///{tmp_path / 'replica.db'}")
+    with motor.connect() as conexion:
+        conexion.execute(text("SELECT 1"))
+
+    estado = obtener_metricas_pool(motor, metricas)
+
+    assert estado["conexiones_creadas"] == 1
+    assert metricas is not metricas_pool
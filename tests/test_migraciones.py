@@ -0,0 +1,100 @@
+"""
+Pruebas de la Migración de Índices y de los Planes de Consulta
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+import pytest
+from sqlalchemy import create_mock_engine, event, text
+from config.migraciones import indices_pendientes, crear_indices_pendientes, sentencias_indice
+from modelo.producto import Producto
+from modelo.alerta_stock import AlertaStock, TipoAlerta
+from controlador.producto import ControladorProductos
+from controlador.auth import ControladorAutenticacion
+from controlador.motor_alertas import MotorAlertas
+from test_consultas_listados import poblar
+
+def indice_modelo(nombre: str):
+    """Índice declarado en los modelos"""
+    return next(indice for indice in Producto.__table__.indexes if indice.name == nombre)
+
+def test_indice_con_el_mismo_nombre_y_otras_columnas_se_reemplaza(motor):
+    # Versión anterior de bd/stocktrack_base_datos.sql
+    with motor.begin() as conexion:
+        conexion.execute(text("DROP INDEX idx_productos_stock_bajo"))
+        conexion.execute(text("CREATE INDEX idx_productos_stock_bajo ON productos (stock_actual, stock_minimo, activo)"))
+
+    pendientes = indices_pendientes(motor)
+    assert [(indice.name, reemplazar) for indice, reemplazar in pendientes] == [("idx_productos_stock_bajo", True)]
+
+    assert crear_indices_pendientes(motor) == ["idx_productos_stock_bajo"]
+    assert indices_pendientes(motor) == []
+
+def test_indice_ausente_se_crea(motor):
+    with motor.begin() as conexion:
+        conexion.execute(text("DROP INDEX idx_productos_activo_nombre"))
+
+    assert [(indice.name, reemplazar) for indice, reemplazar in indices_pendientes(motor)] == \
+        [("idx_productos_activo_nombre", False)]
+
+def test_sentencias_mysql_en_linea():
+    mysql = create_mock_engine("mysql+pymysql://", lambda *args, **kwargs: None)
+
+    sentencias = sentencias_indice(indice_modelo("idx_productos_stock_bajo"), reemplazar=True, motor=mysql)
+
+    assert sentencias == [
+        "DROP INDEX idx_productos_stock_bajo ON productos ALGORITHM=INPLACE LOCK=NONE",
+        "CREATE INDEX idx_productos_stock_bajo ON productos (activo, stock_actual, stock_minimo) ALGORITHM=INPLACE LOCK=NONE"
+    ]
+
+@pytest.fixture
+def catalogo(motor, db):
+    """Catálogo con historial de alertas resueltas y estadísticas del planificador"""
+    poblar(db, productos=100)
+    for producto in db.query(Producto):
+        for _ in range(5):
+            db.add(AlertaStock(id_producto=producto.id_producto, tipo_alerta=TipoAlerta.STOCK_MINIMO,
+                               mensaje="Stock bajo", resuelta=True))
+    db.commit()
+    with motor.begin() as conexion:
+        conexion.execute(text("ANALYZE"))
+    db.expire_all()
+    return db
+
+def planes(motor, funcion) -> str:
+    """EXPLAIN QUERY PLAN de cada SELECT que ejecuta una llamada"""
+    consultas = []
+
+    def registrar(conexion, cursor, sentencia, parametros, contexto, executemany):
+        if sentencia.lstrip().upper().startswith("SELECT"):
+            consultas.append((sentencia, parametros))
+
+    event.listen(motor, "before_cursor_execute", registrar)
+    try:
+        funcion()
+    finally:
+        event.remove(motor, "before_cursor_execute", registrar)
+
+    with motor.connect() as conexion:
+        return "\n".join(
+            fila[-1]
+            for sentencia, parametros in consultas
+            for fila in conexion.exec_driver_sql(f"EXPLAIN QUERY PLAN {sentencia}", parametros)
+        )
+
+def test_plan_listado_de_productos(motor, catalogo):
+    plan = planes(motor, lambda: ControladorProductos(catalogo).listar_productos())
+    assert "idx_productos_activo_nombre" in plan, plan
+
+def test_plan_historial_de_movimientos(motor, catalogo):
+    plan = planes(motor, lambda: ControladorProductos(catalogo).listar_movimientos_producto(1))
+    assert "idx_movimientos_producto_fecha" in plan, plan
+
+def test_plan_deduplicacion_de_alertas(motor, catalogo):
+    productos = catalogo.query(Producto).order_by(Producto.id_producto).limit(5).all()
+    plan = planes(motor, lambda: MotorAlertas(catalogo).evaluar_productos(productos))
+    assert "idx_alertas_deduplicacion" in plan, plan
+
+def test_plan_sesiones_activas(motor, catalogo):
+    plan = planes(motor, lambda: ControladorAutenticacion(catalogo).desactivar_usuario(1))
+    assert "idx_sesiones_usuario_activa" in plan, plan
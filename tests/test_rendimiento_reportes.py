@@ -0,0 +1,99 @@
+"""
+Benchmark del Reporte de Inventario
+Sistema StockTrack
+Autor: MiniMax Agent
+
+Se ejecuta solo con STOCKTRACK_BENCHMARK=1 (tarda minutos con 1M de movimientos):
+    STOCKTRACK_BENCHMARK=1 python -m pytest -q tests/test_rendimiento_reportes.py
+"""
+
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from conftest import contar_consultas
+from config.database import Base
+from modelo.usuario import Usuario
+from modelo.categoria import Categoria
+from modelo.proveedor import Proveedor
+from modelo.producto import Producto
+from modelo.movimiento_inventario import MovimientoInventario, TipoMovimiento
+from controlador.reportes import ControladorReportes
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("STOCKTRACK_BENCHMARK", "").lower() not in ("1", "true", "yes", "on"),
+    reason="benchmark opcional: STOCKTRACK_BENCHMARK=1"
+)
+
+# Productos del catálogo: el tamaño del reporte no depende de los movimientos
+PRODUCTOS_BENCHMARK = 1000
+
+# Segundos máximos del reporte por número de movimientos (sobrescribible para todos)
+SEGUNDOS_MAX_POR_TAMANO = {10_000: 2.0, 100_000: 5.0, 1_000_000: 30.0}
+BENCHMARK_REPORTE_SEGUNDOS_MAX = os.getenv("BENCHMARK_REPORTE_SEGUNDOS_MAX")
+
+# Memoria Python máxima del reporte: la agregación va en SQL, así que no crece con los movimientos
+BENCHMARK_REPORTE_MB_MAX = float(os.getenv("BENCHMARK_REPORTE_MB_MAX", "20"))
+
+TAMANO_LOTE_INSERCION = 50_000
+
+def poblar_movimientos(motor, movimientos: int, inicio: datetime):
+    """Catálogo fijo y `movimientos` movimientos repartidos entre sus productos"""
+    tipos = list(TipoMovimiento)
+    with motor.begin() as conexion:
+        conexion.execute(insert(Usuario.__table__), [{
+            "id_usuario": 1, "email": "benchmark@stocktrack.app", "password_hash": "x",
+            "nombre_completo": "Benchmark", "rol": "OPERARIO", "activo": True
+        }])
+        conexion.execute(insert(Categoria.__table__), [{"id_categoria": 1, "nombre_categoria": "General"}])
+        conexion.execute(insert(Proveedor.__table__), [{"id_proveedor": 1, "nombre_proveedor": "General"}])
+        conexion.execute(insert(Producto.__table__), [{
+            "id_producto": i, "codigo_producto": f"P{i:06d}", "nombre_producto": f"Producto {i}",
+            "id_categoria": 1, "id_proveedor": 1, "precio_compra": 10, "precio_venta": 15,
+            "stock_actual": i % 50, "stock_minimo": 10, "activo": True
+        } for i in range(1, PRODUCTOS_BENCHMARK + 1)])
+
+        for desde in range(0, movimientos, TAMANO_LOTE_INSERCION):
+            conexion.execute(insert(MovimientoInventario.__table__), [{
+                "id_producto": i % PRODUCTOS_BENCHMARK + 1, "id_usuario": 1,
+                "tipo_movimiento": tipos[i % len(tipos)].name, "cantidad": 1 + i % 5,
+                "cantidad_anterior": 0, "cantidad_nueva": 0,
+                "fecha_movimiento": inicio + timedelta(seconds=i % (29 * 86400))
+            } for i in range(desde, min(desde + TAMANO_LOTE_INSERCION, movimientos))])
+
+@pytest.mark.parametrize("movimientos", sorted(SEGUNDOS_MAX_POR_TAMANO))
+def test_reporte_inventario_por_volumen_de_movimientos(tmp_path, record_property, movimientos):
+    motor = create_engine(f"sqlite:///{tmp_path / 'benchmark.db'}")
+    Base.metadata.create_all(motor)
+    fin = datetime.now()
+    inicio = fin - timedelta(days=30)
+    poblar_movimientos(motor, movimientos, inicio)
+    db = sessionmaker(bind=motor)()
+
+    try:
+        tracemalloc.start()
+        with contar_consultas(motor) as sentencias:
+            comienzo = time.perf_counter()
+            reporte = ControladorReportes(db).generar_reporte_inventario(inicio, fin)
+            segundos = time.perf_counter() - comienzo
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        db.close()
+        motor.dispose()
+
+    mb = pico / (1024 * 1024)
+    record_property("segundos", round(segundos, 3))
+    record_property("memoria_pico_mb", round(mb, 1))
+
+    assert "error" not in reporte, reporte
+    assert reporte["resumen"]["total_productos"] == PRODUCTOS_BENCHMARK
+    assert sum(fila["entradas"] + fila["salidas"] for fila in reporte["datos"]) > 0
+    # Una única consulta agrupada, sea cual sea el volumen
+    assert len(sentencias) == 1, sentencias
+    limite = float(BENCHMARK_REPORTE_SEGUNDOS_MAX or SEGUNDOS_MAX_POR_TAMANO[movimientos])
+    assert segundos < limite, f"{movimientos} movimientos: {segundos:.2f} s (límite {limite} s)"
+    assert mb < BENCHMARK_REPORTE_MB_MAX, f"{movimientos} movimientos: {mb:.1f} MB (límite {BENCHMARK_REPORTE_MB_MAX} MB)"
@@ -0,0 +1,55 @@
+"""
+Pruebas del Enrutamiento de Lecturas a Réplicas
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+import time
+from http.cookies import SimpleCookie
+from fastapi.responses import Response
+from config.replicas import EnrutadorLecturas, COOKIE_ULTIMA_ESCRITURA
+
+CLAVE = "clave-compartida"
+
+def worker(tmp_path, clave_firma: str = CLAVE) -> EnrutadorLecturas:
+    """Enrutador de un worker con una réplica SQLite"""
+    return EnrutadorLecturas([f"sqlite:///{tmp_path / 'replica.db'}"], clave_firma=clave_firma)
+
+def leer(enrutador: EnrutadorLecturas, clave_usuario, marca: str = None) -> str:
+    """Dónde fue la lectura: 'primaria' o 'replica'"""
+    antes = enrutador.lecturas_primaria
+    enrutador.crear_sesion_lectura(clave_usuario, marca).close()
+    return "primaria" if enrutador.lecturas_primaria > antes else "replica"
+
+def escribir(enrutador: EnrutadorLecturas, clave_usuario) -> str:
+    """Registra una escritura y devuelve la cookie enviada al cliente"""
+    respuesta = Response()
+    enrutador.registrar_escritura(clave_usuario, respuesta)
+    return SimpleCookie(respuesta.headers["set-cookie"])[COOKIE_ULTIMA_ESCRITURA].value
+
+def test_la_lectura_propia_sigue_al_cliente_entre_workers(tmp_path):
+    worker_a, worker_b = worker(tmp_path), worker(tmp_path)
+
+    marca = escribir(worker_a, 7)
+
+    # El worker B no vio la escritura: solo la cookie le lleva a la primaria
+    assert leer(worker_b, 7) == "replica"
+    assert leer(worker_b, 7, marca) == "primaria"
+    assert leer(worker_a, 7) == "primaria"
+
+def test_marcas_ajenas_manipuladas_o_vencidas_no_cuentan(tmp_path):
+    # Las lecturas van a otro worker: solo cuenta la cookie
+    marca = escribir(worker(tmp_path), 7)
+    usuario, momento, firma = marca.rsplit(":", 2)
+    enrutador = worker(tmp_path)
+
+    # De otro usuario
+    assert leer(enrutador, 8, marca) == "replica"
+    # Firmada con otra clave o con la hora cambiada
+    assert leer(enrutador, 7, worker(tmp_path, "otra-clave").firmar_escritura(7, time.time())) == "replica"
+    assert leer(enrutador, 7, f"{usuario}:{float(momento) + 1:.3f}:{firma}") == "replica"
+    # Fuera de la ventana de lectura propia
+    vencida = enrutador.firmar_escritura(7, time.time() - enrutador.ventana_lectura_propia - 1)
+    assert leer(enrutador, 7, vencida) == "replica"
+    assert leer(enrutador, 7, "basura") == "replica"
+    assert leer(enrutador, 7, marca) == "primaria"
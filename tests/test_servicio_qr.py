@@ -0,0 +1,84 @@
+"""
+Pruebas del Servicio de Imágenes QR
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+from modelo.categoria import Categoria
+from modelo.proveedor import Proveedor
+from modelo.producto import Producto
+from controlador.producto import ControladorProductos
+from controlador.evaluador_alertas import evaluador_alertas
+from controlador.almacen_configuracion import almacen_configuracion
+from controlador.servicio_qr import ServicioQR, servicio_qr, datos_qr
+
+def crear_producto(db, codigo: str, qr_code: str = None, activo: bool = True):
+    """Producto mínimo con el texto QR indicado"""
+    db.add(Producto(codigo_producto=codigo, nombre_producto=codigo, precio_compra=1, precio_venta=2,
+                    categoria=Categoria(nombre_categoria=f"Categoría {codigo}"),
+                    proveedor=Proveedor(nombre_proveedor=f"Proveedor {codigo}"),
+                    qr_code=qr_code, activo=activo))
+    db.commit()
+
+def test_la_imagen_usa_el_qr_guardado_en_el_producto(db, tmp_path):
+    crear_producto(db, "P0001", qr_code="https://etiquetas.example/producto/P0001")
+    servicio = ServicioQR(str(tmp_path))
+
+    datos = servicio.obtener_datos(db, " p0001 ")
+
+    assert datos == "https://etiquetas.example/producto/P0001"
+    assert servicio.huella(datos) != servicio.huella(datos_qr("P0001", servicio.obtener_base_url(db)))
+
+def test_sin_qr_guardado_usa_la_url_base_configurada(db, tmp_path):
+    crear_producto(db, "P0002")
+    servicio = ServicioQR(str(tmp_path))
+
+    assert servicio.obtener_datos(db, "P0002") == datos_qr("P0002", servicio.obtener_base_url(db))
+
+def test_producto_inexistente_o_inactivo(db, tmp_path):
+    crear_producto(db, "P0003", qr_code="https://stocktrack.app/producto/P0003", activo=False)
+    servicio = ServicioQR(str(tmp_path))
+
+    assert servicio.obtener_datos(db, "P0003") is None
+    assert servicio.obtener_datos(db, "NOEXISTE") is None
+
+def test_crear_producto_usa_la_url_base_configurada(db, monkeypatch):
+    # Sin evaluador en segundo plano: usaría la base global, no la de la prueba
+    monkeypatch.setattr(evaluador_alertas, "publicar", lambda ids: None)
+    almacen_configuracion.establecer(db, "qr_base_url", "https://inventario.example")
+    categoria, proveedor = Categoria(nombre_categoria="General"), Proveedor(nombre_proveedor="General")
+    db.add_all([categoria, proveedor])
+    db.commit()
+
+    creado, mensaje, producto = ControladorProductos(db).crear_producto(
+        "p0004", "Producto 4", None, categoria.id_categoria, proveedor.id_proveedor
+    )
+
+    assert creado, mensaje
+    assert producto.qr_code == "https://inventario.example/producto/P0004"
+
+def test_la_imagen_se_revalida_con_el_etag(db, tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from config.database import obtener_sesion
+    from app import app
+
+    crear_producto(db, "P0005", qr_code="https://stocktrack.app/producto/P0005")
+    monkeypatch.setattr(servicio_qr, "directorio", str(tmp_path))
+    app.dependency_overrides[obtener_sesion] = lambda: db
+    try:
+        cliente = TestClient(app)
+        respuesta = cliente.get("/qr/P0005.png")
+        etag = respuesta.headers["etag"]
+
+        assert respuesta.status_code == 200
+        assert respuesta.headers["content-type"] == "image/png"
+        # URL sin versión: nunca se sirve de caché sin revalidar
+        assert respuesta.headers["cache-control"] == "no-cache"
+        assert cliente.get("/qr/P0005.png", headers={"If-None-Match": etag}).status_code == 304
+
+        producto = db.query(Producto).filter(Producto.codigo_producto == "P0005").one()
+        producto.qr_code = "https://etiquetas.example/producto/P0005"
+        db.commit()
+        assert cliente.get("/qr/P0005.png", headers={"If-None-Match": etag}).status_code == 200
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,50 @@
+"""
+Pruebas de la Cola de Trabajos de Reportes
+Sistema StockTrack
+Autor: MiniMax Agent
+"""
+
+import os
+from controlador.trabajos_reportes import ColaReportes, normalizar_especificacion, clave_especificacion
+
+ESPECIFICACION = {"tipo": "inventario", "formato": "csv", "fecha_inicio": "2024-01-01", "fecha_fin": "2024-02-01"}
+
+def artefacto_generado(directorio, datos) -> str:
+    """Deja en disco el artefacto de una especificación, como si otro worker lo hubiera generado"""
+    ruta = os.path.join(directorio, f"{clave_especificacion(normalizar_especificacion(datos))}.csv")
+    with open(ruta, "wb") as archivo:
+        archivo.write(b"codigo;nombre\n")
+    return ruta
+
+def test_el_trabajo_se_consulta_desde_otro_worker(tmp_path):
+    ruta = artefacto_generado(str(tmp_path), ESPECIFICACION)
+    trabajo = ColaReportes(str(tmp_path)).encolar(ESPECIFICACION, usuario_id=1)
+
+    otro_worker = ColaReportes(str(tmp_path))
+
+    assert otro_worker.obtener(trabajo["id"], 1)["estado"] == "completado"
+    assert otro_worker.obtener_artefacto(trabajo["id"], 1)["ruta"] == ruta
+
+def test_solo_el_propietario_ve_y_descarga_el_trabajo(tmp_path):
+    artefacto_generado(str(tmp_path), ESPECIFICACION)
+    cola = ColaReportes(str(tmp_path))
+    trabajo = cola.encolar(ESPECIFICACION, usuario_id=1)
+
+    for instancia in (cola, ColaReportes(str(tmp_path))):
+        assert instancia.obtener(trabajo["id"], 2) is None
+        assert instancia.obtener_artefacto(trabajo["id"], 2) is None
+
+    # Otro usuario con la misma especificación recibe su propio trabajo
+    ajeno = cola.encolar(ESPECIFICACION, usuario_id=2)
+    assert ajeno["id"] != trabajo["id"]
+    assert cola.obtener_artefacto(ajeno["id"], 2) is not None
+
+def test_id_de_trabajo_invalido(tmp_path):
+    assert ColaReportes(str(tmp_path)).obtener("../../etc/passwd", 1) is None
+
+def test_las_fechas_por_defecto_forman_parte_de_la_huella():
+    especificacion = normalizar_especificacion({"tipo": "movimientos"})
+
+    assert especificacion["fecha_inicio"] and especificacion["fecha_fin"]
+    explicita = normalizar_especificacion({"tipo": "movimientos", "fecha_inicio": "2024-01-01", "fecha_fin": "2024-02-01"})
+    assert clave_especificacion(especificacion) != clave_especificacion(explicita)